@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# @title        : bench_decompression.py
+# @description:
+#               benchmarks of the two decompressors: StixDecompressor, used by the parser
+#               one value at a time, and integer_compression.decompress, used on arrays
+#               when FITS products are created
+import random
+import numpy as np
+from benchmarks import common
+from stix.core import stix_decompressor
+from stix.fits.calibration import integer_compression
+
+
+class StixDecompressor(object):
+    """ decompress the counts of quick-look light curve packets """
+    num_packets = 100
+    num_values = 160
+
+    def setup(self):
+        rng = random.Random(common.SEED)
+        self.decompressor = stix_decompressor.StixDecompressor()
+        skm = [('NIXD0101', 0), ('NIXD0102', 5), ('NIXD0103', 3),
+               ('NIXD0104', 0), ('NIXD0105', 5), ('NIXD0106', 3)]
+        counts = [('NIX00272', rng.getrandbits(8))
+                  for _ in range(self.num_values)]
+        self.packet = skm + counts
+        self.throughput = {'values': self.num_packets * len(self.packet)}
+
+    def time_decompress_raw(self):
+        decompressor = self.decompressor
+        for _ in range(self.num_packets):
+            decompressor.init(54118)
+            for name, raw in self.packet:
+                decompressor.decompress_raw(name, raw)
+
+
+class IntegerCompression(object):
+    """ decompress arrays of counts with their variances """
+    params = [(0, 5, 3), (1, 4, 3)]
+    param_names = ['skm']
+    num_values = 10**6
+
+    def setup(self, skm):
+        rng = np.random.default_rng(common.SEED)
+        self.values = rng.integers(0, 256, self.num_values)
+        self.throughput = {'values': self.num_values}
+
+    def time_decompress(self, skm):
+        s, k, m = skm
+        integer_compression.decompress(self.values,
+                                       s=s,
+                                       k=k,
+                                       m=m,
+                                       return_variance=True)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# @title        : bench_parallel.py
+# @description:
+#               benchmarks of parse_file with a pool of processes, one result per number of
+#               processes. Packets are only counted, as when the workers write them, so
+#               the throughput grows with the number of processes up to the number of CPUs.
+#               When decoded packets are sent back to the parser process, the speed-up is
+#               limited to about 2, see time_parse_file_packets
+import os
+import shutil
+import tempfile
+from benchmarks import common
+from stix.core import stix_parser
+
+
+class ParseFileParallel(object):
+    """ parse a file of mixed telemetry with 1 to 8 processes """
+    params = [1, 2, 4, 8]
+    param_names = ['processes']
+    num_packets = 4000
+    num_chunks = 32
+
+    def setup(self, processes):
+        self.directory = tempfile.mkdtemp(prefix='stix_bench_parallel_')
+        self.filename = os.path.join(self.directory, 'mix.bin')
+        buf = common.generate_mix(self.num_packets)
+        with open(self.filename, 'wb') as fout:
+            fout.write(buf)
+        self.chunk_size = max(1, len(buf) // self.num_chunks)
+        self.parser = stix_parser.StixTCTMParser()
+        self.parser.set_progress_bar_enabed(False)
+        self.throughput = {
+            'packets': len(common.parse(buf)),
+            'bytes': len(buf)
+        }
+
+    def teardown(self, processes):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def parse(self, processes):
+        if processes == 1:
+            return self.parser.parse_file(self.filename)
+        self.parser.prepare_file(self.filename)
+        return self.parser.parse_binary_file_parallel(self.filename, processes,
+                                                      self.chunk_size)
+
+    def time_parse_file(self, processes):
+        self.parser.set_packet_buffer_enabled(False)
+        self.parse(processes)
+
+    def time_parse_file_packets(self, processes):
+        self.parser.set_packet_buffer_enabled(True)
+        self.parse(processes)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# @title        : bench_parser.py
+# @description:
+#               benchmarks of packet decoding: parse_binary on housekeeping, quick-look,
+#               science and mixed telemetry, decode_buffer and raw_to_eng
+import random
+from benchmarks import common
+from stix.core import stix_parser
+
+
+class ParseBinary(object):
+    """ decode a buffer of synthetic telemetry packets """
+    params = ['hk', 'ql', 'bsd', 'mix']
+    param_names = ['telemetry']
+    num_packets = 500
+    generators = {
+        'hk': common.generate_hk,
+        'ql': common.generate_ql,
+        'bsd': common.generate_bsd,
+        'mix': common.generate_mix
+    }
+
+    def setup(self, telemetry):
+        self.buffer = self.generators[telemetry](self.num_packets)
+        self.parser = stix_parser.StixTCTMParser()
+        self.parser.set_progress_bar_enabed(False)
+        self.throughput = {
+            'packets': len(self.parser.parse_binary(self.buffer)),
+            'bytes': len(self.buffer)
+        }
+
+    def time_parse_binary(self, telemetry):
+        self.parser.set_generated_decoders_enabled(False)
+        self.parser.parse_binary(self.buffer)
+
+    def time_parse_binary_generated_decoders(self, telemetry):
+        self.parser.set_generated_decoders_enabled(True)
+        self.parser.parse_binary(self.buffer)
+
+
+class DecodeBuffer(object):
+    """ decode parameters of the types and widths found in STIX packets """
+    num_values = 20000
+    arguments = [
+        ('U', 0, 8),
+        ('U', 0, 16),
+        ('U', 0, 32),
+        ('U', 3, 4),
+        ('U', 4, 12),
+        ('U', 0, 24),
+        ('I', 0, 16),
+        ('T', 0, 48),
+    ]
+    #parameter type, bit offset and width in bits
+
+    def setup(self):
+        rng = random.Random(common.SEED)
+        self.parser = stix_parser.StixParameterParser()
+        self.buffer = bytes(rng.getrandbits(8) for _ in range(4096))
+        self.calls = [
+            self.arguments[i % len(self.arguments)] + (rng.randrange(4000), )
+            for i in range(self.num_values)
+        ]
+        self.throughput = {'values': self.num_values}
+
+    def time_decode_buffer(self):
+        decode_buffer = self.parser.decode_buffer
+        buf = self.buffer
+        for param_type, offset_bits, width, offset in self.calls:
+            decode_buffer(buf, param_type, offset, offset_bits, width)
+
+
+class RawToEng(object):
+    """ calibrate the raw values of the housekeeping parameters """
+    spids = [54101, 54102]
+    num_values = 20000
+
+    def setup(self):
+        rng = random.Random(common.SEED)
+        self.parser = stix_parser.StixParameterParser()
+        parameters = []
+        for spid in self.spids:
+            for row in common.STIX_IDB.get_fixed_packet_structure(spid):
+                if row['PCF_CURTX']:
+                    parameters.append((row['PCF_NAME'], row['PCF_CURTX'],
+                                       min(row['PCF_WIDTH'], 12)))
+        self.calls = [(name, ref, rng.getrandbits(width))
+                      for name, ref, width in (parameters[i % len(parameters)]
+                                               for i in range(self.num_values))]
+        self.throughput = {'values': self.num_values}
+
+    def time_raw_to_eng(self):
+        raw_to_eng = self.parser.raw_to_eng
+        for name, ref, raw in self.calls:
+            raw_to_eng(name, ref, raw)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# @title        : bench_products.py
+# @description:
+#               benchmarks of the product pipeline: Packet.merge, creation of quick-look and
+#               science products from merged packets, and FITS writing
+import shutil
+import tempfile
+from pathlib import Path
+from benchmarks import common
+from stix.core import stix_datatypes as sdt
+from stix.fits.io.processors import FitsL1Processor
+from stix.fits.products.quicklook import LightCurve, Spectra
+from stix.fits.products.science import XrayL0
+
+PRODUCTS = {
+    'lightcurve': (54118, LightCurve, common.generate_ql, 200),
+    'spectra': (54120, Spectra, common.generate_ql, 20),
+    'xray_l0': (54114, XrayL0, common.generate_bsd, 1)
+}
+#product: SPID, class, packet generator, number of packets
+
+
+def get_packets(product):
+    spid, _, generate, num_packets = PRODUCTS[product]
+    packets = [
+        packet for packet in common.parse(generate(2 * num_packets))
+        if packet['header']['SPID'] == spid
+    ]
+    return packets[:num_packets]
+
+
+class PacketMerge(object):
+    """ merge the parameters of quick-look light curve packets """
+    params = ['raw', 'eng']
+    param_names = ['value_type']
+
+    def setup(self, value_type):
+        self.packets = get_packets('lightcurve')
+        self.throughput = {'packets': len(self.packets)}
+
+    def time_merge(self, value_type):
+        sdt.Packet.merge(self.packets, 54118, value_type=value_type)
+
+
+class FromPackets(object):
+    """ create products from merged packets """
+    params = list(PRODUCTS.keys())
+    param_names = ['product']
+
+    def setup(self, product):
+        spid, self.product_class, _, _ = PRODUCTS[product]
+        packets = get_packets(product)
+        self.raw = sdt.Packet.merge(packets, spid, value_type='raw')
+        self.eng = sdt.Packet.merge(packets, spid, value_type='eng')
+        self.throughput = {'packets': len(packets)}
+
+    def time_from_packets(self, product):
+        self.product_class.from_packets(self.raw, self.eng)
+
+
+class WriteFits(object):
+    """
+    create products and write level 1 FITS files. write_fits changes the product,
+    the time of FromPackets is included
+    """
+    params = list(PRODUCTS.keys())
+    param_names = ['product']
+
+    def setup(self, product):
+        spid, product_class, _, _ = PRODUCTS[product]
+        packets = get_packets(product)
+        self.raw = sdt.Packet.merge(packets, spid, value_type='raw')
+        self.eng = sdt.Packet.merge(packets, spid, value_type='eng')
+        self.product_class = product_class
+        self.path = Path(tempfile.mkdtemp(prefix='stix_benchmark_fits_'))
+        self.throughput = {'packets': len(packets)}
+
+    def teardown(self, product):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def time_write_fits(self, product):
+        path = Path(tempfile.mkdtemp(dir=self.path))
+        FitsL1Processor(path, 0, 1).write_fits(
+            self.product_class.from_packets(self.raw, self.eng))
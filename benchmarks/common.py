@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# @title        : common.py
+# @description:
+#               offline environment of the benchmarks, the one of the tests in
+#               stix/core/tests/environment.py: bundled IDB, synthetic SPICE kernels and
+#               packets synthesized by stix_packet_encoder.
+#               This module must be imported before any module of stix.core that uses the IDB.
+from stix.core.tests import environment
+from stix.core.tests.environment import (BUNDLED_IDB, SEED, SCET_START, generate_hk,
+                                         generate_ql, generate_bsd, generate_mix)
+
+environment.setup()
+
+from stix.core import stix_idb
+STIX_IDB = stix_idb.stix_idb(BUNDLED_IDB)
+from stix.core import stix_parser
+
+
+def parse(buf):
+    """ decode a buffer with a new parser """
+    parser = stix_parser.StixTCTMParser()
+    parser.set_progress_bar_enabed(False)
+    return parser.parse_binary(buf)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# @title        : run_benchmarks.py
+# @description:
+#               runner of the benchmarks in this directory. Benchmarks are written in the
+#               asv style: classes with an optional setup(*params) and teardown(*params),
+#               an optional list of params, and methods named time_*. setup sets
+#               self.throughput, a dictionary of the number of items processed by each call,
+#               e.g. {'packets': 1000, 'bytes': 86000}, which are converted to items per second.
+#               Results are written to a JSON file and compared with a baseline:
+#                   python3 -m benchmarks.run_benchmarks -o baseline.json
+#                   python3 -m benchmarks.run_benchmarks -o new.json -b baseline.json
+#               --scale changes the input sizes, num_packets and num_values, e.g. to check
+#               that the benchmarks run: python3 -m benchmarks.run_benchmarks -s 0.01 -r 1
+import os
+import sys
+import json
+import time
+import inspect
+import argparse
+import platform
+import importlib
+import statistics
+import subprocess
+from datetime import datetime
+
+BENCHMARK_MODULES = [
+    'benchmarks.bench_parser', 'benchmarks.bench_decompression',
+    'benchmarks.bench_products', 'benchmarks.bench_parallel'
+]
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.1
+#relative slowdown reported as a regression
+SIZE_ATTRIBUTES = ['num_packets', 'num_values']
+#input sizes of the benchmark classes, multiplied by the scale
+
+
+def get_metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'],
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True,
+                                text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    import numpy
+    return {
+        'date': datetime.utcnow().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'system': platform.platform()
+    }
+
+
+def iter_benchmarks(pattern=''):
+    """
+    Yields:
+        benchmark name, class, method name and parameters
+    """
+    for module_name in BENCHMARK_MODULES:
+        module = importlib.import_module(module_name)
+        for class_name, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module_name:
+                continue
+            params = getattr(cls, 'params', None)
+            for method_name in sorted(dir(cls)):
+                if not method_name.startswith('time_'):
+                    continue
+                for param in (params if params is not None else [None]):
+                    name = '{}.{}.{}'.format(module_name.split('.')[-1],
+                                             class_name, method_name)
+                    if param is not None:
+                        name += '({})'.format(param)
+                    if pattern in name:
+                        yield name, cls, method_name, param
+
+
+def run_benchmark(cls, method_name, param, repeat, scale=1):
+    args = () if param is None else (param, )
+    benchmark = cls()
+    for name in SIZE_ATTRIBUTES:
+        if hasattr(benchmark, name):
+            setattr(benchmark, name, max(1, int(getattr(benchmark, name) * scale)))
+    if hasattr(benchmark, 'setup'):
+        benchmark.setup(*args)
+    method = getattr(benchmark, method_name)
+    try:
+        method(*args)
+        #warm up, caches are filled
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            method(*args)
+            times.append(time.perf_counter() - start)
+    finally:
+        if hasattr(benchmark, 'teardown'):
+            benchmark.teardown(*args)
+    best = min(times)
+    result = {
+        'seconds': best,
+        'median': statistics.median(times),
+        'times': times,
+        'throughput': {}
+    }
+    for unit, number in getattr(benchmark, 'throughput', {}).items():
+        result['throughput']['{}_per_second'.format(unit)] = number / best
+    return result
+
+
+def format_throughput(throughput):
+    return ', '.join('{:.4g} {}'.format(value, unit.replace('_per_second', '/s'))
+                     for unit, value in throughput.items())
+
+
+def compare(results, baseline, threshold):
+    """
+    print the ratio of the times to the baseline
+    Returns:
+        names of the benchmarks slower than the baseline by more than threshold
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['seconds'] / baseline[name]['seconds']
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = 'slower'
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = 'faster'
+        print('{:70s} {:8.3f} {}'.format(name, ratio, flag))
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description='Run the benchmarks and compare their results with a baseline')
+    arg_parser.add_argument('-o', '--output', help='JSON file of the results')
+    arg_parser.add_argument('-b', '--baseline', help='JSON file of baseline results')
+    arg_parser.add_argument('-k', '--pattern', default='',
+                            help='only run benchmarks whose name contains the pattern')
+    arg_parser.add_argument('-r', '--repeat', type=int, default=DEFAULT_REPEAT,
+                            help='number of timed calls of each benchmark')
+    arg_parser.add_argument('-t', '--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help='relative slowdown reported as a regression')
+    arg_parser.add_argument('-s', '--scale', type=float, default=1,
+                            help='factor of the input sizes of the benchmarks')
+    args = arg_parser.parse_args()
+
+    results = {}
+    for name, cls, method_name, param in iter_benchmarks(args.pattern):
+        result = run_benchmark(cls, method_name, param, args.repeat, args.scale)
+        results[name] = result
+        print('{:70s} {:10.4f} s  {}'.format(name, result['seconds'],
+                                             format_throughput(result['throughput'])))
+    if args.output:
+        with open(args.output, 'w') as fout:
+            json.dump({'metadata': get_metadata(), 'results': results}, fout, indent=2)
+    if args.baseline:
+        with open(args.baseline) as fin:
+            baseline = json.load(fin)['results']
+        print('\nTime ratios to {}:'.format(args.baseline))
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
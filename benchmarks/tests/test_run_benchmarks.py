@@ -0,0 +1,35 @@
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_benchmarks(*args):
+    return subprocess.run([sys.executable, '-m', 'benchmarks.run_benchmarks'] + list(args),
+                          cwd=ROOT,
+                          capture_output=True,
+                          text=True)
+
+
+def test_run_benchmarks_on_tiny_inputs(tmp_path):
+    output = str(tmp_path / 'results.json')
+    process = run_benchmarks('-s', '0.01', '-r', '1', '-o', output)
+    assert process.returncode == 0, process.stderr
+    with open(output) as fin:
+        results = json.load(fin)['results']
+    modules = {name.split('.')[0] for name in results}
+    assert modules == {
+        'bench_parser', 'bench_decompression', 'bench_products', 'bench_parallel'
+    }
+    for name, result in results.items():
+        assert result['seconds'] > 0, name
+        assert len(result['times']) == 1, name
+    assert results['bench_parser.ParseBinary.time_parse_binary(mix)']['throughput'][
+        'packets_per_second'] > 0
+
+    process = run_benchmarks('-s', '0.01', '-r', '1', '-k', 'DecodeBuffer', '-b', output,
+                             '-t', '1000')
+    assert process.returncode == 0, process.stderr
+    assert 'bench_parser.DecodeBuffer.time_decode_buffer' in process.stdout
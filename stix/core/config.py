@@ -60,15 +60,28 @@ def get_idb(utc=None):
         except Exception as e:
             logger.error(str(e))
         return ''
-    for item in parser_config['idb']:
-        dt = dtparser.parse(utc)
-        if dt > dtparser.parse(
-                item['validity_period'][0]) and dt <= dtparser.parse(
-                    item['validity_period'][1]):
-            return item['filename']
+    dt = dtparser.parse(utc)
+    for start, end, filename in get_idb_periods():
+        if dt > start and dt <= end:
+            return filename
     return ''
 
 
+def get_idb_periods():
+    """
+    validity periods of the IDBs in the configuration
+    Returns:
+        list of (start datetime, end datetime, IDB filename)
+    """
+    periods = []
+    for item in parser_config.get('idb', []):
+        period = item.get('validityPeriod', item.get('validity_period'))
+        if period:
+            periods.append((dtparser.parse(period[0]),
+                            dtparser.parse(period[1]), item['filename']))
+    return periods
+
+
 def get_spice(utc=None):
     if not utc:
         try:
@@ -22,6 +22,10 @@ DATA_REQUEST_REPORT_NAME = {
     54125: 'ASP'
 }
 QL_REPORT_SPIDS = [54118, 54119, 54121, 54120, 54122]
+CALIBRATION_REPORT_SPID = 54124
+ANALYZED_SPIDS = set(DATA_REQUEST_REPORT_SPIDS + QL_REPORT_SPIDS +
+                     [CALIBRATION_REPORT_SPID])
+#packets captured by StixScienceReportAnalyzer
 
 
 class StixScienceReportAnalyzer(object):
@@ -71,7 +75,7 @@ class StixCalibrationReportAnalyzer(object):
         packet = sdt.Packet(pkt)
         if not packet['parameters']:
             return
-        if packet.SPID != 54124:
+        if packet.SPID != CALIBRATION_REPORT_SPID:
             return
 
         detector_mask = packet.get_one('NIX00407')[1]  #raw value
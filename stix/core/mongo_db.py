@@ -27,7 +27,12 @@ QL_SPIDS = {
 
 
 class MongoDB(object):
-    def __init__(self, server='localhost', port=27017, user='', pwd=''):
+    def __init__(self,
+                 server='localhost',
+                 port=27017,
+                 user='',
+                 pwd='',
+                 timeout_ms=None):
         self.filename = None
         self.packets = []
         self.db = None
@@ -35,15 +40,20 @@ class MongoDB(object):
         self.collection_raw_files = None
         self.collection_calibration = None
         self.collection_ql = None
+        options = {}
+        if timeout_ms is not None:
+            #time to wait for the server before an operation fails
+            options['serverSelectionTimeoutMS'] = timeout_ms
         try:
             if server == 'localhost' and user == '' and pwd == '':
-                self.connect = pymongo.MongoClient(server, port)
+                self.connect = pymongo.MongoClient(server, port, **options)
             else:
                 self.connect = pymongo.MongoClient(server,
                                                    port,
                                                    username=user,
                                                    password=pwd,
-                                                   authSource='stix')
+                                                   authSource='stix',
+                                                   **options)
             self.db = self.connect["stix"]
             self.collection_packets = self.db['packets']
             self.collection_raw_files = self.db['raw_files']
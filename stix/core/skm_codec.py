@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# @title        : skm_codec.py
+# @description:
+#               lookup tables of the STIX quasi-exponential integer compression.
+#               A compressed value is one byte, so for a given (S, K, M) triplet there are
+#               only 256 decompressed values. The tables are computed once per triplet
+#               and decompression is a table lookup:
+#                   values, variances = get_lookup_tables(0, 5, 3)
+#                   counts = values[compressed_counts]
+import numpy as np
+from stix.core import stix_logger
+
+logger = stix_logger.get_logger()
+
+MAX_STORED_INTEGER = 1e8
+#numbers greater than this value will be converted to float type
+
+LOOKUP_TABLES = {}
+#(S, K, M): (decompressed values, variances), NumPy arrays
+PARAMETER_LOOKUP_TABLES = {}
+#(S, K, M): decompressed values as python numbers, None if the triplet is not valid
+
+
+def build_lookup_tables(s, k, m):
+    """
+    Decompress all the 256 possible compressed values.
+    The decompressed value is the mid-point of the possible values that could have given the
+    compressed value.
+    Parameters:
+        s: number of sign bits (0 or 1)
+        k: number of bits for exponent
+        m: number of bits for mantissa
+    Returns:
+        decompressed values (int64) and their variances (float64)
+    """
+    total = s + k + m
+    if total > 8:
+        raise ValueError(
+            f'Invalid s={s}, k={k}, m={m} must sum to less than 8 not {total}')
+
+    max_value = np.array(2**(2**k - 2) * (2**(m + 1)) - 1)
+    if max_value > np.iinfo(np.uint64).max:
+        raise ValueError('Decompressed value too large to fit into uint64')
+
+    codes = np.arange(256, dtype=np.int64)
+    abs_values = codes if s == 0 else codes & 127
+    values = abs_values.copy()
+    variances = np.zeros(256, dtype=np.float64)
+
+    compressed = abs_values >= 2**(m + 1)
+    kv = (abs_values[compressed] >> m) - 1
+    mv = 2**m + (abs_values[compressed] & 2**m - 1)
+    values[compressed] = (mv << kv) + (1 << (kv - 1)) - 1
+    variances[compressed] = ((1 << kv)**2 + 2) / 12
+    if s == 1:
+        variances[127] = 0
+        values[128:] = -values[128:]
+
+    values.setflags(write=False)
+    variances.setflags(write=False)
+    return values, variances
+
+
+def get_lookup_tables(s, k, m):
+    """ get the lookup tables of decompressed values and variances, see build_lookup_tables
+    """
+    try:
+        return LOOKUP_TABLES[(s, k, m)]
+    except KeyError:
+        tables = build_lookup_tables(s, k, m)
+        LOOKUP_TABLES[(s, k, m)] = tables
+        return tables
+
+
+def decompress(values, s, k, m, return_variance=False):
+    """
+    Decompress an array of compressed values with one table lookup
+    Parameters:
+        values: compressed values, integers in the range 0 to 255
+        s, k, m: compression parameters
+        return_variance: return the variances as well
+    Returns:
+        decompressed values, and their variances if return_variance is True
+    """
+    values = np.atleast_1d(np.asarray(values))
+    if values.min() < 0 or values.max() > 255:
+        raise ValueError('Compressed values must be in the range 0 to 255')
+    lut, variance_lut = get_lookup_tables(s, k, m)
+    indices = values.astype(np.intp)
+    if return_variance:
+        return lut[indices], variance_lut[indices]
+    return lut[indices]
+
+
+def get_parameter_lookup_table(s, k, m):
+    """
+    lookup table used to decompress parameters when packets are parsed.
+    Values are python integers, or floats if they are greater than MAX_STORED_INTEGER.
+    Returns:
+        a list of 256 values, or None if the SKM values are not valid
+        or if the parameter is not compressed (K or M equal to 0)
+    """
+    try:
+        return PARAMETER_LOOKUP_TABLES[(s, k, m)]
+    except KeyError:
+        pass
+    table = None
+    if s + k + m > 8 or s not in (0, 1) or k > 7 or m > 7 or k < 0 or m < 0:
+        logger.warning('Invalid SKM values: {}{}{}', s, k, m)
+        #not cached, a warning for each invalid triplet
+        return None
+    if k != 0 and m != 0:
+        table = [
+            int(x) if abs(x) <= MAX_STORED_INTEGER else float(x)
+            for x in build_python_values(s, k, m)
+        ]
+    PARAMETER_LOOKUP_TABLES[(s, k, m)] = table
+    return table
+
+
+def build_python_values(s, k, m):
+    """ decompressed values computed with python integers, which don't overflow
+    """
+    results = []
+    for code in range(256):
+        x = code & 127 if s == 1 else code
+        if x >= 1 << (m + 1):
+            exponent = (x >> m) - 1
+            mantissa = (1 << m) | (x & ((1 << m) - 1))
+            x = (mantissa << exponent) + (1 << (exponent - 1)) - 1
+        results.append(-x if s == 1 and code >= 128 else x)
+    return results
+
+
+def compress(value, s, k, m):
+    """
+    Compress one integer, the inverse of the lookup tables.
+    Values out of the range of the triplet are saturated to the largest code.
+    Parameters:
+        value: integer to compress
+        s, k, m: compression parameters
+    Returns:
+        compressed value, an integer in the range 0 to 255
+    """
+    value = int(value)
+    negative = s == 1 and value < 0
+    x = -value if negative else max(value, 0)
+    if k != 0 and m != 0 and x >= 1 << (m + 1):
+        exponent = x.bit_length() - (m + 1)
+        x = ((exponent + 1) << m) | ((x >> exponent) & ((1 << m) - 1))
+    x = min(x, (1 << (k + m)) - 1 if k != 0 and m != 0 else 255 >> s)
+    return x + 128 if negative else x
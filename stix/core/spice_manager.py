@@ -3,21 +3,28 @@
 import re
 import os
 import glob
+import threading
 from datetime import datetime
 from dateutil import parser as dtparser
 from astropy.time import Time
 
 import spiceypy
+import pymongo
 from stix.core import stix_logger
 from stix.core import config
 from stix.core import mongo_db 
 
 logger = stix_logger.get_logger()
 
-MDB=mongo_db.MongoDB()
+MDB_TIMEOUT_MS = 2000
+#kernels found on disk are loaded without MongoDB if it doesn't respond in time
+MDB=mongo_db.MongoDB(timeout_ms=MDB_TIMEOUT_MS)
 
 loaded_kernels=[]
 
+LOCK = threading.RLock()
+#CSPICE isn't thread safe, calls from parser threads are serialized
+
 
 # SOLAR ORBITER naif identifier
 class SpiceManager:
@@ -29,21 +36,35 @@ class SpiceManager:
         self.refresh_kernels()
         
     def refresh_kernels(self):
+        new_kernels = []
         for pattern in config.get_spice():
-            for fname in glob.glob(pattern):
+            for fname in sorted(glob.glob(pattern)):
                 if fname not in self.loaded_kernels:
                     self.loaded_kernels.append(fname)
-                    MDB.insert_spice_kernel(fname)
-        for kernel in MDB.get_spice_kernels():
-            fname=os.path.join(kernel['path'],kernel['filename'])
-            if 'sclk' in fname or 'lsk' in fname:
-                #only import sclk and lsk module for data parser
-                spiceypy.furnsh(fname)
-                if 'sclk' in fname:
-                    self.last_sclk_file=fname
+                    new_kernels.append(fname)
+        try:
+            for fname in new_kernels:
+                MDB.insert_spice_kernel(fname)
+            kernels = [
+                os.path.join(kernel['path'], kernel['filename'])
+                for kernel in MDB.get_spice_kernels()
+            ]
+        except pymongo.errors.PyMongoError as e:
+            logger.warning(
+                'SPICE kernel registry not available, loading kernels found on disk: {}',
+                e)
+            kernels = new_kernels
+        for fname in kernels:
+            self.furnish(fname)
         print(self.last_sclk_file)
 
-        
+    def furnish(self, fname):
+        """ load a kernel. Only SCLK and LSK kernels are needed by the parser """
+        if 'sclk' in fname or 'lsk' in fname:
+            with LOCK:
+                spiceypy.furnsh(fname)
+            if 'sclk' in fname:
+                self.last_sclk_file = fname
 
     def get_last_sclk_filename(self):
         return self.last_sclk_file
@@ -52,18 +73,20 @@ class SpiceManager:
 
     def obt2utc(self, obt_string):
         # Obt to Ephemeris time (seconds past J2000)
-        ephemeris_time = spiceypy.scs2e(-144, obt_string)
-        # Ephemeris time to Utc
-        # Format of output epoch: ISOC (ISO Calendar format, UTC)
-        # Digits of precision in fractional seconds: 3
-        return spiceypy.et2utc(ephemeris_time, "ISOC", 3)
+        with LOCK:
+            ephemeris_time = spiceypy.scs2e(-144, obt_string)
+            # Ephemeris time to Utc
+            # Format of output epoch: ISOC (ISO Calendar format, UTC)
+            # Digits of precision in fractional seconds: 3
+            return spiceypy.et2utc(ephemeris_time, "ISOC", 3)
 
     def utc2obt(self, utc_string):
         # Utc to Ephemeris time (seconds past J2000)
-        ephemeris_time = spiceypy.utc2et(utc_string)
-        # Ephemeris time to Obt
-        #return ephemeris_time
-        obt_string = spiceypy.sce2s(-144, ephemeris_time)
+        with LOCK:
+            ephemeris_time = spiceypy.utc2et(utc_string)
+            # Ephemeris time to Obt
+            #return ephemeris_time
+            obt_string = spiceypy.sce2s(-144, ephemeris_time)
         time_fields = re.search('\/(.*?):(\d*)', obt_string)
         group = time_fields.groups()
         try:
@@ -79,9 +102,10 @@ class SpiceManager:
 
     def utc2scet(self, utc):
         # Utc to Ephemeris time (seconds past J2000)
-        ephemeris_time = spiceypy.utc2et(utc)
-        # Ephemeris time to Obt
-        return spiceypy.sce2s(-144, ephemeris_time)
+        with LOCK:
+            ephemeris_time = spiceypy.utc2et(utc)
+            # Ephemeris time to Obt
+            return spiceypy.sce2s(-144, ephemeris_time)
 
 
 spice= SpiceManager()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# @title        : stix_calibration.py
+# @description:
+#               calibration of raw parameter values using the calibration
+#               definitions in the IDB (CAP, MCF, TXP and PAS tables).
+#               Each calibration reference is compiled only once into a callable object:
+#                   calibration = get_calibration('CIXP0024TM')
+#                   eng_value = calibration(raw_value)
+#                   eng_values = calibrate('CIXP0024TM', raw_values)  #vectorized
+import re
+import numpy as np
+from scipy import interpolate
+from stix.core import stix_idb
+from stix.core import stix_logger
+
+logger = stix_logger.get_logger()
+STIX_IDB = stix_idb.stix_idb()
+
+TEXTUAL_CALIBRATION_PREFIXES = ['CIXTS', 'CAAT', 'CIXT']
+MAX_LUT_SIZE = 65536
+#maximum number of cached spline values per calibration
+
+
+class StixCalibration(object):
+    """ base class of compiled calibrations """
+    def __init__(self, ref):
+        self.ref = ref
+
+    def __call__(self, raw_value):
+        return ''
+
+    def calibrate(self, raw_values):
+        """ calibrate an array of raw values """
+        return np.array([self(x) for x in raw_values], dtype=object)
+
+
+class StixInvalidCalibration(StixCalibration):
+    """ calibration not available, an empty string is returned """
+    def __init__(self, ref, message=''):
+        super(StixInvalidCalibration, self).__init__(ref)
+        self.message = message
+
+    def __call__(self, raw_value):
+        if self.message:
+            logger.warning(self.message)
+        return ''
+
+    def calibrate(self, raw_values):
+        if self.message:
+            logger.warning(self.message)
+        return np.full(len(raw_values), '', dtype=object)
+
+
+class StixTextualCalibration(StixCalibration):
+    """ textual interpretation, ranges defined in TXP """
+    def __init__(self, ref, rows):
+        super(StixTextualCalibration, self).__init__(ref)
+        self.ranges = [(int(low), int(high), text) for low, high, text in rows]
+        self.lut = {}
+
+    def __call__(self, raw_value):
+        try:
+            return self.lut[raw_value]
+        except (KeyError, TypeError):
+            pass
+        result = None
+        try:
+            value = int(raw_value)
+            for low, high, text in self.ranges:
+                if low <= value <= high:
+                    result = text
+                    break
+        except (TypeError, ValueError):
+            pass
+        if result is None:
+            logger.warning('Missing textual calibration info. for {}',
+                           self.ref)
+            return ''
+        self.lut[raw_value] = result
+        return result
+
+    def calibrate(self, raw_values):
+        raw_values = np.asarray(raw_values)
+        results = np.full(raw_values.shape, None, dtype=object)
+        for low, high, text in reversed(self.ranges):
+            #the first matching range wins
+            results[(raw_values >= low) & (raw_values <= high)] = text
+        missing = np.equal(results, None)
+        if missing.any():
+            logger.warning('Missing textual calibration info. for {}',
+                           self.ref)
+            results[missing] = ''
+        return results
+
+
+class StixTelecommandCalibration(StixCalibration):
+    """ telecommand parameter interpretation defined in PAS """
+    def __init__(self, ref, rows):
+        super(StixTelecommandCalibration, self).__init__(ref)
+        self.lut = {value: text for value, text in rows}
+
+    def __call__(self, raw_value):
+        return self.lut.get(str(raw_value), '')
+
+
+class StixLinearCalibration(StixCalibration):
+    """ calibration curve with two points """
+    def __init__(self, ref, x_points, y_points):
+        super(StixLinearCalibration, self).__init__(ref)
+        self.x0 = x_points[0]
+        self.y0 = y_points[0]
+        self.slope = (y_points[1] - y_points[0]) / (x_points[1] - x_points[0])
+
+    def __call__(self, raw_value):
+        return round(self.slope * (raw_value - self.x0) + self.y0, 3)
+
+    def calibrate(self, raw_values):
+        return np.round(
+            self.slope * (np.asarray(raw_values, dtype=float) - self.x0) +
+            self.y0, 3)
+
+
+class StixSplineCalibration(StixCalibration):
+    """ calibration curve, interpolated with a cubic spline computed once """
+    def __init__(self, ref, x_points, y_points):
+        super(StixSplineCalibration, self).__init__(ref)
+        self.tck = interpolate.splrep(x_points, y_points)
+        self.lut = {}
+        #raw values are integers in most cases
+
+    def __call__(self, raw_value):
+        try:
+            return self.lut[raw_value]
+        except (KeyError, TypeError):
+            pass
+        try:
+            result = round(float(interpolate.splev(raw_value, self.tck)), 3)
+        except Exception as e:
+            logger.warning('Failed to calibrate {} due to {}', self.ref, e)
+            return ''
+        if len(self.lut) < MAX_LUT_SIZE:
+            self.lut[raw_value] = result
+        return result
+
+    def calibrate(self, raw_values):
+        return np.round(
+            interpolate.splev(np.asarray(raw_values, dtype=float), self.tck),
+            3)
+
+
+class StixPolynomialCalibration(StixCalibration):
+    """ polynomial calibration defined in MCF, evaluated with Horner's scheme """
+    def __init__(self, ref, coefficients):
+        super(StixPolynomialCalibration, self).__init__(ref)
+        coefficients = [float(x) for x in coefficients]
+        while len(coefficients) > 1 and coefficients[-1] == 0:
+            coefficients.pop()
+        self.coefficients = coefficients[::-1]
+        #highest order first
+
+    def __call__(self, raw_value):
+        result = 0.
+        for coeff in self.coefficients:
+            result = result * raw_value + coeff
+        return round(result, 3)
+
+    def calibrate(self, raw_values):
+        return np.round(
+            np.polyval(self.coefficients, np.asarray(raw_values,
+                                                     dtype=float)), 3)
+
+
+class StixCalibrationRegistry(object):
+    """
+    Compiled calibrations, a calibration reference is compiled when it is used for the first time.
+    Calibrations compiled with another IDB are not reused.
+    """
+    def __init__(self):
+        self.calibrations = {}
+
+    def get(self, ref, tmtc='TM', idb=None):
+        if idb is None:
+            idb = STIX_IDB
+        key = (idb.filename, tmtc, ref)
+        try:
+            return self.calibrations[key]
+        except KeyError:
+            calibration = self.compile(ref, tmtc, idb)
+            self.calibrations[key] = calibration
+            return calibration
+
+    def compile(self, ref, tmtc='TM', idb=None):
+        if idb is None:
+            idb = STIX_IDB
+        if not ref:
+            return StixInvalidCalibration(ref)
+        if tmtc == 'TC':
+            return StixTelecommandCalibration(
+                ref, idb.get_telecommand_textual_calibration(ref))
+
+        prefix = re.split(r'\d+', ref)[0]
+        if prefix in TEXTUAL_CALIBRATION_PREFIXES:
+            return StixTextualCalibration(
+                ref, idb.get_textual_calibration(ref))
+        elif prefix == 'CIXP':
+            # Ref SCOS-2000 Database Import ICD
+            rows = idb.get_calibration_curve(ref)
+            if len(rows) <= 1:
+                return StixInvalidCalibration(
+                    ref,
+                    'Invalid calibration parameter {}: at least two data points needed '
+                    .format(ref))
+            x_points = [float(row[0]) for row in rows]
+            y_points = [float(row[1]) for row in rows]
+            if len(rows) == 2:
+                return StixLinearCalibration(ref, x_points, y_points)
+            try:
+                return StixSplineCalibration(ref, x_points, y_points)
+            except Exception as e:
+                return StixInvalidCalibration(
+                    ref, 'Failed to calibrate {} due to {}'.format(ref, str(e)))
+        elif prefix == 'NIX':
+            return StixInvalidCalibration(
+                ref, 'No information to convert {} . '.format(ref))
+        elif prefix == 'CIX':
+            rows = idb.get_calibration_polynomial(ref)
+            if rows:
+                return StixPolynomialCalibration(ref, rows[0])
+            return StixInvalidCalibration(
+                ref, 'Missing calibration factors for {}'.format(ref))
+        return StixInvalidCalibration(ref)
+
+    def calibrate(self, ref, raw_values, tmtc='TM', idb=None):
+        """
+        Calibrate an array of raw values
+        Parameters:
+            ref: calibration reference name as defined in IDB
+            raw_values: raw values
+            tmtc: 'TM' or 'TC'
+            idb: IDB of the calibration, the default IDB if None
+        Returns:
+            NumPy array of engineering values
+        """
+        return self.get(ref, tmtc, idb).calibrate(raw_values)
+
+
+CALIBRATION_REGISTRY = StixCalibrationRegistry()
+
+
+def get_calibration(ref, tmtc='TM', idb=None):
+    return CALIBRATION_REGISTRY.get(ref, tmtc, idb)
+
+
+def calibrate(ref, raw_values, tmtc='TM', idb=None):
+    return CALIBRATION_REGISTRY.calibrate(ref, raw_values, tmtc, idb)
@@ -137,6 +137,8 @@ class Packet(object):
     def __init__(self, a=None, b=None, deep_copy=False):
         self._header = {}
         self._parameters = []
+        self._lazy_packet = None
+        #packet parsed with lazy parameters, see get_parameters
         self._current_node_name = '/'
 
         if a is None:
@@ -146,6 +148,8 @@ class Packet(object):
         if 'header' in a and 'parameters' in a:
             self._header = copy_object(a['header'], deep_copy)
             self._parameters = copy_object(a['parameters'], deep_copy)
+            if self._parameters is None and 'data_field' in a:
+                self._lazy_packet = a
         elif isinstance(a, dict):
             self._header = copy_object(a, deep_copy)
             if isinstance(b, list):
@@ -160,8 +164,21 @@ class Packet(object):
             return length_header - 9 + 16
         return length_header + 1 - 4 + 10
 
+    def get_parameters(self):
+        """
+          Parameters of packets parsed with lazy parameters enabled are decoded
+          when they are accessed for the first time and cached in the packet
+        """
+        if self._parameters is None and self._lazy_packet is not None:
+            #imported here to avoid circular imports
+            from stix.core import stix_parser
+            self._parameters = stix_parser.get_packet_parameters(
+                self._lazy_packet)
+            self._lazy_packet = None
+        return self._parameters
+
     def as_dict(self):
-        return {'header': self._header, 'parameters': self._parameters}
+        return {'header': self._header, 'parameters': self.get_parameters()}
 
     def __str__(self):
         return pprint.pformat(self.as_dict())
@@ -170,7 +187,7 @@ class Packet(object):
         if attr == 'header':
             return self._header
         elif attr == 'parameters':
-            return self._parameters
+            return self.get_parameters()
         elif attr in self._header:
             return self._header['{}'.format(attr)]
         elif attr == 'raw_len':
@@ -187,7 +204,7 @@ class Packet(object):
         if not fields:
             return []
         if not parameters:
-            parameters = self._parameters
+            parameters = self.get_parameters()
         try:
             field = fields.pop(0)
         except IndexError:
@@ -242,7 +259,7 @@ class Packet(object):
         if not fields:
             return []
         if not parameters:
-            parameters = self._parameters
+            parameters = self.get_parameters()
         try:
             field = fields.pop(0)
         except IndexError:
@@ -283,7 +300,7 @@ class Packet(object):
         if isinstance(key, str):
             return self.__getattr__(key)
         elif isinstance(key, int):
-            return Parameter(self._parameters[key])
+            return Parameter(self.get_parameters()[key])
 
     def isa(self, SPIDs):
         if self._header['TMTC'] == 'TC':
@@ -318,10 +335,21 @@ class Packet(object):
             except ValueError:
                 continue
             Packet.merge_headers(result, pkt['header'])
-            Packet.merge_parameters(result, pkt['parameters'], value_type)
+            Packet.merge_parameters(result,
+                                    Packet(pkt).get_parameters(), value_type)
 
         return result
 
+    @staticmethod
+    def merge_columns(table):
+        """
+          Convert a structured array returned by StixTCTMParser.parse_binary_columns
+          to a dictionary as returned by merge(packets, SPID, value_type) for the
+          value type of the columns, except that the values are NumPy arrays and
+          only the header fields in HEADER_COLUMNS are included
+        """
+        return {name: table[name] for name in table.dtype.names}
+
     @staticmethod
     def merge_headers(result, header):
 
@@ -356,7 +384,7 @@ class Packet(object):
 
     def children_as_dict(self, parameter_names=None, children=None):
         if not children:
-            children = self._parameters
+            children = self.get_parameters()
         param_dict = {}
         for e in children:
             param = Parameter(e)
@@ -375,7 +403,7 @@ class Packet(object):
     def index(self, parameter_name):
         #get parameter index
         #only looks for parameters whose depth == 0
-        for i, e in enumerate(self._parameters):
+        for i, e in enumerate(self.get_parameters()):
             if e[0] == parameter_name:
                 return i
         return -1
@@ -383,7 +411,7 @@ class Packet(object):
     def get_one(self, parameter_name, parameters=None):
         #get the first parameter
         if parameters == None:
-            parameters = self._parameters
+            parameters = self.get_parameters()
         for e in parameters:
             if e[0] == parameter_name:
                 return e
@@ -411,7 +439,7 @@ class Packet(object):
 
         """
         if not parameters:
-            parameters = self._parameters
+            parameters = self.get_parameters()
 
         for e in parameters:
             param = Parameter(e)
@@ -2,15 +2,49 @@
 
 import re
 import glob
+import functools
 from datetime import datetime
 from dateutil import parser as dtparser
+from dateutil import tz
 from astropy.time import Time
+import numpy as np
 from stix.core import spice_manager as spm
+from stix.core import stix_sclk
 
 import spiceypy
 from stix.core import stix_logger
 
 
+ISO_UTC_PATTERN = re.compile(
+    r'(\d{4})-(\d\d)-(\d\d)[T ](\d\d):(\d\d):(\d\d)(?:\.(\d{1,6}))?(Z?)$')
+#fixed format of receipt and execution times, e.g. 2020-06-01T10:11:12.000Z
+UTC_CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=UTC_CACHE_SIZE)
+def parse_utc(utc):
+    """
+    parse a UTC string, the result is the same as dtparser.parse(utc).
+    Strings in the ISO format are decoded directly, others are parsed by dateutil.
+    Results are cached as the same timestamps often appear in many lines of a file
+    """
+    match = ISO_UTC_PATTERN.match(utc)
+    if match:
+        year, month, day, hour, minute, second, fraction, zulu = match.groups()
+        try:
+            return datetime(int(year),
+                            int(month),
+                            int(day),
+                            int(hour),
+                            int(minute),
+                            int(second),
+                            int(fraction.ljust(6, '0')) if fraction else 0,
+                            tzinfo=tz.tzutc() if zulu else None)
+        except ValueError:
+            pass
+    return dtparser.parse(utc)
+
+
 def format_datetime(dt):
     if isinstance(dt, datetime):
         return dt.isoformat(timespec='milliseconds')
@@ -38,6 +72,11 @@ def scet2utc(coarse, fine=0):
         if isinstance(coarse, float):
             coarse_int = int(coarse)
         fine_int = int((coarse - coarse_int) * 65536)+fine
+        table = stix_sclk.get_correlation_table()
+        if table is not None:
+            unix_time = table.scet2unix(coarse_int, fine_int)
+            if unix_time is not None:
+                return stix_sclk.unix2utc(unix_time)
 
         return spm.spice.scet2utc(coarse_int, fine_int)
     except spiceypy.utils.support_types.SpiceyError:
@@ -53,7 +92,7 @@ def utc2unix(utc):
         if not utc.endswith('Z'):
             utc += 'Z'
         try:
-            return dtparser.parse(utc).timestamp()
+            return parse_utc(utc).timestamp()
         except:
             return 0
     elif isinstance(utc, int) or isinstance(utc, float):
@@ -62,6 +101,37 @@ def utc2unix(utc):
         return 0
 
 
+def utc2unix_array(utcs):
+    """
+    convert a list of UTC strings to unix times, as utc2unix does for each of them.
+    Strings in the ISO format are parsed by NumPy in one call
+    Returns:
+        NumPy array of unix times
+    """
+    unix_times = np.zeros(len(utcs))
+    indexes = [
+        i for i, utc in enumerate(utcs)
+        if isinstance(utc, str) and ISO_UTC_PATTERN.match(utc)
+    ]
+    try:
+        times = np.array([utcs[i].rstrip('Z') for i in indexes],
+                         dtype='datetime64[us]')
+        microseconds = times.astype(np.int64)
+        unix_times[indexes] = microseconds / 10**6
+        #times more than 285 years away from 1970 can't be converted exactly,
+        #they are converted by utc2unix, which also rejects the year 0
+        exact = np.abs(microseconds) < 2**53
+        others = set(range(len(utcs))) - {
+            i for i, is_exact in zip(indexes, exact) if is_exact
+        }
+    except ValueError:
+        #invalid dates
+        others = range(len(utcs))
+    for i in others:
+        unix_times[i] = utc2unix(utcs[i])
+    return unix_times
+
+
 def unix2datetime(timestamp):
     dt = None
     if isinstance(timestamp, float):
@@ -95,13 +165,43 @@ def datetime2unix(timestamp):
 
 
 def scet2unix(coarse, fine=0):
+    table = stix_sclk.get_correlation_table()
+    if table is not None and isinstance(coarse, (int, np.integer)):
+        unix_time = table.scet2unix(coarse, fine)
+        if unix_time is not None:
+            return stix_sclk.round_unix_time(unix_time)
     try:
-        utc = scet2utc(coarse, fine)
-        return utc2unix(utc)
+        #not through UTC strings, which can't be parsed during leap seconds
+        return stix_sclk.round_unix_time(stix_sclk.spice_scet2unix(coarse, fine))
     except spiceypy.utils.support_types.SpiceyError:
         return 0
 
 
+def scet2unix_array(coarse, fine):
+    """
+    convert arrays of coarse and fine times to unix times, rounded to milliseconds
+    as scet2unix does. SPICE is only called for times not covered by the SCLK table
+    """
+    coarse = np.asarray(coarse, dtype=np.int64)
+    fine = np.asarray(fine, dtype=np.int64)
+    table = stix_sclk.get_correlation_table()
+    if table is None:
+        unix_times = np.full(coarse.shape, np.nan)
+    else:
+        unix_times = np.round(table.scet2unix_array(coarse, fine) * 1000) / 1000
+    for i in np.flatnonzero(np.isnan(unix_times)):
+        unix_times[i] = scet2unix(int(coarse[i]), int(fine[i]))
+    return unix_times
+
+
+def scet_to_datetimes(coarse, fine):
+    """ convert arrays of coarse and fine times to a list of datetime objects,
+    the vectorized version of scet_to_datetime
+    """
+    milliseconds = np.round(scet2unix_array(coarse, fine) * 1000).astype(np.int64)
+    return milliseconds.astype('datetime64[ms]').astype(object).tolist()
+
+
 def unix2utc(ts):
     return datetime.utcfromtimestamp(ts).isoformat(timespec='milliseconds')
 
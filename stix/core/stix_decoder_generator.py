@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# @title        : stix_decoder_generator.py
+# @description:
+#               generator of specialized decoders of variable length telemetry packets.
+#               The parse tree of a SPID is turned into python source code, in which the
+#               offset arithmetic of each parameter is written out and repeaters are
+#               plain for loops. The source is cached on disk, next to the IDB, in files
+#               named after the IDB version and the SPID. The first line of a cached file is the
+#               digest of the source, files which don't match it are generated again:
+#                   decode = get_decoder(spid, tree, decompressor, idb)
+#                   num_read, parameters = decode(parser, data_field)
+#               The decoders give the same results as StixVariableTelemetryPacketParser.walk
+import os
+import re
+import hashlib
+import struct as st
+from stix.core import stix_idb
+from stix.core import stix_logger
+from stix.core import stix_decompressor
+
+logger = stix_logger.get_logger()
+STIX_IDB = stix_idb.stix_idb()
+
+GENERATOR_VERSION = 2
+#to be increased when the generated code changes
+DECODER_CACHE_DIRECTORY = 'decoders'
+GENERATED_DECODER_SPIDS = [
+    54110, 54111, 54112, 54113, 54114, 54115, 54116, 54117, 54118, 54119,
+    54120, 54121, 54122, 54123, 54124, 54125, 54142, 54143
+]
+#science data and quick-look packets, which dominate the telemetry volume
+SOURCE_DIGEST_PREFIX = '# sha256 '
+#first line of cached decoders, followed by the digest of the rest of the source
+UNSIGNED_UNPACK_FUNCTIONS = {
+    16: st.Struct('>H').unpack_from,
+    32: st.Struct('>I').unpack_from
+}
+
+
+class StopDecoding(Exception):
+    """ raised by generated decoders when the end of the buffer is reached """
+    pass
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, IndexError, ValueError):
+        return None
+
+
+def get_compressed_parameter_names():
+    """
+    names of the parameters the decompressor may change, i.e.
+    SKM parameters and compressed parameters of all schemas
+    """
+    names = set()
+    for group in stix_decompressor.SKM_GROUPS.values():
+        names.update(group)
+    for schema in stix_decompressor.SCHEMAS.values():
+        names.update(schema['parameters'].keys())
+    return names
+
+
+class DecoderSourceWriter(object):
+    """ python source code of the decoder of a SPID """
+    def __init__(self, get_parameter_type, compressed_names):
+        self.get_parameter_type = get_parameter_type
+        self.compressed_names = compressed_names
+        self.lines = []
+
+    def write(self, indent, line):
+        self.lines.append('    ' * indent + line)
+
+    def write_nodes(self, nodes, parameters, indent, level):
+        """
+        write the code decoding nodes of a parse tree, see StixVariableTelemetryPacketParser.walk
+        Parameters:
+            nodes: nodes, see stix_parser.freeze_parse_tree
+            parameters: name of the list to which decoded parameters are appended
+            indent: indentation level
+            level: repeater level
+        """
+        for name, args, children in nodes:
+            offset_bits, width, ptc, pfc, cal_ref, calibration_enabled = args
+            param_type = self.get_parameter_type(ptc, pfc)
+            self.write(indent, 'if current_offset > len_buf:')
+            self.write(indent + 1, 'raise StopDecoding')
+            if width % 8 != 0:
+                if offset_bits < 0:
+                    self.write(
+                        indent, 'current_offset_bit = last_data_width - {}'.
+                        format(-offset_bits))
+                else:
+                    self.write(
+                        indent,
+                        'current_offset_bit += last_num_bits + {}'.format(
+                            offset_bits))
+                self.write(indent, 'last_num_bits = {}'.format(width))
+                generic = 'decode_buffer(buf, {!r}, last_offset, current_offset_bit, {}, {!r})'.format(
+                    param_type, width, name)
+                if param_type == 'U' and width < 16:
+                    #bits sliced from an integer of at most 4 bytes, see decode_buffer
+                    self.write(
+                        indent,
+                        'num_bytes = (current_offset_bit + {}) // 8'.format(
+                            width + 7))
+                    self.write(
+                        indent,
+                        'if 0 <= current_offset_bit and 0 < num_bytes <= 4 and last_offset + num_bytes <= len_buf:'
+                    )
+                    self.write(
+                        indent + 1,
+                        'raw = (int.from_bytes(buf[last_offset:last_offset + num_bytes], \'big\') >> (num_bytes * 8 - current_offset_bit - {})) & {}'
+                        .format(width, (1 << width) - 1))
+                    self.write(indent, 'else:')
+                    self.write(indent + 1, 'raw = {}'.format(generic))
+                else:
+                    self.write(indent, 'raw = {}'.format(generic))
+            else:
+                self.write(indent, 'current_offset_bit = 0')
+                self.write(indent, 'last_offset = current_offset')
+                self.write(indent,
+                           'current_offset += {}'.format(width // 8))
+                self.write(indent, 'last_num_bits = 0')
+                self.write(indent, 'last_data_width = {}'.format(width))
+                generic = 'decode_buffer(buf, {!r}, last_offset, 0, {}, {!r})'.format(
+                    param_type, width, name)
+                if param_type == 'U' and width == 8:
+                    self.write(
+                        indent,
+                        'raw = buf[last_offset] if current_offset <= len_buf else {}'
+                        .format(generic))
+                elif param_type == 'U' and width in UNSIGNED_UNPACK_FUNCTIONS:
+                    self.write(
+                        indent,
+                        'raw = unpack_uint{}(buf, last_offset)[0] if current_offset <= len_buf else {}'
+                        .format(width, generic))
+                else:
+                    self.write(indent, 'raw = {}'.format(generic))
+
+            if calibration_enabled:
+                self.write(
+                    indent,
+                    'eng = raw_to_eng({!r}, {!r}, raw, \'TM\')'.format(
+                        name, cal_ref))
+            else:
+                self.write(indent, 'eng = \'\'')
+            if name in self.compressed_names:
+                self.write(indent, 'if raw != \'\':')
+                self.write(indent + 1, 'try:')
+                self.write(
+                    indent + 2,
+                    'result = decompress_raw({!r}, int(raw))'.format(name))
+                self.write(indent + 2, 'if result is not None:')
+                self.write(indent + 3, 'eng = result')
+                self.write(indent + 1, 'except (TypeError, ValueError):')
+                self.write(indent + 2, 'pass')
+
+            if not children:
+                self.write(
+                    indent,
+                    '{}.append(({!r}, raw, eng, []))'.format(parameters, name))
+                continue
+            #the repeater is appended before its children are decoded,
+            #so that it is kept if decoding stops in the middle
+            children_name = 'children_{}'.format(level)
+            counter_name = 'counter_{}'.format(level)
+            self.write(indent, '{} = []'.format(children_name))
+            self.write(
+                indent, '{}.append(({!r}, raw, eng, {}))'.format(
+                    parameters, name, children_name))
+            self.write(indent, '{} = to_int(raw)'.format(counter_name))
+            self.write(
+                indent, 'if isinstance({0}, int) and {0} > 0:'.format(
+                    counter_name))
+            self.write(indent + 1, 'for _ in range({}):'.format(counter_name))
+            self.write_nodes(children, children_name, indent + 2, level + 1)
+            if name != 'NIXD0159':
+                #repeater NIXD0159 can be zero according to STIX ICD-0812-ESC Table 93 P123
+                self.write(indent, 'else:')
+                self.write(
+                    indent + 1,
+                    'logger.warning(\'Repeater {{}}  has an invalid value: {{}}\', {!r}, raw)'
+                    .format(name))
+
+    def get_source(self, spid, tree, idb_version):
+        self.lines = [
+            '# decoder of variable length telemetry packets, SPID {}, IDB {}'.
+            format(spid, idb_version),
+            '# generated by stix_decoder_generator version {}'.format(
+                GENERATOR_VERSION), '', '',
+            'def decode(parser, buf):'
+        ]
+        for line in [
+                'decode_buffer = parser.decode_buffer',
+                'raw_to_eng = parser.raw_to_eng', 'len_buf = len(buf)',
+                'parameters = []', 'current_offset = 0', 'last_offset = 0',
+                'current_offset_bit = 0', 'last_num_bits = 0',
+                'last_data_width = 0', 'try:'
+        ]:
+            self.write(1, line)
+        self.write_nodes(tree, 'parameters', 2, 0)
+        self.write(1, 'except StopDecoding:')
+        self.write(2, 'pass')
+        self.write(1, 'return current_offset, parameters')
+        return '\n'.join(self.lines) + '\n'
+
+
+def generate_source(spid, tree, idb_version=None, idb=None):
+    """
+    Generate the source code of the decoder of a variable length telemetry packet
+    Parameters:
+        spid: SPID
+        tree: parse tree, see StixVariableTelemetryPacketParser.get_parse_tree
+        idb_version: IDB version, only written in the header of the source
+        idb: IDB of the parse tree, the default IDB if None
+    Returns:
+        python source code defining the function decode(parser, buf),
+        which returns the number of bytes read and the parameters
+    """
+    if idb is None:
+        idb = STIX_IDB
+    writer = DecoderSourceWriter(idb.get_s2k_parameter_types,
+                                 get_compressed_parameter_names())
+    return writer.get_source(spid, tree, idb_version)
+
+
+def get_cache_filename(spid, tree, idb_version, idb=None):
+    """
+    Cache file of a decoder. The file name contains the IDB version, the SPID, and
+    a digest of the parse tree and of the decompression parameters
+    """
+    if idb is None:
+        idb = STIX_IDB
+    key = repr((GENERATOR_VERSION, tree,
+                sorted(get_compressed_parameter_names())))
+    digest = hashlib.shake_256(key.encode()).hexdigest(6)
+    version = re.sub(r'[^\w.-]', '_', str(idb_version))
+    return os.path.join(
+        os.path.dirname(idb.get_idb_filename()), DECODER_CACHE_DIRECTORY,
+        'idb_{}_spid_{}_{}.py'.format(version, spid, digest))
+
+
+def get_source_digest(source):
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def load_source(filename):
+    """
+    Load a cached decoder
+    Returns:
+        source code, None if the file doesn't exist or doesn't match its digest
+    """
+    try:
+        with open(filename) as fin:
+            digest_line, _, source = fin.read().partition('\n')
+    except (OSError, UnicodeDecodeError):
+        return None
+    if digest_line != SOURCE_DIGEST_PREFIX + get_source_digest(source):
+        logger.warning('Decoder {} does not match its digest, it is generated again',
+                       filename)
+        return None
+    return source
+
+
+def save_source(filename, source):
+    tmp_filename = '{}.{}.tmp'.format(filename, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(tmp_filename, 'w') as fout:
+            fout.write(SOURCE_DIGEST_PREFIX + get_source_digest(source) + '\n')
+            fout.write(source)
+        os.replace(tmp_filename, filename)
+    except OSError as e:
+        logger.warning('Failed to save decoder {}: {}', filename, e)
+
+
+def compile_decoder(source, filename, decompressor):
+    namespace = {
+        'StopDecoding': StopDecoding,
+        'to_int': to_int,
+        'logger': logger,
+        'decompress_raw': decompressor.decompress_raw,
+        'unpack_uint16': UNSIGNED_UNPACK_FUNCTIONS[16],
+        'unpack_uint32': UNSIGNED_UNPACK_FUNCTIONS[32]
+    }
+    exec(compile(source, filename, 'exec'), namespace)
+    return namespace['decode']
+
+
+def get_decoder(spid, tree, decompressor, idb=None):
+    """
+    Get the decoder of a variable length telemetry packet. The source code is loaded
+    from the cache if it exists and matches its digest, otherwise it is generated and saved
+    Parameters:
+        spid: SPID
+        tree: parse tree, see StixVariableTelemetryPacketParser.get_parse_tree
+        decompressor: StixDecompressor used by the parser
+        idb: IDB of the parse tree, the default IDB if None
+    Returns:
+        decoder, or None if it can not be created
+    """
+    if idb is None:
+        idb = STIX_IDB
+    idb_version = idb.get_idb_version()
+    filename = get_cache_filename(spid, tree, idb_version, idb)
+    source = load_source(filename)
+    if source is not None:
+        try:
+            return compile_decoder(source, filename, decompressor)
+        except (SyntaxError, KeyError) as e:
+            logger.warning('Invalid decoder {}: {}', filename, e)
+    source = generate_source(spid, tree, idb_version, idb)
+    try:
+        decoder = compile_decoder(source, filename, decompressor)
+    except (SyntaxError, RecursionError) as e:
+        logger.warning('Failed to generate the decoder of SPID {}: {}', spid, e)
+        return None
+    save_source(filename, source)
+    return decoder
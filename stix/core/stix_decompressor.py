@@ -4,12 +4,10 @@
 # @description:
 #               decompression of compressed parameters
 from stix.core import stix_logger
+from stix.core import skm_codec
 
 logger = stix_logger.get_logger()
 
-MAX_STORED_INTEGER = 1e8
-#numbers greater than this value will be converted to float type
-
 SKM_GROUPS = {
     'EACC': ("NIXD0007", "NIXD0008", "NIXD0009"),
     'ETRIG': ("NIXD0010", "NIXD0011", "NIXD0012"),
@@ -292,36 +290,14 @@ def decompress(x, S, K, M):
     decompress x 
     S, K, M
     """
-    if S + K + M > 8 or S not in (0, 1) or K > 7 or M > 7:
-        logger.warning('Invalid SKM values: {}{}{}'.format(S, K, M))
-        return None
-    if K == 0 or M == 0:
+    table = skm_codec.get_parameter_lookup_table(S, K, M)
+    if table is None:
         return None
-
-    sign = 1
-    if S == 1:  #signed
-        MSB = x & (1 << 7)
-        if MSB != 0:
-            sign = -1
-        x = x & ((1 << 7) - 1)
-
-    x0 = 1 << (M + 1)
-    if x < x0:
-        return x
-    mask1 = (1 << M) - 1
-    mask2 = (1 << M)
-    mantissa1 = x & mask1
-    exponent = (x >> M) - 1
-    # number of shifted bits
-    mantissa2 = mask2 | mantissa1  #add 1 before mantissa
-    low = mantissa2 << exponent  #minimal possible value
-    high = low | ((1 << exponent) - 1)  #maximal possible value
-    mean = (low + high) >> 1  #mean value
-
-    if mean > MAX_STORED_INTEGER:
-        return float(mean)
-
-    return sign * mean
+    try:
+        return table[x]
+    except (IndexError, TypeError):
+        logger.warning('Invalid compressed value: {}', x)
+    return None
 
 
 class StixDecompressor(object):
@@ -351,16 +327,14 @@ class StixDecompressor(object):
         self.compressed_parameter_names = []
         if spid not in SCHEMAS:
             self.compressed = False
-            logger.warning(
-                'A compressed packet (SPID {}) is not decompressed'.format(
-                    spid))
+            logger.warning('A compressed packet (SPID {}) is not decompressed',
+                           spid)
             return
         try:
             self.schema = SCHEMAS[spid]
         except KeyError:
-            logger.warning(
-                'A compressed packet (SPID {}) is not decompressed'.format(
-                    spid))
+            logger.warning('A compressed packet (SPID {}) is not decompressed',
+                           spid)
             self.compressed = False
             return
 
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# @title        : stix_dedup.py
+# @description:
+#               persistent index of the hashes of ingested packets (packet['hash']).
+#               The same packet may be delivered in several files (MOC ascii, EDDS xml,
+#               re-deliveries). Writers check the index, and confirm that a packet with the same
+#               hash and header is stored before skipping it, see StixPacketWriter.is_duplicate:
+#                   index = get_index('/data/packet_hashes.npy')
+#                   if packet['hash'] in index and is_stored(packet):
+#                       #packet already ingested
+#                   else:
+#                       insert(packet)
+#                       index.add(packet['hash'])
+#                   index.save()
+#               Hashes are stored as a sorted array of unsigned 64-bit integers, which is
+#               memory mapped and searched by bisection, so the file isn't read in memory.
+#               New hashes are kept in a set until save is called.
+import os
+import argparse
+import contextlib
+import numpy as np
+from stix.core import stix_logger
+try:
+    import fcntl
+except ImportError:
+    #not available on Windows, saves are not serialized
+    fcntl = None
+
+logger = stix_logger.get_logger()
+
+HASH_DTYPE = np.uint64
+INDEXES = {}
+#filename: StixPacketHashIndex
+LOCK_FILE_SUFFIX = '.lock'
+
+
+def hash_to_int(packet_hash):
+    """ packet hash, a hex string or bytes of 16 digits, to integer """
+    return int(packet_hash, 16)
+
+
+class StixPacketHashIndex(object):
+    """ set of packet hashes stored in a NumPy file """
+    def __init__(self, filename):
+        self.filename = filename
+        self.hashes = np.zeros(0, dtype=HASH_DTYPE)
+        self.new_hashes = set()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.filename):
+            return
+        try:
+            self.hashes = np.load(self.filename, mmap_mode='r')
+        except (OSError, ValueError) as e:
+            logger.warning('Failed to load packet hashes {}: {}', self.filename, e)
+
+    def __len__(self):
+        return len(self.hashes) + len(self.new_hashes)
+
+    def contains_int(self, value):
+        if value in self.new_hashes:
+            return True
+        i = np.searchsorted(self.hashes, HASH_DTYPE(value))
+        return i < len(self.hashes) and int(self.hashes[i]) == value
+
+    def __contains__(self, packet_hash):
+        return self.contains_int(hash_to_int(packet_hash))
+
+    def add(self, packet_hash):
+        """
+        add a hash to the index
+        Returns:
+            True if the hash is new, False if it is already in the index
+        """
+        value = hash_to_int(packet_hash)
+        if self.contains_int(value):
+            return False
+        self.new_hashes.add(value)
+        return True
+
+    def update(self, packet_hashes):
+        """ add hashes, e.g. the hash column of a packet index
+        Returns:
+            the number of new hashes
+        """
+        values = np.unique(
+            np.array([hash_to_int(x) for x in packet_hashes],
+                     dtype=HASH_DTYPE))
+        values = values[~np.isin(values, self.hashes, assume_unique=True)]
+        num_before = len(self.new_hashes)
+        self.new_hashes.update(values.tolist())
+        return len(self.new_hashes) - num_before
+
+    @contextlib.contextmanager
+    def lock(self):
+        """ exclusive lock of the index file, held by one process or thread at a time """
+        os.makedirs(os.path.dirname(os.path.abspath(self.filename)),
+                    exist_ok=True)
+        with open(self.filename + LOCK_FILE_SUFFIX, 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def save(self):
+        """
+        merge the new hashes into the file. The file is locked while it is loaded,
+        merged and replaced, so that hashes saved by other processes are kept
+        """
+        if not self.new_hashes:
+            return
+        saved = set(self.new_hashes)
+        new_hashes = np.array(sorted(saved), dtype=HASH_DTYPE)
+        try:
+            with self.lock():
+                self.load()
+                hashes = np.union1d(self.hashes, new_hashes)
+                tmp_filename = '{}.{}.{}.tmp.npy'.format(
+                    self.filename, os.getpid(), id(self))
+                np.save(tmp_filename, hashes)
+                os.replace(tmp_filename, self.filename)
+        except OSError as e:
+            logger.error('Failed to save packet hashes {}: {}', self.filename,
+                         e)
+            return
+        self.load()
+        self.new_hashes -= saved
+        #hashes added while saving are kept for the next save
+        logger.info('{} packet hashes saved to {}', len(hashes), self.filename)
+
+
+def get_index(filename):
+    """ packet hash index of a file, loaded once per process """
+    try:
+        return INDEXES[filename]
+    except KeyError:
+        index = StixPacketHashIndex(filename)
+        INDEXES[filename] = index
+        return index
+
+
+def import_from_mongodb(index, collection):
+    """ add the hashes of the packets in a MongoDB collection
+    Returns:
+        the number of new hashes
+    """
+    return index.update(doc['hash']
+                        for doc in collection.find({'hash': {
+                            '$exists': True
+                        }}, {'hash': 1}))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description='Add the hashes of already ingested packets to a packet hash index')
+    arg_parser.add_argument('index', help='packet hash index file (.npy)')
+    arg_parser.add_argument('files',
+                            nargs='*',
+                            help='raw data files, hashes are read from their packet index')
+    arg_parser.add_argument('--mongodb',
+                            action='store_true',
+                            help='import the hashes of the packets in MongoDB')
+    args = arg_parser.parse_args()
+    from stix.core import stix_packet_index
+    index = get_index(args.index)
+    for filename in args.files:
+        packet_index, _ = stix_packet_index.get_index(filename)
+        if packet_index is not None:
+            logger.info('{}: {} new hashes', filename, index.update(packet_index['hash']))
+    if args.mongodb:
+        from stix.core import stix_writer
+        writer = stix_writer.StixMongoDBWriter()
+        logger.info('MongoDB: {} new hashes',
+                    import_from_mongodb(index, writer.collection_packets))
+    index.save()
+
+
+if __name__ == '__main__':
+    main()
@@ -6,8 +6,14 @@
 # @author       : Hualin Xiao
 # @date         : Feb. 15, 2019
 import os
+import pathlib
 import sqlite3
+import pickle
+import hashlib
+import argparse
+import itertools
 import threading
+from collections import OrderedDict
 from stix.core import config
 
 from stix.core import stix_logger
@@ -30,7 +36,32 @@ def find_idb(filename):
     return None
 
 
-LOCK = threading.Lock()
+LOCK = threading.RLock()
+#protects the creation of the instance and the list of connections,
+#queries are not serialized, each thread has its own read-only connection
+SNAPSHOT_FILE_SUFFIX = '.snapshot'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_TABLES = [
+    'parameter_structures', 'parameter_units', 'calibration_polynomial',
+    'calibration_curves', 'parameter_descriptions', 's2k_table_contents',
+    'packet_type_offsets', 'packet_type_infos', 'telecommand_infos',
+    'telecommand_structures', 'variable_telecommands', 'textual_calibrations',
+    'telecommand_textual_calibrations'
+]
+#lookup tables saved in IDB snapshots
+MAX_RESIDENT_IDBS = 3
+#number of IDBs kept in memory in addition to the default one, see get_idb
+RESIDENT_IDBS = OrderedDict()
+#IDBs by file name, the least recently used first
+GENERATIONS = itertools.count(1)
+
+
+def get_file_hash(filename):
+    sha = hashlib.sha256()
+    with open(filename, 'rb') as fin:
+        for block in iter(lambda: fin.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
 
 
 class _IDB(object):
@@ -39,28 +70,22 @@ class _IDB(object):
     @staticmethod
     def get_instance(filename):
         if not _IDB.__instance:
-            _IDB(filename)
+            with LOCK:
+                if not _IDB.__instance:
+                    _IDB.__instance = _IDB(filename)
         return _IDB.__instance
 
-    #singleton
-    #make sure only one instance is created
+    #the default IDB is a singleton, see stix_idb
+    #other IDBs are loaded in their own instances, see get_idb
     def __init__(self, filename='', utc=None):
-        if _IDB.__instance:
-            logger.warning('IDB already initialized')
-            pass
-        else:
-            _IDB.__instance = self
         self.conn = None
         self.cur = None
-        #below are look-up tables in order to reduce db query time
-        self.parameter_structures = dict()
-        self.parameter_units = dict()
-        self.calibration_polynomial = dict()
-        self.calibration_curves = dict()
-        self.textual_parameter_lut = dict()
-        self.soc_descriptions = dict()
-        self.parameter_descriptions = dict()
-        self.s2k_table_contents = dict()
+        self.connections = dict()
+        #connections of threads, by thread identifier
+        self.generation = 0
+        #identifies the connected IDB in thread-local cursors
+        self.local = threading.local()
+        self.init_lookup_tables()
 
         self.filename = filename
         if self.filename == "":
@@ -73,42 +98,248 @@ class _IDB(object):
         if self.filename:
             self.connect_database(self.filename)
 
+    def init_lookup_tables(self):
+        #below are look-up tables in order to reduce db query time
+        self.parameter_structures = dict()
+        self.parameter_units = dict()
+        self.calibration_polynomial = dict()
+        self.calibration_curves = dict()
+        self.textual_parameter_lut = dict()
+        self.soc_descriptions = dict()
+        self.parameter_descriptions = dict()
+        self.s2k_table_contents = dict()
+        self.packet_type_offsets = dict()
+        self.packet_type_infos = dict()
+        self.telecommand_infos = dict()
+        #PIC, PID and CCF tables, loaded when the IDB is connected
+        self.telecommand_structures = dict()
+        self.variable_telecommands = dict()
+        self.textual_calibrations = dict()
+        self.telecommand_textual_calibrations = dict()
+        self.idb_version = None
+
     def is_connected(self):
         if self.cur:
             return True
         return False
 
     def reload(self, filename):
+        """
+        Load another IDB in place of this one. All the modules using this IDB are affected,
+        parsers selecting IDBs by packet time use separate instances instead, see get_idb
+        """
         if filename == self.filename:
             logger.info('IDB already loaded')
             return
-        self.filename = filename
-        self.close()
-        self.parameter_structures = dict()
-        self.calibration_polynomial = dict()
-        self.calibration_curves = dict()
-        self.textual_parameter_lut = dict()
-        self.soc_descriptions = dict()
-        self.parameter_descriptions = dict()
-        self.s2k_table_contents = dict()
-        if self.filename:
-            self.connect_database(self.filename)
+        with LOCK:
+            self.close()
+            self.filename = filename
+            self.conn = None
+            self.cur = None
+            self.init_lookup_tables()
+            if self.filename:
+                self.connect_database(self.filename)
 
     def get_idb_filename(self):
         return os.path.abspath(self.filename)
 
     def connect_database(self, filename):
         self.filename = filename
+        self.generation = next(GENERATIONS)
         try:
-            self.conn = sqlite3.connect(filename, check_same_thread=False)
-            logger.info('IDB loaded from {}'.format(filename))
-            self.cur = self.conn.cursor()
+            self.cur = self.open_connection()
+            self.conn = self.cur.connection
+            logger.info('IDB loaded from {}', filename)
         except sqlite3.Error:
-            logger.error('Failed load IDB from {}'.format(filename))
+            logger.error('Failed load IDB from {}', filename)
+            return
+        if self.load_snapshot():
+            return
+        if os.path.exists(self.get_snapshot_filename()):
+            #the snapshot of another IDB file or version is built again, never used
+            try:
+                self.create_snapshot()
+                return
+            except (OSError, sqlite3.Error) as e:
+                logger.warning('Failed to rebuild IDB snapshot {}: {}',
+                               self.get_snapshot_filename(), e)
+        self.load_packet_type_tables()
+
+    def get_snapshot_filename(self):
+        return self.filename + SNAPSHOT_FILE_SUFFIX
+
+    def load_snapshot(self):
+        """
+        Fill the lookup tables with the content of the snapshot of the IDB,
+        see create_snapshot. The snapshot is rejected if it was created from another IDB file
+        or with another SNAPSHOT_VERSION, connect_database then builds it again
+        Returns:
+            True if the snapshot is loaded
+        """
+        snapshot_filename = self.get_snapshot_filename()
+        if not os.path.exists(snapshot_filename):
+            return False
+        try:
+            with open(snapshot_filename, 'rb') as fin:
+                snapshot = pickle.load(fin)
+            if (snapshot['snapshot_version'] != SNAPSHOT_VERSION
+                    or snapshot['idb_hash'] != get_file_hash(self.filename)):
+                logger.info('IDB snapshot {} is outdated', snapshot_filename)
+                return False
+            tables = {name: snapshot['tables'][name] for name in SNAPSHOT_TABLES}
+            for name, table in tables.items():
+                setattr(self, name, table)
+            self.idb_version = snapshot['idb_version']
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError,
+                TypeError, AttributeError) as e:
+            logger.warning('Failed to load IDB snapshot {}: {}', snapshot_filename, e)
+            self.init_lookup_tables()
+            return False
+        logger.info('IDB snapshot loaded from {}', snapshot_filename)
+        return True
+
+    def create_snapshot(self):
+        """
+        Query all the packet structures, parameter types, calibrations
+        and telecommand structures, and save the lookup tables in a snapshot file next to the IDB.
+        Processes loading the IDB afterwards use the snapshot instead of querying the IDB
+        Returns:
+            snapshot file name
+        """
+        self.load_packet_type_tables()
+        for ptc, pfc in self.execute(
+                'select distinct PCF_PTC, PCF_PFC from PCF union '
+                'select distinct CPC_PTC, CPC_PFC from CPC'):
+            try:
+                self.get_s2k_parameter_types(ptc, pfc)
+            except IndexError:
+                #parameter type not defined
+                pass
+        for spid, tpsd in self.execute(
+                'select distinct PID_SPID, PID_TPSD from PID'):
+            if tpsd == -1:
+                self.get_fixed_packet_structure(spid)
+            else:
+                self.get_variable_packet_structure(spid)
+        self.get_parameter_unit('')
+        for name, in self.execute('select PCF_NAME from PCF union '
+                                  'select CPC_PNAME from CPC'):
+            self.get_parameter_description(name)
+        for ref, in self.execute('select distinct CAP_NUMBR from CAP'):
+            self.get_calibration_curve(ref)
+        for ref, in self.execute('select distinct MCF_IDENT from MCF'):
+            self.get_calibration_polynomial(ref)
+        for ref, in self.execute('select distinct TXP_NUMBR from TXP'):
+            self.get_textual_calibration(ref)
+        for ref, in self.execute('select distinct PAS_NUMBR from PAS'):
+            self.get_telecommand_textual_calibration(ref)
+        for name, in self.execute('select distinct CCF_CNAME from CCF'):
+            self.get_telecommand_structure(name)
+            self.is_variable_length_telecommand(name)
+
+        snapshot = {
+            'snapshot_version': SNAPSHOT_VERSION,
+            'idb_hash': get_file_hash(self.filename),
+            'idb_version': self.get_idb_version(),
+            'tables': {name: getattr(self, name)
+                       for name in SNAPSHOT_TABLES}
+        }
+        snapshot_filename = self.get_snapshot_filename()
+        tmp_filename = '{}.{}.tmp'.format(snapshot_filename, os.getpid())
+        with open(tmp_filename, 'wb') as fout:
+            pickle.dump(snapshot, fout, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_filename, snapshot_filename)
+        logger.info('IDB snapshot saved to {}', snapshot_filename)
+        return snapshot_filename
+
+    def load_packet_type_tables(self):
+        """
+        Load the tables used to identify packets (PIC, PID and CCF) into dictionaries,
+        so that identifying a packet doesn't need any query.
+        The first row of a key is kept, as a query with 'limit 1' would return
+        """
+        packet_type_offsets = dict()
+        packet_type_infos = dict()
+        telecommand_infos = dict()
+        try:
+            rows = self.execute(
+                'select PIC_TYPE, PIC_STYPE, PIC_PI1_OFF, PIC_PI1_WID from PIC'
+            )
+            for row in rows:
+                packet_type_offsets.setdefault((row[0], row[1]),
+                                               (row[2], row[3]))
+            rows = self.execute(
+                'select PID_TYPE, PID_STYPE, PID_PI1_VAL, PID_SPID, PID_DESCR, PID_TPSD from PID'
+            )
+            for row in rows:
+                info = {
+                    'PID_SPID': row[3],
+                    'PID_DESCR': row[4],
+                    'PID_TPSD': row[5]
+                }
+                packet_type_infos.setdefault((row[0], row[1], row[2]), info)
+                packet_type_infos.setdefault((row[0], row[1], -1), info)
+            rows = self.execute(
+                'select CCF_TYPE, CCF_STYPE, CCF_CNAME, CCF_DESCR, CCF_DESCR2, '
+                ' CCF_NPARS from CCF order by CCF_CNAME asc')
+            for row in rows:
+                telecommand_infos.setdefault((row[0], row[1]), []).append({
+                    'CCF_CNAME': row[2],
+                    'CCF_DESCR': row[3],
+                    'CCF_DESCR2': row[4],
+                    'CCF_NPARS': row[5]
+                })
+        except sqlite3.Error as e:
+            logger.error('Failed to load packet type tables from {}: {}', self.filename, e)
+        #tables are replaced once complete, threads never see partially filled tables
+        self.packet_type_offsets = packet_type_offsets
+        self.packet_type_infos = packet_type_infos
+        self.telecommand_infos = telecommand_infos
+
+    def open_connection(self):
+        """
+        open a read-only connection used by the current thread
+        Returns:
+            cursor
+        """
+        uri = pathlib.Path(os.path.abspath(
+            self.filename)).as_uri() + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        #check_same_thread=False, so that connections can be closed by another thread
+        with LOCK:
+            alive = {thread.ident for thread in threading.enumerate()}
+            for ident in list(self.connections.keys()):
+                if ident not in alive or ident == threading.get_ident():
+                    #connections of finished threads or outdated connections
+                    self.connections.pop(ident).close()
+            self.connections[threading.get_ident()] = conn
+        cursor = conn.cursor()
+        cursors = self.get_thread_cursors()
+        cursors.clear()
+        #cursors of IDBs closed by reload
+        cursors[self.generation] = cursor
+        return cursor
+
+    def get_thread_cursors(self):
+        """ cursors of the current thread, by IDB generation """
+        try:
+            return self.local.cursors
+        except AttributeError:
+            self.local.cursors = dict()
+            return self.local.cursors
+
+    def get_cursor(self):
+        """ cursor of the connection of the current thread """
+        try:
+            return self.get_thread_cursors()[self.generation]
+        except KeyError:
+            return self.open_connection()
 
     def close(self):
-        if self.conn:
-            self.conn.close()
+        with LOCK:
+            for conn in self.connections.values():
+                conn.close()
+            self.connections = dict()
 
     def execute(self, sql, arguments=None, result_type='list'):
         """
@@ -119,26 +350,19 @@ class _IDB(object):
 
         else:
             rows = None
-
-            try:
-                LOCK.acquire(True)
-                #sqlite doesn't like multi-threads
-
-                if arguments:
-                    self.cur.execute(sql, arguments)
-                else:
-                    self.cur.execute(sql)
-                if result_type == 'list':
-                    rows = self.cur.fetchall()
-                else:
-                    rows = [
-                        dict(
-                            zip([column[0]
-                                 for column in self.cur.description], row))
-                        for row in self.cur.fetchall()
-                    ]
-            finally:
-                LOCK.release()
+            cursor = self.get_cursor()
+            if arguments:
+                cursor.execute(sql, arguments)
+            else:
+                cursor.execute(sql)
+            if result_type == 'list':
+                rows = cursor.fetchall()
+            else:
+                rows = [
+                    dict(
+                        zip([column[0] for column in cursor.description],
+                            row)) for row in cursor.fetchall()
+                ]
             return rows
 
     def get_spid_info(self, spid):
@@ -154,16 +378,17 @@ class _IDB(object):
 
     def get_scos_description(self, name):
         """ get scos long description """
-        if name in self.soc_descriptions:
+        try:
             return self.soc_descriptions[name]
-        else:
-            rows = self.execute(
-                'select SW_DESCR from sw_para where scos_name=? ', (name, ))
-            if rows:
-                res = rows[0][0]
-                self.soc_descriptions[name] = res
-                return res
-            return ''
+        except KeyError:
+            pass
+        rows = self.execute(
+            'select SW_DESCR from sw_para where scos_name=? ', (name, ))
+        if rows:
+            res = rows[0][0]
+            self.soc_descriptions[name] = res
+            return res
+        return ''
 
     def get_telemetry_description(self, spid):
         """get telemetry data information """
@@ -173,56 +398,44 @@ class _IDB(object):
         return self.execute(sql, (spid, ))
 
     def get_packet_type_offset(self, packet_type, packet_subtype):
-        sql = ('select PIC_PI1_OFF, PIC_PI1_WID from PIC '
-               'where PIC_TYPE=? and PIC_STYPE=? limit 1')
-        args = (packet_type, packet_subtype)
-        rows = self.execute(sql, args)
-        if rows:
-            return rows[0]
-        return 0, 0
+        return self.packet_type_offsets.get((packet_type, packet_subtype),
+                                            (0, 0))
 
     def get_parameter_description(self, name):
         """ get scos long description """
-        if name in self.parameter_descriptions:
+        try:
             return self.parameter_descriptions[name]
-        else:
-            rows = self.execute('select PCF_DESCR from PCF where PCF_NAME=? ',
-                                (name, ))
-            if not rows:
-                rows = self.execute(
-                    'select CPC_DESCR from CPC where CPC_PNAME=? ', (name, ))
-            if rows:
-                res = rows[0][0]
-                self.parameter_descriptions[name] = res
-                return res
-            return ''
+        except KeyError:
+            pass
+        rows = self.execute('select PCF_DESCR from PCF where PCF_NAME=? ',
+                            (name, ))
+        if not rows:
+            rows = self.execute(
+                'select CPC_DESCR from CPC where CPC_PNAME=? ', (name, ))
+        if rows:
+            res = rows[0][0]
+            self.parameter_descriptions[name] = res
+            return res
+        return ''
 
     def get_parameter_unit(self, name):
-        if not self.parameter_units:
+        units = self.parameter_units
+        if not units:
             results = self.execute(
                 'select PCF_NAME, PCF_UNIT from PCF where PCF_UNIT!=""')
-            self.parameter_units = {row[0]: row[1] for row in results}
-        if name in self.parameter_units:
-            return self.parameter_units[name]
-        return ''
+            units = {row[0]: row[1] for row in results}
+            self.parameter_units = units
+        return units.get(name, '')
 
     def get_packet_type_info(self, packet_type, packet_subtype, pi1_val=-1):
         """
         Identify packet type using service, service subtype and information in IDB table PID
+        pi1_val = -1 matches any PI1 value
         """
-        args = None
-        if pi1_val == -1:
-            sql = ('select PID_SPID, PID_DESCR, PID_TPSD from PID '
-                   'where PID_TYPE=? and PID_STYPE=? limit 1')
-            args = (packet_type, packet_subtype)
-        else:
-            sql = (
-                'select PID_SPID, PID_DESCR, PID_TPSD from PID '
-                'where PID_TYPE=? and PID_STYPE=? and PID_PI1_VAL=? limit 1')
-            args = (packet_type, packet_subtype, pi1_val)
-        rows = self.execute(sql, args, 'dict')
-        if rows:
-            return rows[0]
+        info = self.packet_type_infos.get(
+            (packet_type, packet_subtype, pi1_val))
+        if info:
+            return info
         else:
             print(
                 "No information in IDB for service {}, service_subtype {}  and pi1_val: {} "
@@ -231,17 +444,18 @@ class _IDB(object):
 
     def get_s2k_parameter_types(self, ptc, pfc):
         """ get parameter type """
-        if (ptc, pfc) in self.s2k_table_contents:
+        try:
             return self.s2k_table_contents[(ptc, pfc)]
-        else:
-            sql = ('select S2K_TYPE from '
-                   ' tblConfigS2KParameterTypes where PTC = ? '
-                   ' and ? >= PFC_LB and  PFC_UB >= ? limit 1')
-            args = (ptc, pfc, pfc)
-            rows = self.execute(sql, args, 'list')
-            s2k_type = rows[0][0]
-            self.s2k_table_contents[(ptc, pfc)] = s2k_type
-            return s2k_type
+        except KeyError:
+            pass
+        sql = ('select S2K_TYPE from '
+               ' tblConfigS2KParameterTypes where PTC = ? '
+               ' and ? >= PFC_LB and  PFC_UB >= ? limit 1')
+        args = (ptc, pfc, pfc)
+        rows = self.execute(sql, args, 'list')
+        s2k_type = rows[0][0]
+        self.s2k_table_contents[(ptc, pfc)] = s2k_type
+        return s2k_type
 
     def convert_NIXG_NIXD(self, name):
         sql = (
@@ -260,8 +474,10 @@ class _IDB(object):
             is_fixed: whether it is a fixed length packet
             parameter structures
          """
-        if spid in self.parameter_structures:
+        try:
             return self.parameter_structures[spid]
+        except KeyError:
+            pass
         sql = (
             'select PCF.PCF_DESCR, PLF.PLF_OFFBY, PLF.PLF_OFFBI, PCF.PCF_NAME,'
             ' PCF.PCF_WIDTH, PCF.PCF_PFC,PCF.PCF_PTC, PCF.PCF_CURTX'
@@ -278,11 +494,7 @@ class _IDB(object):
         """
         service_type = header['service_type']
         service_subtype = header['service_subtype']
-        sql = (
-            'select  CCF_CNAME, CCF_DESCR, CCF_DESCR2, '
-            ' CCF_NPARS from CCF where CCF_TYPE=? and CCF_STYPE =? order by CCF_CNAME asc'
-        )
-        res = self.execute(sql, (service_type, service_subtype), 'dict')
+        res = self.telecommand_infos.get((service_type, service_subtype), [])
         index = 0
         if len(res) > 1 and 'subtype' in header:
             index = header['subtype'] - 1
@@ -296,27 +508,40 @@ class _IDB(object):
             Get the structure of a telecommand  by its name
             The structure will be used to decode the TC packet.
         """
+        try:
+            return self.telecommand_structures[name]
+        except KeyError:
+            pass
         sql = ('select CDF_ELTYPE, CDF_DESCR, CDF_ELLEN, CDF_BIT, '
                'CDF_GRPSIZE, CDF_PNAME, CPC_DESCR,  CPC_PAFREF, CPC_PTC,'
                'CPC_PFC from CDF left join CPC on  CDF_PNAME=CPC_PNAME'
                '  where  CDF_CNAME=?  order by CDF_BIT asc')
         args = (name, )
         res = self.execute(sql, args, 'dict')
+        self.telecommand_structures[name] = res
         return res
 
     def is_variable_length_telecommand(self, name):
+        try:
+            return self.variable_telecommands[name]
+        except KeyError:
+            pass
         sql = 'select CDF_GRPSIZE  from CDF where CDF_GRPSIZE >0 and CDF_CNAME=?'
         args = (name, )
         rows = self.execute(sql, args, 'list')
+        is_variable = False
         if rows:
             num_repeater = int(rows[0][0])
             if num_repeater > 0:
-                return True
-        return False
+                is_variable = True
+        self.variable_telecommands[name] = is_variable
+        return is_variable
 
     def get_variable_packet_structure(self, spid):
-        if spid in self.parameter_structures:
+        try:
             return self.parameter_structures[spid]
+        except KeyError:
+            pass
         sql = (
             'select PCF.PCF_NAME,  VPD.VPD_POS,PCF.PCF_WIDTH,PCF.PCF_PFC, PCF.PCF_PTC,VPD.VPD_OFFSET,'
             ' VPD.VPD_GRPSIZE,PCF.PCF_DESCR ,PCF.PCF_CURTX'
@@ -341,15 +566,16 @@ class _IDB(object):
 
     def get_calibration_curve(self, pcf_curtx):
         """ calibration curve defined in CAP database """
-        if pcf_curtx in self.calibration_curves:
+        try:
             return self.calibration_curves[pcf_curtx]
-        else:
-            sql = ('select cap_xvals, cap_yvals from cap '
-                   ' where cap_numbr=? order by cast(CAP_XVALS as double) asc')
-            args = (pcf_curtx, )
-            rows = self.execute(sql, args)
-            self.calibration_curves[pcf_curtx] = rows
-            return rows
+        except KeyError:
+            pass
+        sql = ('select cap_xvals, cap_yvals from cap '
+               ' where cap_numbr=? order by cast(CAP_XVALS as double) asc')
+        args = (pcf_curtx, )
+        rows = self.execute(sql, args)
+        self.calibration_curves[pcf_curtx] = rows
+        return rows
 
     def get_textual_mapping(self, parameter_name):
         sql = 'select  TXP_FROM, TXP_ALTXT from TXP join PCF on PCF_CURTX=TXP_NUMBR where PCF_NAME=? order by TXP_FROM asc'
@@ -361,9 +587,10 @@ class _IDB(object):
             return None
 
     def textual_interpret(self, pcf_curtx, raw_value):
-        if (pcf_curtx, raw_value) in self.textual_parameter_lut:
-            #build a lookup table
+        try:
             return self.textual_parameter_lut[(pcf_curtx, raw_value)]
+        except KeyError:
+            pass
 
         sql = ('select TXP_ALTXT from TXP where  TXP_NUMBR=? and ?>=TXP_FROM '
                ' and TXP_TO>=? limit 1')
@@ -373,22 +600,51 @@ class _IDB(object):
         # lookup table
         return rows
 
+    def get_textual_calibration(self, pcf_curtx):
+        """ all ranges of a textual calibration, used to build lookup tables """
+        try:
+            return self.textual_calibrations[pcf_curtx]
+        except KeyError:
+            pass
+        sql = ('select TXP_FROM, TXP_TO, TXP_ALTXT from TXP where TXP_NUMBR=? '
+               ' order by rowid asc')
+        args = (pcf_curtx, )
+        rows = self.execute(sql, args)
+        self.textual_calibrations[pcf_curtx] = rows
+        return rows
+
+    def get_telecommand_textual_calibration(self, ref):
+        """ all values of a telecommand parameter interpretation in the table PAS """
+        try:
+            return self.telecommand_textual_calibrations[ref]
+        except KeyError:
+            pass
+        sql = 'select PAS_ALVAL, PAS_ALTXT from PAS where PAS_NUMBR=?'
+        args = (ref, )
+        rows = self.execute(sql, args)
+        self.telecommand_textual_calibrations[ref] = rows
+        return rows
+
     def get_calibration_polynomial(self, pcf_curtx):
-        if pcf_curtx in self.calibration_polynomial:
+        try:
             return self.calibration_polynomial[pcf_curtx]
-        else:
-            sql = ('select MCF_POL1, MCF_POL2, MCF_POL3, MCF_POL4, MCF_POL5 '
-                   'from MCF where MCF_IDENT=? limit 1')
-            args = (pcf_curtx, )
-            rows = self.execute(sql, args)
-            self.calibration_polynomial[pcf_curtx] = rows
-            return rows
+        except KeyError:
+            pass
+        sql = ('select MCF_POL1, MCF_POL2, MCF_POL3, MCF_POL4, MCF_POL5 '
+               'from MCF where MCF_IDENT=? limit 1')
+        args = (pcf_curtx, )
+        rows = self.execute(sql, args)
+        self.calibration_polynomial[pcf_curtx] = rows
+        return rows
 
     def get_idb_version(self):
+        if self.idb_version is not None:
+            return self.idb_version
         try:
             sql = ('select version from IDB limit 1')
             rows = self.execute(sql, None, 'list')
-            return rows[0][0]
+            self.idb_version = rows[0][0]
+            return self.idb_version
         except (sqlite3.OperationalError, IndexError):
             logger.warning('No IDB version information found in IDB')
             return '-1'
@@ -398,11 +654,43 @@ def stix_idb(filename=''):
     return _IDB.get_instance(filename)
 
 
-if __name__ == '__main__':
-    """ test  the database interface"""
-    #import sys
+def get_idb(filename):
+    """
+    Get the IDB loaded from a file.
+    The default IDB is returned if it is loaded from the file, otherwise the file is loaded
+    in its own instance, with its own lookup tables and connections, so that
+    switching IDBs doesn't affect the other users of the default IDB.
+    At most MAX_RESIDENT_IDBS instances are kept in memory, the least recently used ones
+    are released once no parser holds them
+    """
+    default = stix_idb()
+    if not filename or filename == default.filename:
+        return default
+    with LOCK:
+        idb = RESIDENT_IDBS.pop(filename, None)
+        if idb is None:
+            idb = _IDB(filename)
+        RESIDENT_IDBS[filename] = idb
+        while len(RESIDENT_IDBS) > MAX_RESIDENT_IDBS:
+            evicted_filename, _ = RESIDENT_IDBS.popitem(last=False)
+            logger.info('IDB {} released', evicted_filename)
+    return idb
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description='Create IDB snapshots, which are loaded instead of querying the IDB')
+    arg_parser.add_argument(
+        'files',
+        nargs='*',
+        help='IDB files, the IDB in the configuration is used if not given')
+    args = arg_parser.parse_args()
     idb = stix_idb()
-    print(idb.get_idb_version())
-    #print(find_idb('test'))
+    for filename in args.files or [idb.filename]:
+        idb.reload(filename)
+        print(idb.get_idb_version())
+        idb.create_snapshot()
+
 
-    #print(idb.is_variable_length_telecommand('ZIX37701'))
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,7 @@
 # @description  : logger
 
 import sys
+import time
 from datetime import datetime
 
 DEBUG = 1
@@ -13,6 +14,16 @@ WARNING = 4
 ERROR = 5
 CRITICAL = 6
 
+LEVEL_LABELS = {INFO: 'INFO', WARNING: 'WARN', ERROR: 'ERROR'}
+RATE_LIMIT_PERIOD = 60.
+#seconds
+RATE_LIMIT_COUNT = 10
+#messages with the same key written in a period, the others are only counted.
+#Errors are not rate limited
+MAX_MESSAGE_KEYS = 10000
+PROGRESS_INTERVAL = 0.2
+#minimum time in seconds between two progress updates
+
 
 class StixLogger(object):
     __instance = None
@@ -42,6 +53,11 @@ class StixLogger(object):
 
         self.signal_handler = None
         self.progress_bar_last_num = 0
+        self.last_progress_time = 0
+        self.message_counters = {}
+        #key: [start of the period, number of messages written, number of messages suppressed]
+        self.now_second = None
+        self.now_string = ''
 
     def set_progress_enabled(self, status):
         self.progress_enabled = status
@@ -50,8 +66,12 @@ class StixLogger(object):
         self.signal_handler = handler
 
     def get_now(self):
-        now = datetime.now()
-        return now.strftime("%Y-%m-%d %H:%M:%S")
+        second = int(time.time())
+        if second != self.now_second:
+            self.now_second = second
+            self.now_string = datetime.fromtimestamp(second).strftime(
+                "%Y-%m-%d %H:%M:%S")
+        return self.now_string
 
     def emit(self, msg, level):
         if not self.signal_handler:
@@ -99,21 +119,76 @@ class StixLogger(object):
         else:
             print(msg)
 
+    def is_allowed(self, key, level):
+        """
+        rate limit of messages with the same key: at most RATE_LIMIT_COUNT messages
+        are written in RATE_LIMIT_PERIOD seconds
+        """
+        now = time.monotonic()
+        try:
+            counter = self.message_counters[key]
+        except KeyError:
+            if len(self.message_counters) >= MAX_MESSAGE_KEYS:
+                self.flush_suppressed()
+            self.message_counters[key] = [now, 1, 0, level]
+            return True
+        if now - counter[0] > RATE_LIMIT_PERIOD:
+            self.report_suppressed(key, counter)
+            counter[:] = [now, 1, 0, level]
+            return True
+        if counter[1] < RATE_LIMIT_COUNT:
+            counter[1] += 1
+            return True
+        counter[2] += 1
+        return False
+
+    def report_suppressed(self, key, counter):
+        if counter[2] > 0:
+            self.write(
+                '[{} {}] : {} similar messages suppressed: {}'.format(
+                    LEVEL_LABELS[counter[3]], self.get_now(), counter[2], key),
+                counter[3])
+
+    def flush_suppressed(self):
+        """ write the number of suppressed messages and reset the rate limits """
+        for key, counter in self.message_counters.items():
+            self.report_suppressed(key, counter)
+        self.message_counters = {}
+
+    def log(self, level, msg, args, key):
+        """
+        write a message, formatted with args only if it is not suppressed.
+        Errors are always written
+        Parameters:
+            level: INFO, WARNING or ERROR
+            msg: message or format string
+            args: arguments of msg.format
+            key: key of the rate limit, the format string by default
+        """
+        if key is None:
+            key = msg
+        if level < ERROR and not self.is_allowed(key, level):
+            return
+        if args:
+            msg = msg.format(*args)
+        self.write('[{} {}] : {}'.format(LEVEL_LABELS[level], self.get_now(),
+                                         msg), level)
+
     def critical(self, msg):
         self.write(('[INFO {}] : {}'.format(self.get_now(), msg)), CRITICAL)
 
-    def error(self, msg):
-        self.write(('[ERROR {}] : {}'.format(self.get_now(), msg)), ERROR)
+    def error(self, msg, *args, key=None):
+        self.log(ERROR, msg, args, key)
 
-    def warning(self, msg):
+    def warning(self, msg, *args, key=None):
         if self.level < WARNING:
             return
-        self.write(('[WARN {}] : {}'.format(self.get_now(), msg)), WARNING)
+        self.log(WARNING, msg, args, key)
 
-    def info(self, msg):
+    def info(self, msg, *args, key=None):
         if self.level < INFO:
             return
-        self.write(('[INFO {}] : {}'.format(self.get_now(), msg)), INFO)
+        self.log(INFO, msg, args, key)
 
     def debug(self, msg):
         if self.level < DEBUG:
@@ -122,6 +197,11 @@ class StixLogger(object):
 
     def progress(self, i, total):
         if self.progress_enabled:
+            now = time.monotonic()
+            if now - self.last_progress_time < PROGRESS_INTERVAL and i + 1 < total:
+                #the last update is always shown
+                return
+            self.last_progress_time = now
             current = int(100. * i / total)
             if current > self.last_progress:
                 if self.logfile:
@@ -134,6 +214,7 @@ class StixLogger(object):
             self.last_progress = current
 
     def print_summary(self, summary):
+        self.flush_suppressed()
         self.critical(
             'Size: {} bytes (bad:{});'
             ' Nb. of packets: {} ('
@@ -0,0 +1,624 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# @title        : stix_packet_encoder.py
+# @description:
+#               encoder of telemetry packets, the inverse of StixTCTMParser.
+#               Data fields are written from the IDB packet structures: fixed packets
+#               from get_fixed_packet_structure, variable packets by walking the parse tree
+#               as StixVariableTelemetryPacketParser.walk does. Counts can be compressed
+#               with the SKM parameters of the packet, and packets longer than the maximum
+#               length are split into a sequence of segments.
+#                   encoder = StixPacketEncoder()
+#                   packets = encoder.encode(54118, RandomValues(seed=1), coarse=660000000)
+#               Synthetic telemetry files are written deterministically from a seed:
+#                   python3 stix/core/stix_packet_encoder.py out.ascii --size 2G --seed 1
+import os
+import random
+import argparse
+import itertools
+import struct as st
+from datetime import datetime, timedelta
+from stix.core import stix_idb
+from stix.core import skm_codec
+from stix.core import stix_parser
+from stix.core import stix_logger
+from stix.core import stix_datatypes as sdt
+from stix.core import stix_decompressor
+
+logger = stix_logger.get_logger()
+STIX_IDB = stix_idb.stix_idb()
+
+TM_HEADER_STRUCT = st.Struct('>HHHBBBBIH')
+TM_PACKET_ID_FLAG = 0x0800
+#version 0, type TM, data field header present
+PUS_VERSION_BYTE = 0x10
+MAX_SOURCE_DATA_LENGTH = 4096
+#packet lengths are at most 4106 (source data + 9), see stix_header
+SEGMENT_CONTINUATION, SEGMENT_FIRST, SEGMENT_LAST, SEGMENT_STANDALONE = 0, 1, 2, 3
+SCET_EPOCH = datetime(2000, 1, 1)
+#receipt times of synthetic packets are computed without SPICE from this epoch
+RECEIPT_DELAY = 3600
+#seconds between the packet time and the receipt time
+UNIX_TIME_SCET_EPOCH = (SCET_EPOCH - datetime(1970, 1, 1)).total_seconds()
+EDDS_PACKET_PREFIX_FORMAT = '>6I2H2BHB8s'
+EDDS_PACKET_PREFIX_STRUCT = st.Struct('{}{}x'.format(
+    EDDS_PACKET_PREFIX_FORMAT,
+    stix_parser.EDDS_PACKET_PREFIX_LENGTH - st.calcsize(EDDS_PACKET_PREFIX_FORMAT)))
+#EDDS header prepended to packets in xml files, modelled on the SCOS-2000 packet header:
+#packet ID, packet length, packet time (coarse, fine), receipt time (unix seconds, microseconds),
+#APID, sequence count, service type and subtype, stream ID, virtual channel, ground station
+#and spare bytes
+EDDS_STREAM_ID = 1000
+EDDS_VIRTUAL_CHANNEL = 1
+EDDS_GROUND_STATION = b'NNO'
+EDDS_XML_HEAD = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                 '<ns2:ResponsePart xmlns:ns2="http://edds.egos.esa/model">\n'
+                 '<Response>\n<PktRawResponse>\n')
+EDDS_XML_TAIL = '</PktRawResponse>\n</Response>\n</ns2:ResponsePart>\n'
+DEFAULT_SPIDS = [54101, 54102, 54118, 54120, 54114]
+#housekeeping, quick-look light curves and spectra, X-ray level 0 science data
+DEFAULT_START_SCET = 660000000
+DEFAULT_CADENCE = 4
+#seconds between two packets of the generated telemetry
+SIZE_UNITS = {'k': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+
+
+def write_bits(buf, bit_offset, width, value):
+    """
+    write a value in a buffer, the bits of the value replace the bits at bit_offset.
+    Negative integers are written in two's complement, floats are times in seconds
+    with a fine time in units of 1/65536 s, bytes are written as they are
+    """
+    if isinstance(value, (bytes, bytearray)):
+        start = bit_offset // 8
+        buf[start:start + width // 8] = bytes(value).rjust(width // 8, b'\0')[-width // 8:]
+        return
+    if isinstance(value, float):
+        value = round(value * 65536)
+    mask = (1 << width) - 1
+    value = int(value) & mask
+    first = bit_offset // 8
+    last = (bit_offset + width + 7) // 8
+    shift = (last - first) * 8 - (bit_offset - first * 8) - width
+    word = int.from_bytes(buf[first:last], 'big')
+    word = (word & ~(mask << shift)) | (value << shift)
+    buf[first:last] = word.to_bytes(last - first, 'big')
+
+
+def parse_size(size):
+    """ convert sizes such as 500M or 2G to numbers of bytes """
+    if size[-1] in SIZE_UNITS:
+        return int(float(size[:-1]) * SIZE_UNITS[size[-1]])
+    return int(size)
+
+
+class RandomValues(object):
+    """
+    random raw values of parameters. Values given by name are used instead,
+    callables are called for each value
+    """
+    def __init__(self, seed=None, fixed_values=None, max_repetitions=4, rng=None):
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.fixed_values = fixed_values or {}
+        self.max_repetitions = max_repetitions
+
+    def __call__(self, name, width, is_repeater):
+        value = self.fixed_values.get(name)
+        if callable(value):
+            return value()
+        if value is not None:
+            return value
+        if is_repeater:
+            return self.rng.randint(1, min(self.max_repetitions, (1 << width) - 1))
+        return self.rng.getrandbits(width)
+
+
+class ReplayedValues(object):
+    """
+    raw values of the parameters of a decoded packet, to encode it again.
+    Time parameters are rounded to milliseconds by the parser
+    """
+    def __init__(self, parameters):
+        self.values = self.flatten(parameters)
+
+    def flatten(self, parameters):
+        for parameter in parameters:
+            param = sdt.Parameter(parameter)
+            raw = param.raw
+            if isinstance(raw, tuple):
+                raw = raw[0]
+            yield param.name, raw
+            if param.children:
+                yield from self.flatten(param.children)
+
+    def __call__(self, name, width, is_repeater):
+        try:
+            expected_name, raw = next(self.values)
+        except StopIteration:
+            raise ValueError('No value of {} left in the packet'.format(name))
+        if expected_name != name:
+            raise ValueError('Expected {}, got {}'.format(name, expected_name))
+        return raw
+
+
+class SourceDataWriter(object):
+    """
+    source data of a variable length packet. The offsets are moved as in
+    StixVariableTelemetryPacketParser.parse_node, parameters are written instead of decoded
+    """
+    def __init__(self, values, schema=None, compress_counts=False):
+        """
+        Parameters:
+            values: function(name, width, is_repeater) returning raw values,
+                the number of repetitions for repeaters
+            schema: compression schema of the SPID, see stix_decompressor.SCHEMAS
+            compress_counts: compress the values of the compressed parameters with
+                the SKM parameters written before them
+        """
+        self.values = values
+        self.compressed_parameters = {}
+        self.skm_names = set()
+        if schema:
+            self.compressed_parameters = schema['parameters']
+            for group in schema['SKM_Groups']:
+                self.skm_names.update(stix_decompressor.SKM_GROUPS[group])
+        self.compress_counts = compress_counts
+        self.buffer = bytearray()
+        self.skm_values = {}
+        self.current_offset = 0
+        self.last_offset = 0
+        self.current_offset_bit = 0
+        self.last_num_bits = 0
+        self.last_data_width = 0
+
+    def get_state(self):
+        return (bytes(self.buffer), dict(self.skm_values), self.current_offset,
+                self.last_offset, self.current_offset_bit, self.last_num_bits,
+                self.last_data_width)
+
+    def set_state(self, state):
+        (buf, skm_values, self.current_offset, self.last_offset,
+         self.current_offset_bit, self.last_num_bits, self.last_data_width) = state
+        self.buffer = bytearray(buf)
+        self.skm_values = dict(skm_values)
+
+    def compress(self, name, value):
+        skm = [
+            self.skm_values.get(skm_name)
+            for skm_name in self.compressed_parameters[name]
+        ]
+        if None in skm:
+            return value
+        return skm_codec.compress(value, *skm)
+
+    def write_node(self, name, args, value):
+        """
+        write a parameter
+        Returns:
+            offset of the parameter in bits
+        """
+        width = args[1]
+        if self.compress_counts and name in self.compressed_parameters:
+            value = self.compress(name, value)
+        elif name in self.skm_names:
+            self.skm_values[name] = int(value)
+        if width % 8 != 0:
+            offset_bits = args[0]
+            if offset_bits < 0:
+                self.current_offset_bit = self.last_data_width + offset_bits
+            else:
+                self.current_offset_bit += self.last_num_bits + offset_bits
+            self.last_num_bits = width
+            bit_offset = self.last_offset * 8 + self.current_offset_bit
+        else:
+            self.current_offset_bit = 0
+            self.last_offset = self.current_offset
+            self.current_offset += width // 8
+            self.last_num_bits = 0
+            self.last_data_width = width
+            bit_offset = self.last_offset * 8
+            self.buffer.extend(bytes(width // 8))
+        write_bits(self.buffer, bit_offset, width, value)
+        return bit_offset
+
+    def walk(self, nodes, counter):
+        for _ in range(counter):
+            for name, args, children in nodes:
+                value = self.values(name, args[1], bool(children))
+                self.write_node(name, args, value)
+                if children:
+                    self.walk(children, int(value))
+
+
+class StixPacketEncoder(object):
+    """ encoder of telemetry packets """
+    def __init__(self):
+        self.vp_parser = stix_parser.StixVariableTelemetryPacketParser()
+        self.packet_types = {}
+        self.sequence_counts = {}
+        #next source sequence count of each APID
+
+    def get_packet_type(self, spid):
+        """
+        Returns:
+            service type, service subtype, APID, SID and whether the packet has a fixed length
+        """
+        try:
+            return self.packet_types[spid]
+        except KeyError:
+            pass
+        rows = STIX_IDB.execute(
+            'select PID_TYPE, PID_STYPE, PID_APID, PID_PI1_VAL, PID_TPSD from PID where PID_SPID=? limit 1',
+            (spid, ), 'list')
+        if not rows:
+            raise ValueError('SPID {} not found in the IDB'.format(spid))
+        service_type, service_subtype, apid, sid, tpsd = (int(x) for x in rows[0])
+        self.packet_types[spid] = (service_type, service_subtype, apid, sid,
+                                   tpsd == -1)
+        return self.packet_types[spid]
+
+    def set_sid(self, spid, data):
+        """ write the SID where the parser reads it, see parse_data_field_header """
+        service_type, service_subtype, _, sid, _ = self.get_packet_type(spid)
+        offset, width = STIX_IDB.get_packet_type_offset(service_type, service_subtype)
+        if offset != -1 and width and len(data) * 8 >= (offset - 16) * 8 + width:
+            write_bits(data, (offset - 16) * 8, width, sid)
+
+    def encode_fixed(self, spid, values):
+        """
+        source data of a fixed length packet
+        Returns:
+            a list with one source data field
+        """
+        rows = STIX_IDB.get_fixed_packet_structure(spid)
+        length = max(row['PLF_OFFBY'] + (row['PLF_OFFBI'] + row['PCF_WIDTH'] + 7) // 8
+                     for row in rows) - 16 if rows else 0
+        data = bytearray(length)
+        for row in rows:
+            width = int(row['PCF_WIDTH'])
+            write_bits(data, (int(row['PLF_OFFBY']) - 16) * 8 + int(row['PLF_OFFBI']), width,
+                       values(row['PCF_NAME'], width, False))
+        return [data]
+
+    def encode_variable(self, spid, values, compress_counts=False,
+                        max_length=MAX_SOURCE_DATA_LENGTH):
+        """
+        source data of a variable length packet. If the data are longer than max_length
+        and the last parameter of the tree is a repeater, the repetitions are split in
+        several data fields. The parameters before the repeater are repeated in each
+        data field and the repeater counts the repetitions of the field.
+        Returns:
+            a list of source data fields
+        """
+        tree = self.vp_parser.get_parse_tree(spid)[0]
+        writer = SourceDataWriter(values, stix_decompressor.SCHEMAS.get(spid),
+                                  compress_counts)
+        if not tree or not tree[-1][2]:
+            writer.walk(tree, 1)
+            if len(writer.buffer) > max_length:
+                logger.warning('Packet of SPID {} is too long: {} bytes', spid,
+                               len(writer.buffer))
+            return [writer.buffer]
+        writer.walk(tree[:-1], 1)
+        name, args, children = tree[-1]
+        counter = int(values(name, args[1], True))
+        counter_offset = writer.write_node(name, args, counter)
+        head_state = writer.get_state()
+        data_fields = []
+        num_repetitions = 0
+        for _ in range(counter):
+            state = writer.get_state()
+            recorded = []
+
+            def record(name, width, is_repeater):
+                value = values(name, width, is_repeater)
+                recorded.append(value)
+                return value
+
+            writer.values = record
+            writer.walk(children, 1)
+            if len(writer.buffer) > max_length and num_repetitions > 0:
+                writer.set_state(state)
+                write_bits(writer.buffer, counter_offset, args[1], num_repetitions)
+                data_fields.append(writer.buffer)
+                writer.set_state(head_state)
+                writer.values = lambda *_, replayed=iter(recorded): next(replayed)
+                writer.walk(children, 1)
+                num_repetitions = 0
+            num_repetitions += 1
+        if len(writer.buffer) > max_length:
+            logger.warning('Packet of SPID {} is too long: {} bytes', spid,
+                           len(writer.buffer))
+        write_bits(writer.buffer, counter_offset, args[1], num_repetitions)
+        data_fields.append(writer.buffer)
+        return data_fields
+
+    def encode_source_data(self, spid, values, compress_counts=False,
+                           max_length=MAX_SOURCE_DATA_LENGTH):
+        """
+        Parameters:
+            spid: SPID
+            values: function(name, width, is_repeater) returning raw values,
+                e.g. RandomValues or ReplayedValues
+            compress_counts: values of compressed parameters are counts to be compressed
+            max_length: maximum length of a source data field
+        Returns:
+            source data fields, more than one if the packet is segmented
+        """
+        if self.get_packet_type(spid)[4]:
+            data_fields = self.encode_fixed(spid, values)
+        else:
+            data_fields = self.encode_variable(spid, values, compress_counts, max_length)
+        for data in data_fields:
+            self.set_sid(spid, data)
+        return [bytes(data) for data in data_fields]
+
+    def encode_header(self, spid, data_length, seg_flag, coarse, fine):
+        """ source packet header and data field header """
+        service_type, service_subtype, apid, _, _ = self.get_packet_type(spid)
+        seq_count = self.sequence_counts.get(apid, 0)
+        self.sequence_counts[apid] = (seq_count + 1) & 0x3FFF
+        return TM_HEADER_STRUCT.pack(TM_PACKET_ID_FLAG | apid, (seg_flag << 14) | seq_count,
+                                     data_length + 9, PUS_VERSION_BYTE, service_type,
+                                     service_subtype, 0, coarse, fine)
+
+    def add_headers(self, spid, data_fields, coarse, fine=0):
+        """
+        Returns:
+            packets of the data fields, with the segmentation flags of a sequence
+        """
+        num = len(data_fields)
+        packets = []
+        for i, data in enumerate(data_fields):
+            if num == 1:
+                seg_flag = SEGMENT_STANDALONE
+            elif i == 0:
+                seg_flag = SEGMENT_FIRST
+            elif i == num - 1:
+                seg_flag = SEGMENT_LAST
+            else:
+                seg_flag = SEGMENT_CONTINUATION
+            packets.append(self.encode_header(spid, len(data), seg_flag, coarse, fine) + data)
+        return packets
+
+    def encode(self, spid, values, coarse, fine=0, compress_counts=False,
+               max_length=MAX_SOURCE_DATA_LENGTH):
+        """
+        encode a packet, see encode_source_data
+        Returns:
+            packets, more than one if the packet is segmented
+        """
+        return self.add_headers(
+            spid, self.encode_source_data(spid, values, compress_counts, max_length),
+            coarse, fine)
+
+
+def light_curve_values(rng, coarse):
+    """ quick-look light curves of 32 time bins """
+    return RandomValues(
+        rng=rng,
+        fixed_values={
+            'NIX00120': 30,
+            'NIX00445': coarse,
+            'NIX00446': 0,
+            'NIX00405': 39,
+            'NIX00407': 0xFFFFFFFF,
+            'NIXD0407': 0xFFF,
+            'NIXD0101': 0,
+            'NIXD0102': 5,
+            'NIXD0103': 3,
+            'NIXD0104': 0,
+            'NIXD0105': 5,
+            'NIXD0106': 3,
+            'NIXD0107': 1,
+            'NIX00266': 0x80840101,
+            'NIX00270': 5,
+            'NIX00271': 32,
+            'NIX00272': lambda: rng.getrandbits(8),
+            'NIX00273': 32,
+            'NIX00275': 32
+        })
+
+
+def spectra_values(rng, coarse):
+    """ quick-look spectra of the 32 detectors """
+    return RandomValues(
+        rng=rng,
+        fixed_values={
+            'NIX00120': 32,
+            'NIX00445': coarse,
+            'NIX00446': 0,
+            'NIX00405': 2399,
+            'NIXD0115': 0,
+            'NIXD0116': 5,
+            'NIXD0117': 3,
+            'NIXD0112': 0,
+            'NIXD0113': 5,
+            'NIXD0114': 3,
+            'NIXD0407': 0xFFF,
+            'NIX00089': 32,
+            'NIX00100': lambda: rng.randrange(32),
+            'NIX00485': 0
+        })
+
+
+def xray_l0_values(rng, coarse, request_id, num_structures=4):
+    """ X-ray level 0 science data of a request, with sorted start times """
+    start_times = itertools.count(0, 10)
+    return RandomValues(
+        rng=rng,
+        fixed_values={
+            'NIX00120': 20,
+            'NIX00001': 0x1D8C,
+            'NIX00002': 0xC000,
+            'NIX00037': request_id,
+            'NIXD0007': 0,
+            'NIXD0008': 5,
+            'NIXD0009': 3,
+            'NIXD0010': 0,
+            'NIXD0011': 5,
+            'NIXD0012': 3,
+            'NIX00402': coarse << 16,
+            'NIX00403': num_structures,
+            'NIX00404': lambda: next(start_times),
+            'NIX00405': 9,
+            'NIXD0407': 0xFFF,
+            'NIX00407': 0xFFFFFFFF,
+            'NIX00406': 20,
+            'NIXD0158': lambda: rng.randrange(12),
+            'NIXD0153': lambda: rng.randrange(32),
+            'NIXD0154': lambda: rng.randrange(32),
+            'NIXD0159': 1
+        })
+
+
+class TelemetryGenerator(object):
+    """
+    synthetic telemetry of a mix of SPIDs, packets are the same for the same seed.
+    Values of the SPIDs with a profile are consistent enough to create products,
+    other SPIDs have random values.
+    With a pool, data fields are generated pool_size times per SPID and then drawn
+    from the pool with new headers, which is much faster for large files
+    """
+    def __init__(self, spids=None, seed=0, start_scet=DEFAULT_START_SCET,
+                 cadence=DEFAULT_CADENCE, pool_size=0, max_structures=100):
+        self.spids = spids or DEFAULT_SPIDS
+        self.rng = random.Random(seed)
+        self.scet = start_scet
+        self.cadence = cadence
+        self.pool_size = pool_size
+        self.pools = {spid: [] for spid in self.spids}
+        self.max_structures = max_structures
+        self.request_ids = itertools.count(1)
+        self.encoder = StixPacketEncoder()
+
+    def get_values(self, spid, coarse):
+        if spid == 54118:
+            return light_curve_values(self.rng, coarse)
+        if spid == 54120:
+            return spectra_values(self.rng, coarse)
+        if spid == 54114:
+            return xray_l0_values(self.rng, coarse, next(self.request_ids),
+                                  self.rng.randint(1, self.max_structures))
+        return RandomValues(rng=self.rng)
+
+    def get_data_fields(self, spid, coarse):
+        pool = self.pools[spid]
+        if self.pool_size and len(pool) >= self.pool_size:
+            return self.rng.choice(pool)
+        data_fields = self.encoder.encode_source_data(spid, self.get_values(spid, coarse))
+        if self.pool_size:
+            pool.append(data_fields)
+        return data_fields
+
+    def __iter__(self):
+        """
+        Yields:
+            packet time and packet, an endless stream
+        """
+        for spid in itertools.cycle(self.spids):
+            coarse = int(self.scet)
+            fine = int((self.scet - coarse) * 65536)
+            for packet in self.encoder.add_headers(spid, self.get_data_fields(spid, coarse),
+                                                   coarse, fine):
+                yield self.scet, packet
+            self.scet += self.cadence
+
+
+def get_receipt_utc(scet):
+    return (SCET_EPOCH + timedelta(seconds=scet + RECEIPT_DELAY)).isoformat(
+        timespec='milliseconds') + 'Z'
+
+
+def get_edds_packet_prefix(packet_id, scet, packet):
+    """ EDDS header of a telemetry packet, see EDDS_PACKET_PREFIX_STRUCT """
+    (packet_id_field, sequence_field, _, _, service_type, service_subtype, _, coarse,
+     fine) = TM_HEADER_STRUCT.unpack_from(packet)
+    receipt_time = UNIX_TIME_SCET_EPOCH + scet + RECEIPT_DELAY
+    receipt_seconds = int(receipt_time)
+    return EDDS_PACKET_PREFIX_STRUCT.pack(
+        packet_id, len(packet), coarse, fine, receipt_seconds,
+        int((receipt_time - receipt_seconds) * 1e6), packet_id_field & 0x7FF,
+        sequence_field & 0x3FFF, service_type, service_subtype, EDDS_STREAM_ID,
+        EDDS_VIRTUAL_CHANNEL, EDDS_GROUND_STATION)
+
+
+def format_packet(scet, packet, file_type, packet_id=0):
+    """
+    a packet as written in a file of the given type, packet_id is the EDDS packet ID
+    of packets in xml files
+    """
+    if file_type == 'bin':
+        return packet
+    if file_type == 'ascii':
+        return '{} {}\n'.format(get_receipt_utc(scet), packet.hex().upper())
+    if file_type == 'xml':
+        return ('<PktRawResponseElement packetID="{}">\n<Packet>{}</Packet>\n'
+                '</PktRawResponseElement>\n').format(
+                    packet_id,
+                    (get_edds_packet_prefix(packet_id, scet, packet) + packet).hex().upper())
+    raise ValueError('Unknown file type: {}'.format(file_type))
+
+
+def write_telemetry(filename, packets, file_type=None, max_bytes=None, num_packets=None):
+    """
+    write packets to a raw binary, a MOC ascii or an EDDS xml file
+    Parameters:
+        filename: output filename
+        packets: iterable of packet times and packets, e.g. a TelemetryGenerator
+        file_type: bin, ascii or xml. If None, it is given by the file extension
+        max_bytes: the file is closed when its size reaches max_bytes
+        num_packets: maximum number of packets
+    Returns:
+        number of packets and number of bytes written
+    """
+    if file_type is None:
+        file_type = os.path.splitext(filename)[1][1:]
+    if max_bytes is None and num_packets is None:
+        raise ValueError('The size or the number of packets must be given')
+    if num_packets is not None:
+        packets = itertools.islice(packets, num_packets)
+    mode = 'wb' if file_type == 'bin' else 'w'
+    num, size = 0, 0
+    with open(filename, mode) as fout:
+        if file_type == 'xml':
+            size += fout.write(EDDS_XML_HEAD)
+        for scet, packet in packets:
+            num += 1
+            size += fout.write(format_packet(scet, packet, file_type, num))
+            if max_bytes and num % 10000 == 0:
+                logger.progress(size, max_bytes)
+            if max_bytes is not None and size >= max_bytes:
+                break
+        if file_type == 'xml':
+            size += fout.write(EDDS_XML_TAIL)
+    return num, size
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description='Write synthetic telemetry files generated from the IDB')
+    arg_parser.add_argument('output', help='output file, .bin, .ascii or .xml')
+    arg_parser.add_argument('-s', '--size', help='file size, e.g. 500M or 2G')
+    arg_parser.add_argument('-n', '--num-packets', type=int, help='number of packets')
+    arg_parser.add_argument('--seed', type=int, default=0, help='seed of the random values')
+    arg_parser.add_argument('--spids', type=int, nargs='+', default=DEFAULT_SPIDS,
+                            help='SPIDs of the packets, generated in turn')
+    arg_parser.add_argument('--start-scet', type=float, default=DEFAULT_START_SCET,
+                            help='time of the first packet, SCET in seconds')
+    arg_parser.add_argument('--pool-size', type=int, default=0,
+                            help='number of distinct data fields per SPID, 0 for no limit')
+    args = arg_parser.parse_args()
+    if args.size is None and args.num_packets is None:
+        arg_parser.error('the size or the number of packets is required')
+    generator = TelemetryGenerator(args.spids, args.seed, args.start_scet,
+                                   pool_size=args.pool_size)
+    num, size = write_telemetry(args.output,
+                                generator,
+                                max_bytes=parse_size(args.size) if args.size else None,
+                                num_packets=args.num_packets)
+    logger.info('{} packets written to {} ({} bytes)', num, args.output, size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# @title        : stix_packet_index.py
+# @description:
+#               packet offset index of raw telemetry files.
+#               The index is stored in a sidecar file next to the raw file and
+#               allows to decode a subset of packets without parsing the whole file.
+#               usage:
+#                   index = get_index('raw.bin')
+#                   records = select(index, spids=[54118], start_scet=t1, end_scet=t2)
+#                   packets = parse_packets('raw.bin', records)
+import os
+import mmap
+import hashlib
+import binascii
+import argparse
+import numpy as np
+from stix.core import stix_parser
+from stix.core import stix_logger
+
+logger = stix_logger.get_logger()
+
+INDEX_FILE_SUFFIX = '.index.npz'
+INDEX_VERSION = 2
+TM, TC = 0, 1
+INDEX_DTYPE = np.dtype([
+    ('offset', 'u8'),  #offset of the packet or of the line in the file, index of the xml element
+    ('length', 'u4'),  #length in bytes of the packet or of the line, 1 for xml elements
+    ('tmtc', 'u1'),
+    ('spid', 'i4'),  #0 for TC and unknown TM packets
+    ('service_type', 'u1'),
+    ('service_subtype', 'u1'),
+    ('seg_flag', 'u1'),
+    ('seq_count', 'u2'),
+    ('coarse_time', 'u4'),
+    ('fine_time', 'u2'),
+    ('hash', 'S16')  #same as packet['hash']
+])
+XML_ELEMENTS = {
+    'xml.tm.raw': 'PktRawResponseElement',
+    'xml.tc.hist': 'PktTcReportListElement'
+}
+#xml elements are read by stix_parser.iter_xml_elements, as when files are parsed.
+#They are referenced by their index, as the xml parser doesn't give their offsets
+
+
+def get_index_filename(raw_filename):
+    return raw_filename + INDEX_FILE_SUFFIX
+
+
+def get_file_signature(raw_filename):
+    stat = os.stat(raw_filename)
+    return np.array([INDEX_VERSION, stat.st_size, stat.st_mtime_ns],
+                    dtype=np.int64)
+
+
+def create_record(offset, length, header, packet):
+    is_tm = header['TMTC'] == 'TM'
+    return (offset, length, TM if is_tm else TC,
+            header['SPID'] if is_tm else 0, header['service_type'],
+            header['service_subtype'], header['seg_flag'],
+            header['seq_count'], header.get('coarse_time', 0),
+            header.get('fine_time', 0),
+            hashlib.shake_256(packet).hexdigest(8).encode())
+
+
+def index_buffer(parser, buf, offset=None, length=None):
+    """ create records of packets in a buffer
+    Parameters:
+        parser: StixTCTMParser
+        buf: buffer
+        offset, length: offset and length of the container (line or xml element)
+            in the file. If None, packet offsets and lengths are used
+    """
+    records = []
+    for start, end, header in parser.iter_headers(buf):
+        if offset is None:
+            records.append(
+                create_record(start, end - start, header, buf[start:end]))
+        else:
+            records.append(
+                create_record(offset, length, header, buf[start:end]))
+    return records
+
+
+def index_binary_file(parser, raw_filename):
+    if os.path.getsize(raw_filename) == 0:
+        return []
+    with open(raw_filename, 'rb') as in_file:
+        mapped = mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return index_buffer(parser, mapped)
+    finally:
+        mapped.close()
+
+
+def index_moc_ascii(parser, raw_filename):
+    records = []
+    offset = 0
+    with open(raw_filename, 'rb') as filein:
+        for line in filein:
+            try:
+                _, data_hex = line.strip().split()
+                data = binascii.unhexlify(data_hex)
+            except ValueError as e:
+                logger.warning('Line at {} ignored: {}', offset, e)
+            else:
+                records.extend(index_buffer(parser, data, offset, len(line)))
+            offset += len(line)
+    return records
+
+
+def get_xml_element_data(element, file_type):
+    """ raw packets of an xml element, None if the parser skips the element """
+    if not isinstance(element, dict):
+        return None
+    if file_type == 'xml.tm.raw':
+        if not element.get('Packet'):
+            return None
+        return binascii.unhexlify(
+            element['Packet'])[stix_parser.EDDS_PACKET_PREFIX_LENGTH:]
+    if 'ZIX' not in (element.get('CommandName') or '') or not element.get('RawBodyData'):
+        #platform commands are not parsed
+        return None
+    return binascii.unhexlify(element['RawBodyData'])
+
+
+def index_xml(parser, raw_filename, file_type):
+    records = []
+    with open(raw_filename, 'rb') as in_file:
+        for i, element in enumerate(
+                stix_parser.iter_xml_elements(in_file, XML_ELEMENTS[file_type])):
+            data = get_xml_element_data(element, file_type)
+            if data:
+                records.extend(index_buffer(parser, data, i, 1))
+    return records
+
+
+def build_index(raw_filename, file_type=None, parser=None):
+    """
+    Create the packet index of a raw file. Only packet headers are decoded.
+    Parameters:
+        raw_filename: raw data file (bin, ascii or xml)
+        file_type: file type, detected if not specified
+        parser: StixTCTMParser, a new one is created if not given
+    Returns:
+        NumPy structured array with INDEX_DTYPE, one record per packet
+    """
+    if not parser:
+        parser = stix_parser.StixTCTMParser()
+    if not file_type:
+        file_type = stix_parser.detect_filetype(raw_filename)
+    if file_type == 'bin':
+        records = index_binary_file(parser, raw_filename)
+    elif file_type == 'ascii':
+        records = index_moc_ascii(parser, raw_filename)
+    elif file_type in XML_ELEMENTS:
+        records = index_xml(parser, raw_filename, file_type)
+    else:
+        logger.error('Can not index {}, file type: {}', raw_filename, file_type)
+        return None
+    return np.array(records, dtype=INDEX_DTYPE)
+
+
+def save_index(raw_filename, index, file_type):
+    with open(get_index_filename(raw_filename), 'wb') as fout:
+        np.savez(fout,
+                 index=index,
+                 file_type=np.array(file_type),
+                 signature=get_file_signature(raw_filename))
+
+
+def load_index(raw_filename):
+    """
+    Load the index of a raw file
+    Returns:
+        index and file type, or (None, None) if the index doesn't exist
+        or is older than the raw file
+    """
+    index_filename = get_index_filename(raw_filename)
+    if not os.path.exists(index_filename):
+        return None, None
+    try:
+        with np.load(index_filename) as data:
+            if not np.array_equal(data['signature'],
+                                  get_file_signature(raw_filename)):
+                logger.info('Index {} is outdated', index_filename)
+                return None, None
+            return data['index'], str(data['file_type'])
+    except (OSError, KeyError, ValueError) as e:
+        logger.warning('Failed to load {}: {}', index_filename, e)
+    return None, None
+
+
+def get_index(raw_filename, file_type=None, parser=None):
+    """
+    Load the index of a raw file, the index is created and saved if it doesn't exist
+    Returns:
+        index and file type
+    """
+    index, index_file_type = load_index(raw_filename)
+    if index is not None:
+        return index, index_file_type
+    if not file_type:
+        file_type = stix_parser.detect_filetype(raw_filename)
+    index = build_index(raw_filename, file_type, parser)
+    if index is not None:
+        save_index(raw_filename, index, file_type)
+    return index, file_type
+
+
+def select(index, spids=None, start_scet=None, end_scet=None, tmtc=None):
+    """
+    Select index records
+    Parameters:
+        index: packet index
+        spids: list of SPIDs
+        start_scet, end_scet: SCET range, boundaries included
+        tmtc: TM or TC
+    Returns:
+        selected records
+    """
+    mask = np.ones(len(index), dtype=bool)
+    if spids:
+        mask &= np.isin(index['spid'], spids)
+    if tmtc is not None:
+        mask &= index['tmtc'] == tmtc
+    if start_scet is not None or end_scet is not None:
+        scet = index['coarse_time'] + index['fine_time'] / 65536.
+        if start_scet is not None:
+            mask &= scet >= start_scet
+        if end_scet is not None:
+            mask &= scet <= end_scet
+    return index[mask]
+
+
+def iter_xml_packets(raw_filename, records, file_type, parser):
+    """
+    Generator decoding the packets of the xml elements referenced by index records,
+    in the file order. The file is read up to the last element referenced
+    """
+    selected = set(records['offset'].tolist())
+    if not selected:
+        return
+    last = max(selected)
+    with open(raw_filename, 'rb') as fin:
+        for i, element in enumerate(
+                stix_parser.iter_xml_elements(fin, XML_ELEMENTS[file_type])):
+            if i in selected:
+                if file_type == 'xml.tm.raw':
+                    yield from parser.iter_telemetry_xml_element(element)
+                else:
+                    yield from parser.iter_telecommand_report_element(element)
+            if i >= last:
+                break
+
+
+def iter_packets(raw_filename, records, file_type, parser):
+    """
+    Generator decoding the packets referenced by index records.
+    Lines or xml elements containing several packets are decoded once
+    """
+    if file_type in XML_ELEMENTS:
+        yield from iter_xml_packets(raw_filename, records, file_type, parser)
+        return
+    last_offset = None
+    parser.receipt_utc = ''
+    with open(raw_filename, 'rb') as fin:
+        for record in records:
+            offset = int(record['offset'])
+            if offset == last_offset:
+                continue
+            last_offset = offset
+            fin.seek(offset)
+            data = fin.read(int(record['length']))
+            if file_type == 'bin':
+                yield from parser.iter_binary(data)
+            elif file_type == 'ascii':
+                parser.receipt_utc, data_hex = data.decode().strip().split()
+                yield from parser.iter_binary(binascii.unhexlify(data_hex))
+    parser.receipt_utc = ''
+
+
+def parse_packets(raw_filename, records=None, parser=None):
+    """
+    Decode the packets referenced by index records,  e.g.
+        parse_packets(filename, index[1200:1300])
+    Parameters:
+        raw_filename: raw data file
+        records: index records, all packets if None
+        parser: StixTCTMParser, a new one is created if not given
+    Returns:
+        decoded packets
+    """
+    if not parser:
+        parser = stix_parser.StixTCTMParser()
+    index, file_type = get_index(raw_filename, parser=parser)
+    if index is None:
+        return []
+    if records is None:
+        records = index
+    return parser.collect_packets(
+        iter_packets(raw_filename, records, file_type, parser))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description='Create packet index files of raw telemetry files')
+    arg_parser.add_argument('files', nargs='+', help='raw data files')
+    arg_parser.add_argument('-f',
+                            '--force',
+                            action='store_true',
+                            help='rebuild existing index files')
+    args = arg_parser.parse_args()
+    parser = stix_parser.StixTCTMParser()
+    for filename in args.files:
+        if args.force and os.path.exists(get_index_filename(filename)):
+            os.remove(get_index_filename(filename))
+        index, file_type = get_index(filename, parser=parser)
+        if index is not None:
+            logger.info('{}: {} packets indexed ({})', filename, len(index), file_type)
+
+
+if __name__ == '__main__':
+    main()
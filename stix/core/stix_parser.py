@@ -13,24 +13,61 @@ import re
 import struct as st
 import binascii
 import hashlib
+import time
+import mmap
+import threading
 import pathlib
-import xmltodict
-from scipy import interpolate
-from dateutil import parser as dtparser
+import multiprocessing
+import xml.etree.ElementTree as ET
+import numpy as np
+from stix.core import config
 from stix.core import stix_header
 from stix.core import stix_idb
 from stix.core import stix_global
 from stix.core import stix_logger
 from stix.core import stix_writer
+from stix.core import stix_dedup
+from stix.core import stix_profiler
 from stix.core import stix_context
 from stix.core.stix_datatypes import Parameter
 from stix.core import stix_decompressor
+from stix.core import stix_calibration
 from stix.core import stix_datetime
+from stix.core import stix_decoder_generator
 
 CONTEXT_UNPACK_FORMAT = ['B', '>H', 'BBB', '>I']
 UNSIGNED_UNPACK_FORMAT = ['B', '>H', 'BBB', '>I', 'BBBBB', '>IH']
 SIGNED_UNPACK_FORMAT = ['b', '>h', 'bbb', '>i', 'bbbbb', '>ih']
+COLUMN_WORD_DTYPES = {
+    'B': 'u1',
+    'H': '>u2',
+    'I': '>u4',
+    'b': 'i1',
+    'h': '>i2',
+    'i': '>i4'
+}
+HEADER_COLUMNS = [('coarse_time', 'u4'), ('fine_time', 'u2'),
+                  ('seq_count', 'u2'), ('seg_flag', 'u1'), ('SSID', 'i8')]
 HEX_SPACE = '0123456789ABCDEFabcdef'
+PARALLEL_CHUNK_SIZE = 16 * 1024 * 1024
+FOLLOW_SIGNATURE_SIZE = 4096
+#bytes at the beginning of a followed file used to detect a replaced file
+MOC_ASCII_BATCH_SIZE = 4 * 1024 * 1024
+#bytes of a MOC ascii file read and unhexlified at once
+TC_REPORT_BATCH_SIZE = 1000
+#TC history elements whose execution times are converted at once
+IDB_PROFILED_METHODS = [
+    'get_packet_type_offset', 'get_packet_type_info', 'get_telecommand_info',
+    'get_s2k_parameter_types', 'get_fixed_packet_structure',
+    'get_variable_packet_structure', 'get_telecommand_structure',
+    'is_variable_length_telecommand'
+]
+#IDB queries timed when profiling is enabled
+LAZY_PARAMETER_PARSERS = threading.local()
+#parsers used to decode lazy parameters in each thread, by decoding settings,
+#see get_packet_parameters
+EDDS_PACKET_PREFIX_LENGTH = 76
+#length of the EDDS header prepended to packets in xml files
 SCET_PARAMETERS = [
     'NIX00402', 'NIX00445', 'NIX00287', 'PIX00455', 'PIX00456', 'PIX0021',
     'PIX0022', 'PIX0025', 'PIX0026', 'PIX00086', 'PIX00087', 'PIX00009'
@@ -42,7 +79,6 @@ PARMETERS_CALIBRATION_ENABLED = [
 PARMETERS_CALIBRATION_ENABLED.extend(SCET_PARAMETERS)
 
 STIX_IDB = stix_idb.stix_idb()
-STIX_DECOMPRESSOR = stix_decompressor.StixDecompressor()
 logger = stix_logger.get_logger()
 
 
@@ -84,6 +120,67 @@ def detect_filetype(filename):
     return filetype
 
 
+def iter_batches(iterable, batch_size):
+    """ group items of an iterable into lists of up to batch_size items
+    """
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def xml_element_to_dict(element):
+    """
+    convert an xml element to a dictionary as xmltodict does: attributes are prefixed
+    with @, children are keyed by tag (in lists if repeated), stripped text of elements
+    without attributes and children is their value
+    """
+    text = (element.text or '').strip() or None
+    if not len(element) and not element.attrib:
+        return text
+    result = {'@' + key: value for key, value in element.attrib.items()}
+    for child in element:
+        key = child.tag.rpartition('}')[2]
+        value = xml_element_to_dict(child)
+        if key in result:
+            if not isinstance(result[key], list):
+                result[key] = [result[key]]
+            result[key].append(value)
+        else:
+            result[key] = value
+    if text:
+        result['#text'] = text
+    return result
+
+
+def iter_xml_elements(source, tag):
+    """
+    stream the elements with the given tag of an xml file, as dictionaries,
+    see xml_element_to_dict. Elements are removed from the tree once converted,
+    so memory doesn't grow with the size of the file
+    Parameters:
+        source: file name or file object
+        tag: tag of the elements, without namespace
+    """
+    parents = []
+    for event, element in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            parents.append(element)
+            continue
+        parents.pop()
+        if element.tag.rpartition('}')[2] != tag:
+            continue
+        item = xml_element_to_dict(element)
+        element.clear()
+        if parents:
+            parents[-1].remove(element)
+        yield item
+
+
 def slice_bits(data, offset, num_bits):
     """slice bits from buffer 
     Parameters:
@@ -119,7 +216,7 @@ def unpack_integer(raw, structure):
 
 def get_from_bytearray(buf, i, width=1):
     """slice bytes from a byte array
-
+       No copy is made if buf is a memoryview
     """
     data = buf[i:i + width]
     length = len(data)
@@ -128,6 +225,19 @@ def get_from_bytearray(buf, i, width=1):
     return True, i + length, data
 
 
+def is_packet_aligned(buf, start, end):
+    """
+    check that the bytes between start and end are whole TM/TC packets,
+    using the packet length of their headers (the packet is 7 bytes longer)
+    """
+    i = start
+    while i + 6 <= end:
+        if buf[i] not in stix_header.HEADER_FIRST_BYTE:
+            return False
+        i += ((buf[i + 4] << 8) | buf[i + 5]) + 7
+    return i == end
+
+
 def find_next_header(buf, i):
     """find next TC/TM packet header
     Parameters:
@@ -146,9 +256,36 @@ def find_next_header(buf, i):
     return stix_global.EOF
 
 
+def freeze_parse_tree(node, convert=None):
+    """
+    Convert a parse tree built with dictionaries to nested tuples,
+    which can be shared by all the packets of a SPID
+    Parameters:
+        node: root node
+        convert: function applied to node parameters, parameters are kept if None
+    Returns:
+        tuple of the children of the node, as (name, parameter, children)
+    """
+    return tuple(
+        (child['name'],
+         convert(child['parameter']) if convert else child['parameter'],
+         freeze_parse_tree(child, convert)) for child in node['children'])
+
+
+def get_variable_decode_args(par):
+    """ parameter decoding arguments of a node of a variable packet parse tree """
+    name = par['PCF_NAME']
+    return (int(par['VPD_OFFSET']), int(par['PCF_WIDTH']), int(par['PCF_PTC']),
+            int(par['PCF_PFC']), par['PCF_CURTX'], name
+            in PARMETERS_CALIBRATION_ENABLED)
+
+
 class StixParameterParser(object):
     def __init__(self):
-        pass
+        self.idb = stix_idb.stix_idb()
+        #IDB used to decode packets, see StixTCTMParser.set_idb
+        self.decompressor = stix_decompressor.StixDecompressor()
+        #state of the compressed packet being decoded, shared with the sub-parsers of a StixTCTMParser
 
     def decode_buffer(self,
                       in_data,
@@ -171,9 +308,8 @@ class StixParameterParser(object):
         raw_bin = in_data[int(offset):int(offset + nbytes)]
 
         if nbytes != len(raw_bin):
-            logger.error(
-                'Parameter {} length mismatch.  Expect: {} real: {}'.format(
-                    param_name, nbytes, len(raw_bin)))
+            logger.error('Parameter {} length mismatch.  Expect: {} real: {}',
+                         param_name, nbytes, len(raw_bin))
             return ''
         bin_struct = str(nbytes) + 's'  #signed char
         if param_type == 'U' and nbytes <= 6:
@@ -201,9 +337,8 @@ class StixParameterParser(object):
         elif len(raw) == 2:
             if param_type == 'T':
                 return round(float(raw[0]) + float(raw[1]) / 65536., 3)
-            logger.warning(
-                'Invalid unpacking parameter type: {}'.format(param_type))
-            return raw_bin
+            logger.warning('Invalid unpacking parameter type: {}', param_type)
+            return bytes(raw_bin)
         elif len(raw) == 3:  # 24-bit integer, a timestamp probably
             value = (raw[0] << 16) | (raw[1] << 8) | raw[2]
             if length < 16 and length % 8 != 0:
@@ -211,7 +346,8 @@ class StixParameterParser(object):
                 value = slice_bits(value, start_bit, length)
             return value
 
-        return raw_bin
+        return bytes(raw_bin)
+        #a copy, the input may be a view of a memory-mapped file
 
     def raw_to_eng(self, param_name, ref, raw_value, tmtc='TM'):
         """ convert raw value to engineering value
@@ -235,7 +371,8 @@ class StixParameterParser(object):
 
         if tmtc == 'TC':
             if ref:
-                return STIX_IDB.tcparam_interpret(ref, raw_value)
+                return stix_calibration.get_calibration(ref, 'TC',
+                                                        self.idb)(raw_value)
             return ''
         if param_name == 'NIX00125':  #temperature calibration factors, parameter from Richard on June 22, 2020
             try:
@@ -246,8 +383,8 @@ class StixParameterParser(object):
                     273.15, 2)
             except ValueError:
                 logger.warning(
-                    'Could not calibrate NIX00125 temperature raw value :{}'.
-                    format(raw_value))
+                    'Could not calibrate NIX00125 temperature raw value :{}',
+                    raw_value)
         if param_name == 'NIXD0003':
             return round(raw_value / 2.5, 1)  # archive memory to raw value
 
@@ -259,60 +396,7 @@ class StixParameterParser(object):
 
         if not ref:
             return ''
-        prefix = re.split(r'\d+', ref)[0]
-
-        if prefix in ['CIXTS', 'CAAT', 'CIXT']:
-            # textual interpret
-            rows = STIX_IDB.textual_interpret(ref, raw_value)
-            if rows:
-                return rows[0][0]
-            logger.warning(
-                'Missing textual calibration info. for {}'.format(ref))
-            return ''
-        elif prefix == 'CIXP':
-            # calibration
-            # Ref SCOS-2000 Database Import ICD
-            rows = STIX_IDB.get_calibration_curve(ref)
-            if len(rows) <= 1:
-                logger.warning(
-                    'Invalid calibration parameter {}: at least two data points needed '
-                    .format(ref))
-                return ''
-            elif len(rows) >= 2:
-                x_points = [float(row[0]) for row in rows]
-                y_points = [float(row[1]) for row in rows]
-
-                if len(rows) == 2:
-                    return round((y_points[1] - y_points[0]) /
-                                 (x_points[1] - x_points[0]) *
-                                 (raw_value - x_points[0]) + y_points[0], 3)
-                try:
-                    tck = interpolate.splrep(x_points, y_points)
-                    val = interpolate.splev(raw_value, tck)
-                    ret = round(float(val), 3)
-                except Exception as e:
-                    logger.warning('Failed to calibrate {} due to {}'.format(
-                        ref, str(e)))
-                    ret = ''
-                return ret
-            logger.warning('Missing calibration factors for {}'.format(ref))
-            return ''
-        elif prefix == 'NIX':
-            logger.warning('No information to convert {} . '.format(ref))
-            return ''
-        elif prefix == 'CIX':
-            rows = STIX_IDB.get_calibration_polynomial(ref)
-            if rows:
-                pol_coeff = ([float(x) for x in rows[0]])
-                x_points = ([math.pow(raw_value, i) for i in range(0, 5)])
-                sum_value = 0
-                for coeff, xval in zip(pol_coeff, x_points):
-                    sum_value += coeff * xval
-                return round(sum_value, 3)
-            logger.warning('Missing calibration factors for {}'.format(ref))
-            return ''
-
-        return ''
+        return stix_calibration.get_calibration(ref, 'TM', self.idb)(raw_value)
 
     def decode_parameter(self,
                          buf,
@@ -342,7 +426,7 @@ class StixParameterParser(object):
            parameter in STIX  parameter type. 
 
         """
-        param_type = STIX_IDB.get_s2k_parameter_types(ptc, pfc)  #1.79
+        param_type = self.idb.get_s2k_parameter_types(ptc, pfc)  #1.79
         raw_value = self.decode_buffer(buf, param_type, offset, offset_bits,
                                        width, name)
         eng_value = ''
@@ -354,7 +438,7 @@ class StixParameterParser(object):
             raw_int = raw_value
             try:
                 raw_int = int(raw_int)
-                result = STIX_DECOMPRESSOR.decompress_raw(name, raw_int)
+                result = self.decompressor.decompress_raw(name, raw_int)
                 if result is not None:
                     eng_value = result
             except (TypeError, ValueError):
@@ -365,12 +449,265 @@ class StixParameterParser(object):
         #return param['param']
 
 
+class StixFixedPacketDecodePlan(object):
+    """Decode plan of a fixed length telemetry packet
+
+    IDB parameter structures are interpreted only once per SPID. Byte offsets, bit shifts,
+    masks and struct formats are precomputed and all words of a packet are unpacked with
+    one struct.Struct call per non-overlapping layer.
+    The decoded parameters are identical to those returned by decode_parameter.
+    """
+
+    INT, INT24, TIME, BYTES, GENERIC = range(5)
+
+    def __init__(self, spid, param_structures, idb):
+        self.spid = spid
+        self.length = 0
+        #minimum data field length needed to use the plan
+        self.layers = []
+        self.entries = []
+        self.words = {}
+        #word (offset, struct code) of each value index
+        self.compile(param_structures, idb)
+
+    def compile(self, param_structures, idb):
+        words = {}
+        for par in param_structures:
+            offset = int(par['PLF_OFFBY']) - 16
+            offset_bits = int(par['PLF_OFFBI'])
+            width = int(par['PCF_WIDTH'])
+            ptc = int(par['PCF_PTC'])
+            pfc = int(par['PCF_PFC'])
+            name = par['PCF_NAME']
+            cal_ref = par['PCF_CURTX']
+            param_type = idb.get_s2k_parameter_types(ptc, pfc)
+            nbytes = math.ceil((width + offset_bits) / 8.)
+            kind, code = self.get_word_format(param_type, nbytes, width,
+                                              offset_bits)
+            if offset < 0:
+                kind = self.GENERIC
+            shift, mask = 0, 0
+            if kind == self.INT and width < 16 and not (width == 8
+                                                       and offset_bits == 0):
+                shift = nbytes * 8 - (offset_bits + width)
+                mask = (1 << width) - 1
+            elif kind == self.INT24 and width < 16 and width % 8 != 0:
+                shift = nbytes * 8 - (offset_bits + width)
+                mask = (1 << width) - 1
+            word = None
+            if kind != self.GENERIC:
+                word = (offset, code)
+                words[word] = None
+                self.length = max(self.length, offset + nbytes)
+            need_calibration = bool(
+                cal_ref) or name in PARMETERS_CALIBRATION_ENABLED
+            self.entries.append([
+                name, kind, word, shift, mask, cal_ref, need_calibration,
+                (param_type, offset, offset_bits, width)
+            ])
+
+        #words sharing the same bytes are decoded once;
+        #overlapping words are put into different layers
+        layers = []
+        for offset, code in sorted(words, key=lambda w: w[0]):
+            size = st.calcsize('>' + code)
+            for layer in layers:
+                if layer['end'] <= offset:
+                    break
+            else:
+                layer = {'end': 0, 'fmt': '>', 'num_values': 0}
+                layers.append(layer)
+            if offset > layer['end']:
+                layer['fmt'] += '{}x'.format(offset - layer['end'])
+            layer['fmt'] += code
+            words[(offset, code)] = (layers.index(layer), layer['num_values'])
+            layer['num_values'] += len(st.unpack('>' + code, bytes(size)))
+            layer['end'] = offset + size
+
+        #position of the first value of each word in the concatenated tuple
+        starts = []
+        total = 0
+        for layer in layers:
+            starts.append(total)
+            total += layer['num_values']
+            self.layers.append(st.Struct(layer['fmt']))
+        for entry in self.entries:
+            if entry[2] is not None:
+                word = entry[2]
+                ilayer, ivalue = words[word]
+                entry[2] = starts[ilayer] + ivalue
+                self.words[entry[2]] = word
+        self.entries = [tuple(entry) for entry in self.entries]
+
+    def get_word_format(self, param_type, nbytes, width, offset_bits):
+        """get struct format code of a parameter, see decode_buffer"""
+        if param_type in ('U', 'I') and nbytes <= 6:
+            if nbytes in (1, 2, 4):
+                code = UNSIGNED_UNPACK_FORMAT[
+                    nbytes - 1] if param_type == 'U' else SIGNED_UNPACK_FORMAT[
+                        nbytes - 1]
+                return self.INT, code.replace('>', '')
+            elif nbytes == 3:
+                return self.INT24, 'BBB' if param_type == 'U' else 'bbb'
+            elif nbytes == 5:
+                return self.BYTES, '5s'
+            #6 bytes integers are not supported by decode_buffer
+            return self.GENERIC, None
+        elif param_type == 'T':
+            if nbytes == 6:
+                return self.TIME, 'IH'
+            return self.GENERIC, None
+        if width < 16 and not (width == 8 and offset_bits == 0):
+            return self.GENERIC, None
+        return self.BYTES, '{}s'.format(nbytes)
+
+    def decode(self, buf, parser):
+        """decode parameters
+        Parameters:
+            buf: data field
+            parser: StixParameterParser used for calibration, decompression and for the
+                parameters not supported by the plan
+        Returns:
+            decoded parameters or None if the buffer is too short
+        """
+        if len(buf) < self.length:
+            return None
+        values = ()
+        for layer in self.layers:
+            values += layer.unpack_from(buf)
+        compressed = parser.decompressor.is_compressed()
+        parameters = []
+        for name, kind, index, shift, mask, cal_ref, need_calibration, args in self.entries:
+            if kind == self.INT:
+                raw_value = values[index]
+                if mask:
+                    raw_value = (raw_value >> shift) & mask
+            elif kind == self.INT24:
+                raw_value = (values[index] << 16) | (
+                    values[index + 1] << 8) | values[index + 2]
+                if mask:
+                    raw_value = (raw_value >> shift) & mask
+            elif kind == self.TIME:
+                raw_value = round(
+                    float(values[index]) + float(values[index + 1]) / 65536.,
+                    3)
+            elif kind == self.BYTES:
+                raw_value = values[index]
+            else:
+                param_type, offset, offset_bits, width = args
+                raw_value = parser.decode_buffer(buf, param_type, offset,
+                                                 offset_bits, width, name)
+            eng_value = ''
+            if need_calibration:
+                eng_value = parser.raw_to_eng(name, cal_ref, raw_value, 'TM')
+            if compressed and raw_value != '':
+                try:
+                    result = parser.decompressor.decompress_raw(
+                        name, int(raw_value))
+                    if result is not None:
+                        eng_value = result
+                except (TypeError, ValueError):
+                    pass
+            parameters.append((name, raw_value, eng_value, []))
+        return parameters
+
+    def get_word_column(self, rows, index):
+        """ decode a word of all packets at once
+        Parameters:
+            rows: 2D uint8 array, one data field per row
+            index: value index of the word
+        Returns:
+            a NumPy array
+        """
+        offset, code = self.words[index]
+        if code.endswith('s'):
+            nbytes = int(code[:-1])
+            return np.ascontiguousarray(rows[:, offset:offset +
+                                             nbytes]).view('V{}'.format(nbytes)).ravel()
+        if code == 'IH':
+            coarse = np.ascontiguousarray(rows[:, offset:offset + 4]).view(
+                '>u4').ravel().astype(np.float64)
+            fine = np.ascontiguousarray(rows[:, offset + 4:offset + 6]).view(
+                '>u2').ravel().astype(np.float64)
+            return np.round(coarse + fine / 65536., 3)
+        if code == 'BBB':
+            word = rows[:, offset:offset + 3].astype(np.uint32)
+            return (word[:, 0] << 16) | (word[:, 1] << 8) | word[:, 2]
+        dtype = COLUMN_WORD_DTYPES[code]
+        nbytes = np.dtype(dtype).itemsize
+        return np.ascontiguousarray(rows[:, offset:offset + nbytes]).view(
+            dtype).ravel().astype(dtype.replace('>', ''))
+
+    def decode_columns(self, buf, offsets, lengths, parser):
+        """decode raw values of many packets of the same SPID at once
+        Parameters:
+            buf: input buffer
+            offsets: offsets of the data fields in the buffer
+            lengths: lengths of the data fields, not shorter than the plan length
+            parser: StixParameterParser used for the parameters not supported by the plan
+        Returns:
+            a dictionary of parameter name and NumPy array of raw values, in IDB order
+        """
+        offsets = np.asarray(offsets, dtype=np.int64)
+        data = np.frombuffer(buf, dtype=np.uint8)
+        rows = data[offsets[:, None] + np.arange(self.length)]
+        words = {}
+        columns = {}
+        for name, kind, index, shift, mask, _, _, args in self.entries:
+            if kind in (self.INT, self.INT24) and self.words[index][1] != 'bbb':
+                if index not in words:
+                    words[index] = self.get_word_column(rows, index)
+                column = words[index]
+                if mask:
+                    column = (column >> shift) & mask
+            elif kind in (self.TIME, self.BYTES):
+                if index not in words:
+                    words[index] = self.get_word_column(rows, index)
+                column = words[index]
+            else:
+                #not vectorized
+                param_type, offset, offset_bits, width = args
+                column = np.empty(len(offsets), dtype=object)
+                for i, (start, length) in enumerate(zip(offsets, lengths)):
+                    start = int(start)
+                    column[i] = parser.decode_buffer(
+                        buf[start:start + length], param_type, offset,
+                        offset_bits, width, name)
+            columns[name] = column
+        return columns
+
+    def calibrate_columns(self, columns, parser):
+        """calibrate the raw values returned by decode_columns
+        Parameters:
+            columns: dictionary of parameter name and NumPy array of raw values
+            parser: StixParameterParser used for calibration
+        Returns:
+            a dictionary of parameter name and NumPy array of engineering values,
+            the values decode returns. Parameters without calibration have empty strings
+        """
+        eng_columns = {}
+        for name, _, _, _, _, cal_ref, need_calibration, _ in self.entries:
+            column = columns[name]
+            if not need_calibration:
+                eng_columns[name] = np.full(len(column), '', dtype=object)
+            elif (cal_ref and name not in PARMETERS_CALIBRATION_ENABLED
+                  and column.dtype.kind in 'iu'):
+                eng_columns[name] = stix_calibration.calibrate(
+                    cal_ref, column, 'TM', parser.idb)
+            else:
+                #conversions implemented in raw_to_eng
+                eng_columns[name] = np.array([
+                    parser.raw_to_eng(name, cal_ref, raw_value, 'TM')
+                    for raw_value in column.tolist()
+                ], dtype=object)
+        return eng_columns
+
+
 class StixVariableTelemetryPacketParser(StixParameterParser):
     """Variable length telemetry packet parser
     """
     def __init__(self):
         super(StixVariableTelemetryPacketParser, self).__init__()
-        self.last_spid = -1
         self.last_num_bits = 0
         self.last_data_width = 0
         self.current_offset_bit = 0
@@ -382,6 +719,10 @@ class StixVariableTelemetryPacketParser(StixParameterParser):
         self.last_offset = 0
         self.results_tree = []
         self.results_dict = {}
+        self.parse_trees = {}
+        #parse trees and minimum lengths of packets
+        self.decoders = {}
+        self.generated_decoders_enabled = True
 
     def init_nodes(self):
         """Initialize parse tree
@@ -409,17 +750,58 @@ class StixVariableTelemetryPacketParser(StixParameterParser):
         self.results_tree[:] = []
         self.results_dict = {}
         self.results_dict.clear()
-        if spid != self.last_spid:
-            self.init_nodes()
-            self.build_parse_tree()
+        tree, self.length_min = self.get_parse_tree(spid)
 
-        self.last_spid = spid
         packet_length = len(self.buffer)
         if self.length_min > packet_length:
             return 0, None, stix_global.VARIABLE_PACKET_LENGTH_MISMATCH
-        self.walk(self.nodes[0], self.results_tree)
+        decoder = self.get_decoder(
+            spid) if self.generated_decoders_enabled else None
+        if decoder:
+            self.current_offset, self.results_tree = decoder(self, data)
+        else:
+            self.walk(tree, 1, self.results_tree)
         return self.current_offset, self.results_tree, stix_global.OK
 
+    def get_decoder(self, spid):
+        """
+        Get the generated decoder of a packet, see stix_decoder_generator.
+        Returns:
+            decoder, or None if the packet is decoded by walking its parse tree
+        """
+        key = (self.idb.filename, spid)
+        try:
+            return self.decoders[key]
+        except KeyError:
+            decoder = None
+            if spid in stix_decoder_generator.GENERATED_DECODER_SPIDS:
+                tree, _ = self.get_parse_tree(spid)
+                decoder = stix_decoder_generator.get_decoder(
+                    spid, tree, self.decompressor, self.idb)
+            self.decoders[key] = decoder
+            return decoder
+
+    def get_parse_tree(self, spid):
+        """
+        Get the parse tree of a packet, it is built once per SPID and IDB.
+        The tree is immutable, repeater counters are given to walk
+        Returns:
+            tree and minimum packet length
+        """
+        key = (self.idb.filename, spid)
+        try:
+            return self.parse_trees[key]
+        except KeyError:
+            self.spid = spid
+            self.init_nodes()
+            self.build_parse_tree()
+            result = (freeze_parse_tree(self.nodes[0],
+                                        get_variable_decode_args),
+                      self.length_min)
+            self.nodes = []
+            self.parse_trees[key] = result
+            return result
+
     def create_parse_node(self,
                           name,
                           parameter=None,
@@ -450,7 +832,7 @@ class StixVariableTelemetryPacketParser(StixParameterParser):
         """
         To build a parameter parse tree
         """
-        param_pcf_structures = STIX_IDB.get_variable_packet_structure(
+        param_pcf_structures = self.idb.get_variable_packet_structure(
             self.spid)
 
         mother = self.nodes[0]
@@ -473,27 +855,26 @@ class StixVariableTelemetryPacketParser(StixParameterParser):
                 mother = node
                 repeater.append({'node': node, 'counter': rpsize})
 
-    def walk(self, mother, parameters):
-        if not mother:
-            return
-        counter = mother['counter']
-        #mother_name = mother['name']
+    def walk(self, nodes, counter, parameters):
+        """
+        decode the parameters of a parse tree
+        Parameters:
+            nodes: nodes of the tree, see freeze_parse_tree
+            counter: number of repetitions
+            parameters: list to which decoded parameters are appended
+        """
         for i in range(0, counter):
-            for pnode in mother['children']:
-                if not pnode or self.current_offset > len(self.buffer):
+            for name, args, children in nodes:
+                if self.current_offset > len(self.buffer):
                     return
-                ret = self.parse_node(pnode)
-                #param = Parameter(ret)
-                param = ret
-                if pnode['children']:
-                    #num_children = param.raw_int
+                param = self.parse_node(name, args)
+                if children:
                     num_children = to_int(param[1])
                     is_valid = False
                     if isinstance(num_children, int):
                         if num_children > 0:
-                            pnode['counter'] = num_children
                             is_valid = True
-                            self.walk(pnode, param[3])
+                            self.walk(children, num_children, param[3])
                             # if mother_name == 'NIXD0159':
                             # correction for Science L0 data, ICD not fully consistent with IDB,
                             # STIX ICD-0812-ESC Table 93 P123
@@ -503,24 +884,18 @@ class StixVariableTelemetryPacketParser(StixParameterParser):
                         if param[0] != 'NIXD0159':
                             #repeater NIXD0159 can be zero according to STIX ICD-0812-ESC Table 93 P123
                             logger.warning(
-                                'Repeater {}  has an invalid value: {}'.format(
-                                    pnode['name'], param[1]))
+                                'Repeater {}  has an invalid value: {}', name,
+                                param[1])
 
                 parameters.append(param)
 
-    def parse_node(self, node):
+    def parse_node(self, name, args):
         """
         decode a parameter.
-        The offset, offset bit and parameter name are described in 'node'
+        The offset, offset bit and parameter type are given in args,
+        see get_variable_decode_args
         """
-        par = node['parameter']
-
-        offset_bits = int(par['VPD_OFFSET'])
-        width = int(par['PCF_WIDTH'])
-        ptc = int(par['PCF_PTC'])
-        pfc = int(par['PCF_PFC'])
-        cal_ref = par['PCF_CURTX']
-        name = node['name']
+        offset_bits, width, ptc, pfc, cal_ref, calibration_enabled = args
 
         if width % 8 != 0:
             if offset_bits < 0:
@@ -537,9 +912,6 @@ class StixVariableTelemetryPacketParser(StixParameterParser):
 
         offset = self.last_offset
         offset_bits = self.current_offset_bit
-        calibration_enabled = False
-        if name in PARMETERS_CALIBRATION_ENABLED:
-            calibration_enabled = True
 
         #Don't convert raw to eng for variable length packets except those in the list
         return self.decode_parameter(self.buffer, name, offset, offset_bits,
@@ -609,6 +981,7 @@ class StixTelecommandParser(StixParameterParser):
         self.results_tree = []
         self.param_structure = []
         self.buffer = None
+        self.parse_trees = {}
 
     def parse(self, name, buf):
         """
@@ -618,8 +991,8 @@ class StixTelecommandParser(StixParameterParser):
         self.tc_name = name
         self.param_structure = []
         self.current_bit_offset = 0
-        is_variable = STIX_IDB.is_variable_length_telecommand(name)
-        self.param_structure = STIX_IDB.get_telecommand_structure(name)
+        is_variable = self.idb.is_variable_length_telecommand(name)
+        self.param_structure = self.idb.get_telecommand_structure(name)
         if is_variable:
             return self.parse_variable_telecommand()
         return self.parse_fixed_telecommand()
@@ -678,18 +1051,32 @@ class StixTelecommandParser(StixParameterParser):
         self.current_bit_offset = 0
         self.length_min = 0
         self.results_tree = []
-        self.nodes = []
-        self.nodes.append(self.create_parse_node('top', counter=1))
-        self.nodes[0]['children'] = []
-        self.length_min = 0
-        self.build_parse_tree()
+        tree, self.length_min = self.get_parse_tree()
         packet_length = len(self.buffer)
         if self.length_min > packet_length:
             return 0, None, stix_global.VARIABLE_PACKET_LENGTH_MISMATCH
-        self.walk(self.nodes[0], self.results_tree)
+        self.walk(tree, 1, self.results_tree)
         return int(self.current_bit_offset /
                    8), self.results_tree, stix_global.OK
 
+    def get_parse_tree(self):
+        """
+        Get the parse tree of the current telecommand, built once per telecommand and IDB
+        Returns:
+            tree and minimum telecommand length
+        """
+        key = (self.idb.filename, self.tc_name)
+        try:
+            return self.parse_trees[key]
+        except KeyError:
+            self.nodes = [self.create_parse_node('top', counter=1)]
+            self.length_min = 0
+            self.build_parse_tree()
+            result = (freeze_parse_tree(self.nodes[0]), self.length_min)
+            self.nodes = []
+            self.parse_trees[key] = result
+            return result
+
     def create_parse_node(self,
                           name,
                           parameter=None,
@@ -737,43 +1124,75 @@ class StixTelecommandParser(StixParameterParser):
                 mother = node
                 repeater.append({'node': node, 'counter': rpsize})
 
-    def walk(self, mother, parameters):
-        if not mother:
-            return
-        counter = mother['counter']
+    def walk(self, nodes, counter, parameters):
         for i in range(0, counter):
-            for pnode in mother['children']:
-                if not pnode or self.current_bit_offset > 8 * len(self.buffer):
+            for name, parameter, children in nodes:
+                if self.current_bit_offset > 8 * len(self.buffer):
                     return
-                ret = self.parse_one(pnode['parameter'],
-                                     False,
-                                     calibration_enabled=True)
-                param = ret
-                if pnode['children']:
+                param = self.parse_one(parameter,
+                                       False,
+                                       calibration_enabled=True)
+                if children:
                     #num_children = param['raw_int']
                     num_children = to_int(param[1])
                     is_valid = False
                     if isinstance(num_children, int):
                         if num_children > 0:
-                            pnode['counter'] = num_children
                             is_valid = True
-                            #self.walk(pnode, param.children)
-                            self.walk(pnode, param[3])
+                            self.walk(children, num_children, param[3])
                     if not is_valid:
                         logger.warning(
-                            'Repeater {}  has an invalid value: {}. '.format(
-                                pnode['name'], param[1]))
+                            'Repeater {}  has an invalid value: {}. ', name,
+                            param[1])
 
                 #parameters.append(param.as_tuple())
                 parameters.append(param)
 
 
+class StixIDBSelector(object):
+    """
+    Select IDBs by the validity periods in the configuration, see config.get_idb_periods.
+    The periods are converted to SCET once. Consecutive packets are usually in the same period,
+    which is checked first
+    """
+    def __init__(self):
+        self.periods = None
+        self.last_period = None
+
+    def get_periods(self):
+        if self.periods is None:
+            self.periods = []
+            for start, end, filename in config.get_idb_periods():
+                try:
+                    self.periods.append(
+                        (stix_datetime.utc2scet(start.isoformat()),
+                         stix_datetime.utc2scet(end.isoformat()), filename))
+                except Exception as e:
+                    logger.warning(
+                        'Failed to convert the validity period of {} to SCET: {}',
+                        filename, e)
+        return self.periods
+
+    def get_filename(self, scet):
+        """ IDB valid at the given SCET, None if there isn't any """
+        period = self.last_period
+        if period and period[0] < scet <= period[1]:
+            return period[2]
+        for period in self.get_periods():
+            if period[0] < scet <= period[1]:
+                self.last_period = period
+                return period[2]
+        return None
+
+
 class StixTCTMParser(StixParameterParser):
     def __init__(self):
         super(StixTCTMParser, self).__init__()
         self.vp_tm_parser = StixVariableTelemetryPacketParser()
         self.tc_parser = StixTelecommandParser()
         self.context_parser = StixContextParser()
+        for parser in [self.vp_tm_parser, self.tc_parser, self.context_parser]:
+            parser.decompressor = self.decompressor
         self.selected_services = []
         self.selected_spids = []
         #self.store_binary = True
@@ -786,10 +1205,23 @@ class StixTCTMParser(StixParameterParser):
         self.receipt_utc = ''
 
         self.store_packet_enabled = True
+        self.lazy_parameters = False
         self.packet_writer = None
         self.S20_excluded = False
+        self.idb_selector = None
+        #IDBs are selected by packet time if set
+        self.idb_versions = []
+        #versions of the IDBs used, see set_idb
+        self.decoding_settings = None
+        #settings attached to lazy packets, see get_decoding_settings
+        self.profiler = None
+        #time of parsing stages recorded if set
 
         self.stix_alerts = []
+        self.fixed_packet_plans = {}
+        #decode plans of fixed packets
+        self.follow_states = {}
+        #last parsed byte offsets and line numbers of growing files
         self.parser_counter = {}
         #parser counter
         self.reset_counter()
@@ -836,6 +1268,84 @@ class StixTCTMParser(StixParameterParser):
         """
         self.store_packet_enabled = status
 
+    def set_lazy_parameters_enabled(self, status):
+        """
+            only decode packet headers. Packets carry the raw data field and the settings
+            used to decode it, parameters are decoded when they are accessed,
+            see decode_parameters and get_packet_parameters.
+            Packets are decoded before they are given to the packet writer
+        """
+        self.lazy_parameters = status
+
+    def get_decoding_settings(self):
+        """
+            settings of the parser attached to lazy packets, so that their parameters
+            are decoded as this parser would decode them: IDB file name and
+            generated decoder flag. Packets parsed with the same settings share the dictionary
+        """
+        settings = self.decoding_settings
+        if (settings is None or settings['idb'] != self.idb.filename
+                or settings['generated_decoders'] !=
+                self.vp_tm_parser.generated_decoders_enabled):
+            settings = {
+                'idb': self.idb.filename,
+                'generated_decoders':
+                self.vp_tm_parser.generated_decoders_enabled
+            }
+            self.decoding_settings = settings
+        return settings
+
+    def set_idb_selection_enabled(self, status):
+        """
+            decode telemetry packets with the IDB valid at their SCET, according to
+            the IDB validity periods in the configuration. Telecommands are decoded with the
+            IDB in use. Recently used IDBs are kept in memory, see stix_idb.get_idb
+        """
+        self.idb_selector = StixIDBSelector() if status else None
+
+    def set_idb(self, idb):
+        """
+            decode packets with the given IDB. The IDB is only used by this parser,
+            the default IDB shared by the other modules is not changed
+        """
+        self.use_idb(idb)
+        self.add_idb_version(idb.get_idb_version())
+
+    def use_idb(self, idb):
+        """
+            use an IDB in this parser and its sub-parsers. IDB queries are timed through
+            a view of the IDB if profiling is enabled, as the IDB may be shared
+        """
+        if isinstance(idb, stix_profiler.TimedObject):
+            idb = idb.timed_object
+        if self.profiler:
+            idb = stix_profiler.TimedObject(self.profiler,
+                                            stix_profiler.IDB_LOOKUP, idb,
+                                            IDB_PROFILED_METHODS)
+        self.idb = idb
+        for parser in [self.vp_tm_parser, self.tc_parser, self.context_parser]:
+            parser.idb = idb
+
+    def add_idb_version(self, idb_version):
+        """ record the version of an IDB used to decode packets """
+        if idb_version not in self.idb_versions:
+            self.idb_versions.append(idb_version)
+            if self.packet_writer:
+                self.packet_writer.add_idb_version(idb_version)
+
+    def select_idb(self, header):
+        """ use the IDB valid at the SCET of a telemetry packet """
+        filename = self.idb_selector.get_filename(header['SCET'])
+        if filename and filename != self.idb.filename:
+            self.set_idb(stix_idb.get_idb(filename))
+
+    def set_generated_decoders_enabled(self, status):
+        """
+            decode high volume variable length packets with generated decoders,
+            see stix_decoder_generator
+        """
+        self.vp_tm_parser.generated_decoders_enabled = status
+
     def set_packet_filter(self, selected_services=None, selected_spids=None):
         """ only decoded packets with the given services or spids
         """
@@ -858,7 +1368,7 @@ class StixTCTMParser(StixParameterParser):
         if len(packet) < 16:
             logger.warning("Packet length < 16. Packet ignored!")
             return stix_global.PACKET_TOO_SHORT, None
-        if ord(packet[0:1]) not in stix_header.TM_HEADER_FIRST_BYTE:
+        if packet[0] not in stix_header.TM_HEADER_FIRST_BYTE:
             return stix_global.HEADER_FIRST_BYTE_INVALID, None
         header_raw = st.unpack('>HHHBBBBIH', packet[0:16])
         header = {}
@@ -882,9 +1392,8 @@ class StixTCTMParser(StixParameterParser):
             constrains = stix_header.TELECOMMAND_HEADER_CONSTRAINTS
         for name, lim in constrains.items():
             if header[name] not in lim:
-                logger.warning(
-                    'Header {} value {} violates the range: {} '.format(
-                        name, header[name], lim))
+                logger.warning('Header {} value {} violates the range: {} ',
+                               name, header[name], lim)
                 return stix_global.HEADER_INVALID
         return stix_global.OK
 
@@ -893,7 +1402,7 @@ class StixTCTMParser(StixParameterParser):
         """
         service_type = header['service_type']
         service_subtype = header['service_subtype']
-        offset, width = STIX_IDB.get_packet_type_offset(
+        offset, width = self.idb.get_packet_type_offset(
             service_type, service_subtype)
         # see solar orbit ICD Page 36
         ssid = -1
@@ -908,7 +1417,7 @@ class StixTCTMParser(StixParameterParser):
                 return stix_global.PACKET_TOO_SHORT
             res = st.unpack(bin_struct, raw)
             ssid = res[0]
-        info = STIX_IDB.get_packet_type_info(service_type, service_subtype,
+        info = self.idb.get_packet_type_info(service_type, service_subtype,
                                              ssid)
         if not info:
             return stix_global.NO_PID_INFO_IN_IDB
@@ -927,8 +1436,31 @@ class StixTCTMParser(StixParameterParser):
             #context file report parsing
             # not to use IDB
             return self.context_parser.parse(buf)
+        plan = self.get_fixed_packet_decode_plan(spid)
+        parameters = plan.decode(buf, self)
+        if parameters is not None:
+            return parameters
+        #data field shorter than expected, decode parameter by parameter
+        return self.decode_fixed_telemetry_parameters(buf, spid)
+
+    def get_fixed_packet_decode_plan(self, spid):
+        """ get the decode plan of a fixed packet. It is compiled once per SPID
+        """
+        key = (self.idb.filename, spid)
+        #plans are invalid once another IDB is loaded
+        try:
+            return self.fixed_packet_plans[key]
+        except KeyError:
+            plan = StixFixedPacketDecodePlan(
+                spid, self.idb.get_fixed_packet_structure(spid), self.idb)
+            self.fixed_packet_plans[key] = plan
+            return plan
+
+    def decode_fixed_telemetry_parameters(self, buf, spid):
+        """ decode parameters of a fixed packet one by one using IDB parameter structures
+        """
         parameters = []
-        param_structures = STIX_IDB.get_fixed_packet_structure(spid)
+        param_structures = self.idb.get_fixed_packet_structure(spid)
         for par in param_structures:
             offset = int(par['PLF_OFFBY']) - 16
             offset_bits = int(par['PLF_OFFBI'])
@@ -967,10 +1499,9 @@ class StixTCTMParser(StixParameterParser):
                 header['subtype'] = subtype
             except Exception as e:
                 logger.warning(
-                    'Error occurred when parsing TC({},{}) due to {}'.format(
-                        header['service_type'], header['service_subtype'],
-                        str(e)))
-        info = STIX_IDB.get_telecommand_info(header)
+                    'Error occurred when parsing TC({},{}) due to {}',
+                    header['service_type'], header['service_subtype'], e)
+        info = self.idb.get_telecommand_info(header)
         if not info:
             logger.error(
                 'Failed to retrieve telecommand information from the database')
@@ -1017,46 +1548,82 @@ class StixTCTMParser(StixParameterParser):
             i: starting offset
             header_auxiliary: information attached to header, it must a dictionary
         Returns:
-            decoded packets in python list if ret_packets=True
+            decoded packets in python list if packet buffer is enabled
+        """
+        return self.collect_packets(
+            self.iter_binary(buf, i, header_auxiliary))
+
+    def collect_packets(self, packet_iter):
+        """
+        Store decoded packets in a list if packet buffer is enabled
+        and send them to the packet writer
         """
         packets = []
+        for packet in packet_iter:
+            if self.store_packet_enabled:
+                packets.append(packet)
+            if self.packet_writer:
+                self.decode_parameters(packet)
+                self.packet_writer.write_one(packet)
+        return packets
+
+    def iter_binary(self, buf, i=0, header_auxiliary=None, receipt_times=None):
+        """
+        Generator yielding packets as they are decoded
+        Inputs:
+            buffer, i.e., the input binary array
+            i: starting offset
+            header_auxiliary: information attached to header, it must a dictionary
+            receipt_times: offsets of the lines of a MOC ascii file in the buffer and
+                their receipt times, see iter_moc_ascii_lines
+        """
         length = len(buf)
+        line_index = 0
         self.inc_counter('total_length', length)
         if i >= length:
-            return []
-        raw_binary = b''
+            return
+        profiler = self.profiler
         while i < length and not self.stop_parsing:
             packet = None
-            STIX_DECOMPRESSOR.reset()
+            packet_start = i
+            if profiler:
+                start_time = time.perf_counter()
+            self.decompressor.reset()
             if buf[i] in stix_header.TM_HEADER_FIRST_BYTE:
                 status, i, header_raw = get_from_bytearray(buf, i, 16)
                 if status == stix_global.EOF:
                     break
+                if profiler:
+                    header_start_time = time.perf_counter()
                 header_status, header = self.parse_telemetry_header(header_raw)
+                if profiler:
+                    profiler.add(stix_profiler.HEADER,
+                                 time.perf_counter() - header_start_time)
                 if header_status != stix_global.OK:
-                    logger.warning('Bad header at {}, code {} '.format(
-                        i, header_status))
+                    logger.warning('Bad header at {}, code {} ', i,
+                                   header_status)
                     self.inc_counter('num_bad_headers')
                     continue
 
                 self.inc_counter('num_tm')
+                if self.idb_selector:
+                    self.select_idb(header)
 
                 data_field_length = header['length'] - 9
                 status, i, data_field_raw = get_from_bytearray(
                     buf, i, data_field_length)
                 if status == stix_global.EOF:
                     logger.warning(
-                        "Incomplete packet, the last {} bytes  were not parsed"
-                        .format(len(data_field_raw)))
+                        "Incomplete packet, the last {} bytes  were not parsed",
+                        len(data_field_raw))
                     break
                 ret = self.parse_data_field_header(header, data_field_raw,
                                                    data_field_length)
                 if ret != stix_global.OK:
                     logger.warning(
-                        'Missing information in the IDB to decoded the data starting at {} '
-                        .format(i))
+                        'Missing information in the IDB to decoded the data starting at {} ',
+                        i)
                     continue
-                tpsd = header['TPSD']
                 spid = header['SPID']
                 self.inc_counter('spid', spid)
                 if self.selected_services:
@@ -1068,21 +1635,10 @@ class StixTCTMParser(StixParameterParser):
                         self.inc_counter('num_filtered')
                         continue
 
-                STIX_DECOMPRESSOR.init(spid)
-
                 parameters = None
-                if tpsd == -1:
-                    #it is a fixed length telemetry packet
-                    parameters = self.parse_fixed_telemetry_packet(
-                        data_field_raw, spid)
-                else:
-                    # variable length telemetry packet
-                    num_read, parameters, status = self.vp_tm_parser.parse(
-                        data_field_raw, spid)
-                    if num_read != data_field_length:
-                        logger.warning(
-                            ' Packet (SPID {}) data field size: {}B, actual read: {}B'
-                            .format(spid, data_field_length, num_read))
+                if not self.lazy_parameters:
+                    parameters = self.decode_telemetry_parameters(
+                        header, data_field_raw)
 
                 if header['service_type'] == 5 or (
                         header['service_type'] == 1
@@ -1091,9 +1647,6 @@ class StixTCTMParser(StixParameterParser):
 
                 packet = {'header': header, 'parameters': parameters}
                 self.inc_counter('num_tm_parsed')
-                raw_binary = header_raw + data_field_raw
-                #if self.store_binary:
-                #    packet['bin'] = raw_binary
 
                 #unique id
 
@@ -1101,16 +1654,21 @@ class StixTCTMParser(StixParameterParser):
 
                 if len(buf) - i < 10:
                     logger.warning(
-                        "Incomplete packet. The last {} bytes  were not parsed"
-                        .format(len(buf)))
+                        "Incomplete packet. The last {} bytes  were not parsed",
+                        len(buf) - i)
                     break
+                if profiler:
+                    header_start_time = time.perf_counter()
                 header_status, header = self.parse_telecommand_header(buf, i)
+                if profiler:
+                    profiler.add(stix_profiler.HEADER,
+                                 time.perf_counter() - header_start_time)
                 i += 10
                 if header_status != stix_global.OK:
                     self.inc_counter('num_bad_headers')
                     logger.warning(
-                        "Invalid telecommand header. ERROR code: {}, Current cursor at {} "
-                        .format(header_status, i - 10))
+                        "Invalid telecommand header. ERROR code: {}, Current cursor at {} ",
+                        header_status, i - 10)
                     continue
                 self.inc_counter('num_tc')
                 data_field_length = header['length'] + 1 - 4
@@ -1122,19 +1680,12 @@ class StixTCTMParser(StixParameterParser):
                     if header['service_type'] not in self.selected_services:
                         self.inc_counter('num_filtered')
                         continue
-                telecommand_name = header['name']
-                num_read, parameters, status = self.tc_parser.parse(
-                    telecommand_name, data_field_raw)
-                if num_read != data_field_length - 2:  #the last two bytes is CRC
-                    logger.warning(
-                        ' TC {} data field size: {}B, actual read: {}B'.format(
-                            telecommand_name, data_field_length, num_read))
-
-                if telecommand_name == 'ZIX20128' and parameters:
-                    #S20 detailed structure  not defined in ICD
-                    if self.S20_excluded:
-                        continue
-                    self.parse_service_20(parameters)
+                if header['name'] == 'ZIX20128' and self.S20_excluded:
+                    continue
+                parameters = None
+                if not self.lazy_parameters:
+                    parameters = self.decode_telecommand_parameters(
+                        header, data_field_raw)
 
                 if header[
                         'service_type'] == 5 and header['service_subtype'] > 1:
@@ -1142,38 +1693,201 @@ class StixTCTMParser(StixParameterParser):
                     #used for instrument health tracking
                 packet = {'header': header, 'parameters': parameters}
                 self.inc_counter('num_tc_parsed')
-                raw_binary = buf[i:i + 10] + data_field_raw
-                #if self.store_binary:
-                #    packet['bin'] = raw_binary
 
             else:
                 old_i = i
-                logger.warning('Unrecognized byte: {} at Pos {}'.format(
-                    hex(buf[i]), i))
+                logger.warning('Unrecognized byte: {:#x} at Pos {}', buf[i], i)
                 i = find_next_header(buf, i)
                 if i == stix_global.EOF:
                     break
                 self.inc_counter('num_bad_bytes', i - old_i)
-                logger.warning(
-                    'New header found at Pos {}, {} bytes ignored!'.format(
-                        i, i - old_i))
+                logger.warning('New header found at Pos {}, {} bytes ignored!',
+                               i, i - old_i)
 
             if packet:
-                packet['hash'] = hashlib.shake_256(raw_binary).hexdigest(8)
+                if self.lazy_parameters:
+                    packet['data_field'] = bytes(data_field_raw)
+                    packet['decoding'] = self.get_decoding_settings()
+                    #decoded by decode_parameters when needed, with the same settings
+                #the packet is contiguous in the buffer, no copy needed to hash it
+                packet['hash'] = self.hash_packet(buf[packet_start:i])
                 if header_auxiliary:
                     for key, val in header_auxiliary.items():
                         packet['header'][key] = val
                 else:
+                    if receipt_times:
+                        line_offsets, receipt_utcs = receipt_times
+                        while (line_index + 1 < len(line_offsets)
+                               and line_offsets[line_index + 1] <= packet_start):
+                            line_index += 1
+                        self.receipt_utc = receipt_utcs[line_index]
                     self.attach_timestamps(packet)
-
-                if self.store_packet_enabled:
-                    packets.append(packet)
-                if self.packet_writer:
-                    self.packet_writer.write_one(packet)
+                if profiler:
+                    profiler.add_packet(
+                        header['SPID'] if header['TMTC'] == 'TM' else
+                        header['name'], i - packet_start,
+                        time.perf_counter() - start_time)
+                yield packet
 
             logger.progress(i, length)
 
-        return packets
+    def hash_packet(self, packet_raw):
+        """ hash of the raw packet, used to identify packets """
+        return hashlib.shake_256(packet_raw).hexdigest(8)
+
+    def decode_telemetry_parameters(self, header, data_field_raw):
+        """ decode the data field of a telemetry packet
+        """
+        spid = header['SPID']
+        self.decompressor.init(spid)
+        if header['TPSD'] == -1:
+            #it is a fixed length telemetry packet
+            return self.parse_fixed_telemetry_packet(data_field_raw, spid)
+        # variable length telemetry packet
+        num_read, parameters, status = self.vp_tm_parser.parse(
+            data_field_raw, spid)
+        if num_read != len(data_field_raw):
+            logger.warning(
+                ' Packet (SPID {}) data field size: {}B, actual read: {}B',
+                spid, len(data_field_raw), num_read)
+        return parameters
+
+    def decode_telecommand_parameters(self, header, data_field_raw):
+        """ decode the data field of a telecommand
+        """
+        telecommand_name = header['name']
+        num_read, parameters, status = self.tc_parser.parse(
+            telecommand_name, data_field_raw)
+        if num_read != len(data_field_raw) - 2:  #the last two bytes is CRC
+            logger.warning(' TC {} data field size: {}B, actual read: {}B',
+                           telecommand_name, len(data_field_raw), num_read)
+        if telecommand_name == 'ZIX20128' and parameters:
+            #S20 detailed structure  not defined in ICD
+            self.parse_service_20(parameters)
+        return parameters
+
+    def decode_parameters(self, packet):
+        """
+        Decode the parameters of a packet parsed with lazy parameters enabled.
+        The packet is decoded with the IDB it was parsed with.
+        The parameters are cached in the packet, its raw data field and
+        decoding settings are removed.
+        Returns:
+            packet parameters
+        """
+        if packet.get('parameters') is None and 'data_field' in packet:
+            header = packet['header']
+            filename = packet.get('decoding', {}).get('idb')
+            if filename and filename != self.idb.filename:
+                self.set_idb(stix_idb.get_idb(filename))
+            if header['TMTC'] == 'TM':
+                self.decompressor.reset()
+                parameters = self.decode_telemetry_parameters(
+                    header, packet['data_field'])
+            else:
+                parameters = self.decode_telecommand_parameters(
+                    header, packet['data_field'])
+            packet['parameters'] = parameters
+            del packet['data_field']
+            packet.pop('decoding', None)
+        return packet.get('parameters')
+
+    def parse_binary_columns(self, buf, value_type='raw'):
+        """
+        Decode fixed length telemetry packets in columnar mode.
+        Packet headers are decoded in a first pass, then the data fields of all packets
+        of the same SPID are decoded at once.
+        Variable length packets and telecommands are skipped.
+        Inputs:
+            buf: input binary array
+            value_type: 'raw' or 'eng', the values of the parameter fields,
+                as Packet.merge
+        Returns:
+            a dictionary of SPID and NumPy structured array with one row per packet.
+            Fields are the header fields in HEADER_COLUMNS followed by one
+            field per parameter (PCF_NAME) containing raw or engineering values.
+            Packet.merge_columns converts the arrays to the dictionaries used by the
+            products, e.g. MiniReport.from_columns
+        """
+        length = len(buf)
+        self.inc_counter('total_length', length)
+        groups = {}
+        i = 0
+        while i < length and not self.stop_parsing:
+            if buf[i] in stix_header.TM_HEADER_FIRST_BYTE:
+                if length - i < 16:
+                    break
+                header_status, header = self.parse_telemetry_header(
+                    buf[i:i + 16])
+                i += 16
+                if header_status != stix_global.OK:
+                    self.inc_counter('num_bad_headers')
+                    continue
+                self.inc_counter('num_tm')
+                data_field_length = header['length'] - 9
+                start = i
+                i += data_field_length
+                if i > length:
+                    logger.warning(
+                        "Incomplete packet, the last {} bytes  were not parsed",
+                        length - start)
+                    break
+                ret = self.parse_data_field_header(header, buf[start:i],
+                                                   data_field_length)
+                if ret != stix_global.OK:
+                    continue
+                spid = header['SPID']
+                self.inc_counter('spid', spid)
+                if header['TPSD'] != -1 or spid == 54331 or (
+                        self.selected_spids and spid not in self.selected_spids
+                ) or (self.selected_services and
+                      header['service_type'] not in self.selected_services):
+                    self.inc_counter('num_filtered')
+                    continue
+                if spid not in groups:
+                    groups[spid] = []
+                groups[spid].append((start, data_field_length, header))
+            elif buf[i] in stix_header.TC_HEADER_FIRST_BYTE:
+                if length - i < 10:
+                    break
+                #TC data field length is derived from the same length field
+                i += st.unpack('>H', buf[i + 4:i + 6])[0] + 7
+                self.inc_counter('num_tc')
+                self.inc_counter('num_filtered')
+            else:
+                old_i = i
+                i = find_next_header(buf, i)
+                if i == stix_global.EOF:
+                    self.inc_counter('num_bad_bytes', length - old_i)
+                    break
+                self.inc_counter('num_bad_bytes', i - old_i)
+
+        results = {}
+        for spid, group in groups.items():
+            plan = self.get_fixed_packet_decode_plan(spid)
+            num_short = sum(1 for _, size, _ in group if size < plan.length)
+            if num_short:
+                logger.warning(
+                    '{} packets (SPID {}) are shorter than {}B and were not decoded',
+                    num_short, spid, plan.length)
+                group = [x for x in group if x[1] >= plan.length]
+            if not group:
+                continue
+            offsets = [x[0] for x in group]
+            lengths = [x[1] for x in group]
+            columns = plan.decode_columns(buf, offsets, lengths, self)
+            if value_type == 'eng':
+                columns = plan.calibrate_columns(columns, self)
+            dtype = HEADER_COLUMNS + [(name, col.dtype)
+                                      for name, col in columns.items()]
+            table = np.empty(len(group), dtype=dtype)
+            for name, _ in HEADER_COLUMNS:
+                table[name] = [x[2][name] for x in group]
+            for name, col in columns.items():
+                table[name] = col
+            results[spid] = table
+            self.inc_counter('num_tm_parsed', len(group))
+        return results
 
     #def parse_live_hex_stream(self, raw):
     #    #used to parse live hex stream from TSC
@@ -1183,44 +1897,117 @@ class StixTCTMParser(StixParameterParser):
     #    self.parse_hex(raw)
 
     def parse_hex(self, raw_hex):
+        return self.collect_packets(self.iter_hex(raw_hex))
+
+    def iter_hex(self, raw_hex):
         hex_string = re.sub(r"\s+", "", raw_hex)
         try:
             raw = binascii.unhexlify(hex_string)
         except Exception as e:
             logger.error(str(e))
-            return []
-        return self.parse_binary(raw)
+            return
+        yield from self.iter_binary(raw)
 
     def parse_hex_file(self, filename):
+        return self.collect_packets(self.iter_hex_file(filename))
+
+    def iter_hex_file(self, filename):
         with open(filename, 'r') as f:
             raw_hex = f.read()
-            return self.parse_hex(raw_hex)
-        return None
+        yield from self.iter_hex(raw_hex)
 
     def parse_moc_ascii(self, filename):
-        packets = []
-        logger.set_progress_enabled(False)
-        total_num_lines = sum(1 for line in open(filename))
-        with open(filename) as filein:
-            logger.info('Reading packets from the file {}'.format(filename))
-            idx = 0
-            for line in filein:
-                try:
-                    [self.receipt_utc, data_hex] = line.strip().split()
-                    data_binary = binascii.unhexlify(data_hex)
-                except Exception as e:
-                    logger.error(str(e))
-                    continue
+        return self.collect_packets(self.iter_moc_ascii(filename))
 
-                packet = self.parse_binary(data_binary)
-                if packet:
-                    packets.extend(packet)
+    def iter_moc_ascii(self, filename):
+        logger.set_progress_enabled(False)
+        file_size = os.path.getsize(filename)
+        num_read = 0
+        with open(filename, 'rb') as filein:
+            logger.info('Reading packets from the file {}', filename)
+            while True:
+                lines = filein.readlines(MOC_ASCII_BATCH_SIZE)
+                if not lines:
+                    break
+                yield from self.iter_moc_ascii_lines(lines)
+                num_read += sum(len(line) for line in lines)
                 logger.set_progress_enabled(True)
-                logger.progress(idx, total_num_lines)
+                logger.progress(num_read, file_size)
                 logger.set_progress_enabled(False)
                 #not to show progress bar for each packet
-                idx += 1
-        return packets
+
+    def iter_moc_ascii_lines(self, lines):
+        """
+        decode lines of a MOC ascii file.
+        The packets of the lines are unhexlified into one buffer, consecutive lines of
+        whole packets are decoded in one pass, and the receipt time of its line is
+        attached to each packet. Other lines are decoded one by one, as in
+        iter_moc_ascii_line, so that a bad line doesn't affect the next ones
+        Parameters:
+            lines: lines as bytes
+        """
+        receipt_utcs = []
+        hex_strings = []
+        for line in lines:
+            fields = line.split()
+            if len(fields) == 2 and len(fields[1]) % 2 == 0:
+                receipt_utcs.append(fields[0].decode())
+                hex_strings.append(fields[1])
+            else:
+                receipt_utcs.append(None)
+                hex_strings.append(b'')
+        try:
+            buf = binascii.unhexlify(b''.join(hex_strings))
+        except (binascii.Error, ValueError):
+            #invalid characters, the bad lines are found and decoded one by one
+            for k, hex_string in enumerate(hex_strings):
+                try:
+                    binascii.unhexlify(hex_string)
+                except (binascii.Error, ValueError):
+                    receipt_utcs[k] = None
+                    hex_strings[k] = b''
+            buf = binascii.unhexlify(b''.join(hex_strings))
+        line_offsets = np.zeros(len(lines) + 1, dtype=np.int64)
+        np.cumsum([len(x) // 2 for x in hex_strings], out=line_offsets[1:])
+        line_offsets = line_offsets.tolist()
+        view = memoryview(buf)
+        start = 0
+        #first line of the lines to be decoded in one pass
+        for k, line in enumerate(lines):
+            if receipt_utcs[k] is not None and is_packet_aligned(
+                    buf, line_offsets[k], line_offsets[k + 1]):
+                continue
+            if start < k:
+                yield from self.iter_moc_ascii_buffer(view, line_offsets, receipt_utcs,
+                                                      start, k)
+            if receipt_utcs[k] is None:
+                yield from self.iter_moc_ascii_line(line.decode(errors='replace'))
+            else:
+                yield from self.iter_moc_ascii_buffer(view, line_offsets, receipt_utcs,
+                                                      k, k + 1)
+            start = k + 1
+        if start < len(lines):
+            yield from self.iter_moc_ascii_buffer(view, line_offsets, receipt_utcs, start,
+                                                  len(lines))
+
+    def iter_moc_ascii_buffer(self, view, line_offsets, receipt_utcs, first, last):
+        """ decode the packets of the lines first to last - 1 in one pass """
+        start = line_offsets[first]
+        yield from self.iter_binary(
+            view[start:line_offsets[last]],
+            receipt_times=([x - start for x in line_offsets[first:last]],
+                           receipt_utcs[first:last]))
+
+    def iter_moc_ascii_line(self, line):
+        """ decode a line of a MOC ascii file: receipt time and packet hex string
+        """
+        try:
+            [self.receipt_utc, data_hex] = line.strip().split()
+            data_binary = binascii.unhexlify(data_hex)
+        except Exception as e:
+            logger.error(str(e))
+            return
+        yield from self.iter_binary(data_binary)
 
     def attach_timestamps(self, packet):
         pkt_header = packet['header']
@@ -1235,13 +2022,13 @@ class StixTCTMParser(StixParameterParser):
         if self.receipt_utc:
             #GU data
             try:
-                dt = dtparser.parse(self.receipt_utc)
+                dt = stix_datetime.parse_utc(self.receipt_utc)
                 pkt_header['UTC'] = dt
                 pkt_header['unix_time'] = dt.timestamp()
                 use_receipt_time = True
             except ValueError:
-                logger.warning('Failed to parse timestamp: {}'.format(
-                    self.receipt_utc))
+                logger.warning('Failed to parse timestamp: {}',
+                               self.receipt_utc)
 
         if pkt_header['TMTC'] == 'TM':
             coarse = pkt_header['coarse_time']
@@ -1253,107 +2040,404 @@ class StixTCTMParser(StixParameterParser):
                     pkt_header['unix_time'])
 
     def parse_telecommand_report_xml(self, filename):
+        return self.collect_packets(self.iter_telecommand_report_xml(filename))
+
+    def iter_telecommand_report_xml(self, filename):
         #parse TC history
         #raw data should be included in the xml file
-        packets = []
-        results = []
         logger.set_progress_enabled(False)
+        file_size = os.path.getsize(filename)
+        with open(filename, 'rb') as filein:
+            for items in iter_batches(
+                    iter_xml_elements(filein, 'PktTcReportListElement'),
+                    TC_REPORT_BATCH_SIZE):
+                unix_times = stix_datetime.utc2unix_array(
+                    [item.get('ExecutionTime', '') for item in items])
+                for i, item in enumerate(items):
+                    yield from self.iter_telecommand_report_element(
+                        item, unix_times[i])
+                logger.set_progress_enabled(True)
+                logger.progress(filein.tell(), file_size)
+                logger.set_progress_enabled(False)
+
+    def iter_telecommand_report_element(self, item, unix_time=None):
+        """ decode the raw data of a TC history element (PktTcReportListElement)
+        Parameters:
+            item: the element
+            unix_time: unix time of the execution time, if already converted
+        """
         state_names = [
             'ReleaseState', 'GroundState', 'UplinkState', 'OnBoardState',
             'OnBoardAccState', 'OnBoardAccPBState', 'ExecCompPBState'
         ]
-        with open(filename) as f:
-            doc = xmltodict.parse(f.read())
-            for item in doc['ns2:ResponsePart']['Response'][
-                    'PktTcReportResponse']['PktTcReportList'][
-                        'PktTcReportListElement']:
-                if 'ZIX' not in item['CommandName'] or (
-                        'RawBodyData' not in item):
-                    #skip platform commands
-                    continue
-                state = ''.join([item[e][0] for e in state_names])
-                header_auxiliary = {
-                    'UTC': item['ExecutionTime'],
-                    'unix_time': stix_datetime.utc2unix(item['ExecutionTime']),
-                    'release_time': item['ReleaseTime'],
-                    'uplink_time': item['UplinkTime'],
-                    'execution_time': item['ExecutionTime'],
-                    'sequence_name': item['SequenceName'],
-                    'state': state,
-                }
-                raw = item['RawBodyData']
-                packets.append({
-                    'header_auxiliary': header_auxiliary,
-                    'raw': raw
-                })
-        num = len(packets)
-        for i, packet in enumerate(packets):
-            data_hex = packet['raw']
-            data = binascii.unhexlify(data_hex)
-            result = self.parse_binary(data, 0, packet['header_auxiliary'])
-            logger.set_progress_enabled(True)
-            logger.progress(i, num)
-            logger.set_progress_enabled(False)
-            if not result:
-                continue
-            results.extend(result)
-        return results
+        if 'ZIX' not in item['CommandName'] or ('RawBodyData' not in item):
+            #skip platform commands
+            return
+        state = ''.join([item[e][0] for e in state_names])
+        header_auxiliary = {
+            'UTC': item['ExecutionTime'],
+            'unix_time': stix_datetime.utc2unix(item['ExecutionTime'])
+            if unix_time is None else float(unix_time),
+            'release_time': item['ReleaseTime'],
+            'uplink_time': item['UplinkTime'],
+            'execution_time': item['ExecutionTime'],
+            'sequence_name': item['SequenceName'],
+            'state': state,
+        }
+        data = binascii.unhexlify(item['RawBodyData'])
+        yield from self.iter_binary(data, 0, header_auxiliary)
 
     def parse_telemetry_xml(self, raw_filename):
-        packets = []
-        results = []
+        return self.collect_packets(self.iter_telemetry_xml(raw_filename))
+
+    def iter_telemetry_xml(self, raw_filename):
+        """
+        decode the packets of an EDDS xml file, each PktRawResponseElement
+        is decoded as the file is read
+        """
         logger.set_progress_enabled(False)
-        with open(raw_filename) as filein:
-            logger.info('Parsing {}'.format(raw_filename))
-            doc = xmltodict.parse(filein.read())
-            for e in doc['ns2:ResponsePart']['Response']['PktRawResponse'][
-                    'PktRawResponseElement']:
-                packet = {'id': e['@packetID'], 'raw': e['Packet']}
-                packets.append(packet)
-        num = len(packets)
-        for i, packet in enumerate(packets):
-            data_hex = packet['raw']
-            data_binary = binascii.unhexlify(data_hex)
-            data = data_binary[76:]
-            result = self.parse_binary(data)
-            logger.set_progress_enabled(True)
-            logger.progress(i, num)
-            logger.set_progress_enabled(False)
-            if not result:
-                continue
-            results.extend(result)
-        return results
+        file_size = os.path.getsize(raw_filename)
+        with open(raw_filename, 'rb') as filein:
+            logger.info('Parsing {}', raw_filename)
+            for i, element in enumerate(
+                    iter_xml_elements(filein, 'PktRawResponseElement')):
+                yield from self.iter_telemetry_xml_element(element)
+                if i % 100 == 0:
+                    logger.set_progress_enabled(True)
+                    logger.progress(filein.tell(), file_size)
+                    logger.set_progress_enabled(False)
+
+    def iter_telemetry_xml_element(self, element):
+        """ decode the packet of a PktRawResponseElement
+        """
+        data_binary = binascii.unhexlify(element['Packet'])
+        yield from self.iter_binary(data_binary[EDDS_PACKET_PREFIX_LENGTH:])
 
-    def parse_file(self, raw_filename, file_type=None, clear=True):
-        packets = []
-        if clear:
-            self.reset_counter()
+    def scan_packet_offsets(self, buf, i=0):
+        """
+        Walk TM/TC headers without decoding data fields.
+        The cursor is moved in the same way as in parse_binary.
+        Inputs:
+            buf: input binary array
+            i: starting offset
+        Returns:
+            offsets of the packets (or of the bad bytes) in the buffer
+        """
+        return list(self.iter_packet_offsets(buf, i))
+
+    def iter_packet_offsets(self, buf, i=0):
+        """
+        Generator yielding the offsets of the packets (or of the bad bytes) in a buffer,
+        see scan_packet_offsets. Telemetry headers are not decoded, only the packet length
+        and the fields checked by check_header are read. The other constraints on telemetry
+        headers are met by any header starting with a valid first byte.
+        Telecommand headers are decoded, as their validity depends on the IDB
+        Inputs:
+            buf: input binary array, bytes or a memory map
+            i: starting offset
+        """
+        length = len(buf)
+        valid_lengths = stix_header.TELEMETRY_HEADER_CONSTRAINTS['length']
+        valid_pus = stix_header.TELEMETRY_HEADER_CONSTRAINTS['pus']
+        while i < length:
+            yield i
+            if buf[i] in stix_header.TM_HEADER_FIRST_BYTE:
+                if length - i < 16:
+                    break
+                packet_length = (buf[i + 4] << 8) | buf[i + 5]
+                pus = buf[i + 6]
+                i += 16
+                if packet_length in valid_lengths and pus in valid_pus:
+                    i += packet_length - 9
+            elif buf[i] in stix_header.TC_HEADER_FIRST_BYTE:
+                if length - i < 10:
+                    break
+                header_status, header = self.parse_telecommand_header(buf, i)
+                i += 10
+                if header_status == stix_global.OK:
+                    i += header['length'] + 1 - 4
+            else:
+                i = find_next_header(buf, i)
+                if i == stix_global.EOF:
+                    break
 
+    def iter_headers(self, buf, i=0):
+        """
+        Generator yielding the headers of the packets in a buffer, data fields are not decoded.
+        The cursor is moved in the same way as in parse_binary.
+        Inputs:
+            buf: input binary array
+            i: starting offset
+        Yields:
+            packet start, packet end and header. SPID is set to 0 for TM packets
+            not found in the IDB
+        """
+        length = len(buf)
+        while i < length:
+            start = i
+            if buf[i] in stix_header.TM_HEADER_FIRST_BYTE:
+                header_status, header = self.parse_telemetry_header(
+                    buf[i:i + 16])
+                i += 16
+                if header_status != stix_global.OK:
+                    continue
+                i += header['length'] - 9
+                if i > length:
+                    break
+                if self.parse_data_field_header(
+                        header, buf[start + 16:i],
+                        header['length'] - 9) != stix_global.OK:
+                    header['SPID'] = 0
+                yield start, i, header
+            elif buf[i] in stix_header.TC_HEADER_FIRST_BYTE:
+                if length - i < 10:
+                    break
+                header_status, header = self.parse_telecommand_header(buf, i)
+                i += 10
+                if header_status != stix_global.OK:
+                    continue
+                i += header['length'] + 1 - 4
+                if i > length:
+                    break
+                yield start, i, header
+            else:
+                i = find_next_header(buf, i)
+                if i == stix_global.EOF:
+                    break
+
+    def get_complete_length(self, buf, i=0):
+        """
+        Walk TM/TC headers without decoding data fields.
+        Returns:
+            the offset following the last complete packet in the buffer.
+            The bytes after it belong to a packet which is not completely written yet
+        """
+        end = i
+        length = len(buf)
+        while i < length:
+            if buf[i] in stix_header.TM_HEADER_FIRST_BYTE:
+                header_status, header = self.parse_telemetry_header(
+                    buf[i:i + 16])
+                i += 16
+                if header_status == stix_global.OK:
+                    i += header['length'] - 9
+            elif buf[i] in stix_header.TC_HEADER_FIRST_BYTE:
+                if length - i < 10:
+                    break
+                header_status, header = self.parse_telecommand_header(buf, i)
+                i += 10
+                if header_status == stix_global.OK:
+                    i += header['length'] + 1 - 4
+            else:
+                i = find_next_header(buf, i)
+                if i == stix_global.EOF:
+                    break
+            if i <= length:
+                end = i
+        return end
+
+    def merge_counter(self, counter):
+        """ add the counters of another parser """
+        for key, value in counter.items():
+            if key == 'spid':
+                for spid, num in value.items():
+                    self.parser_counter['spid'][spid] = self.parser_counter[
+                        'spid'].get(spid, 0) + num
+            else:
+                self.parser_counter[key] += value
+
+    def parse_binary_file_parallel(self,
+                                   raw_filename,
+                                   num_processes=None,
+                                   chunk_size=PARALLEL_CHUNK_SIZE):
+        """
+        Parse a binary file with a pool of processes.
+        The file is cut into packet-aligned chunks by walking the packet headers of
+        a memory map of the file. Chunks are parsed in parallel and the results are merged
+        in the original order, together with the parser counters and STIX alerts.
+        Workers only send back what this process needs, as pickling decoded packets
+        takes about half of the time needed to decode them:
+            - packets are written by a writer of each worker if the packet writer supports
+              it, see StixPacketWriter.get_worker_settings, and the writers' results
+              are merged by the packet writer
+            - decoded packets are sent back only if packet buffer is enabled or
+              if the packet writer must write them in this process. The speed-up is then
+              limited to about 2, whatever the number of processes
+        Inputs:
+            raw_filename: binary file name
+            num_processes: number of processes, the number of CPUs if None
+            chunk_size: approximate chunk size in bytes
+        Returns:
+            decoded packets in python list if packet buffer is enabled
+        """
+        filesize = os.path.getsize(raw_filename)
+        boundaries = [0]
+        first_packet_indexes = [0]
+        #indexes of the first packets of the chunks in the file, upper bounds
+        num_offsets = 0
+        if filesize > 0:
+            #empty files can not be mapped
+            with open(raw_filename, 'rb') as in_file, mmap.mmap(
+                    in_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for offset in self.iter_packet_offsets(mapped):
+                    if offset - boundaries[-1] >= chunk_size:
+                        boundaries.append(offset)
+                        first_packet_indexes.append(num_offsets)
+                    num_offsets += 1
+        boundaries.append(filesize)
+        writer_settings = None
         if self.packet_writer:
-            self.packet_writer.set_filename(raw_filename)
+            writer_settings = self.packet_writer.get_worker_settings()
+        settings = {
+            'selected_services': self.selected_services,
+            'selected_spids': self.selected_spids,
+            'S20_excluded': self.S20_excluded,
+            'lazy_parameters': self.lazy_parameters and not self.packet_writer,
+            'generated_decoders': self.vp_tm_parser.generated_decoders_enabled,
+            'idb_selection': self.idb_selector is not None,
+            'profiling': self.profiler is not None,
+            'idb_filename': self.idb.filename,
+            'store_packets': self.store_packet_enabled
+            or (self.packet_writer is not None and writer_settings is None),
+            'writer': writer_settings
+        }
+        tasks = [(raw_filename, start, end, first_packet_index, settings)
+                 for start, end, first_packet_index in zip(
+                     boundaries[:-1], boundaries[1:], first_packet_indexes)]
+        logger.info('{} chunks to be parsed by {} processes',
+                    len(tasks), num_processes or multiprocessing.cpu_count())
 
-        logger.info('Processing file: {}'.format(raw_filename))
+        packets = []
+        with multiprocessing.Pool(num_processes,
+                                  initializer=init_parser_worker) as pool:
+            for i, (chunk_packets, counter, alerts, profile, idb_versions,
+                    writer_result) in enumerate(
+                        pool.imap(parse_binary_chunk, tasks)):
+                self.merge_counter(counter)
+                for idb_version in idb_versions:
+                    self.add_idb_version(idb_version)
+                if self.profiler and profile:
+                    self.profiler.merge(profile)
+                self.stix_alerts.extend(alerts)
+                if writer_settings is not None:
+                    self.packet_writer.merge_worker_result(writer_result)
+                for packet in chunk_packets:
+                    if self.store_packet_enabled:
+                        packets.append(packet)
+                    if self.packet_writer and writer_settings is None:
+                        self.decode_parameters(packet)
+                        self.packet_writer.write_one(packet)
+                logger.progress(i + 1, len(tasks))
+                if self.stop_parsing:
+                    pool.terminate()
+                    break
+        return packets
+
+    def prepare_file(self, raw_filename, file_type=None, clear=True):
+        """ reset counters and detect file type before parsing a file
+        """
+        if clear:
+            self.reset_counter()
+        logger.info('Processing file: {}', raw_filename)
         self.raw_filename = raw_filename
         self.in_filesize = os.path.getsize(raw_filename)
-
         if not file_type:
             file_type = detect_filetype(raw_filename)
+        return file_type
 
+    def get_file_iterator(self, raw_filename, file_type):
+        """ get the packet generator for the given file type,
+            None if the file type is unknown
+        """
         if file_type == 'bin':
-            with open(raw_filename, 'rb') as in_file:
-                data = in_file.read()
-                packets = self.parse_binary(data)
+            return self.iter_binary_file(raw_filename)
         elif file_type == 'ascii':
-            packets = self.parse_moc_ascii(raw_filename)
+            return self.iter_moc_ascii(raw_filename)
         elif file_type == 'xml.tm.raw':
-            packets = self.parse_telemetry_xml(raw_filename)
+            return self.iter_telemetry_xml(raw_filename)
         elif file_type == 'xml.tc.hist':
-            packets = self.parse_telecommand_report_xml(raw_filename)
+            return self.iter_telecommand_report_xml(raw_filename)
         elif file_type == 'hex':
-            packets = self.parse_hex_file(raw_filename)
+            return self.iter_hex_file(raw_filename)
+        return None
+
+    def iter_binary_file(self, raw_filename):
+        """
+        Decode a binary file through a read-only memory map.
+        Headers and data fields are views of the mapped file,
+        bytes are only copied when they are kept in decoded parameters
+        """
+        if os.path.getsize(raw_filename) == 0:
+            #empty files can not be mapped
+            return
+        with open(raw_filename, 'rb') as in_file:
+            mapped = mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        try:
+            yield from self.iter_binary(view)
+        finally:
+            #release references to the views before unmapping the file
+            self.vp_tm_parser.buffer = None
+            self.tc_parser.buffer = None
+            view.release()
+            try:
+                mapped.close()
+            except BufferError:
+                #views still referenced somewhere, unmapped by garbage collection
+                pass
+
+    def iter_file(self, raw_filename, file_type=None, clear=True,
+                  batch_size=0):
+        """
+        Generator yielding the packets of a raw data file as they are decoded.
+        Packets are neither stored in the parser nor sent to the packet writer,
+        so that they can be consumed with bounded memory, for example:
+            for packet in parser.iter_file(filename):
+                writer.write_one(packet)
+        Inputs:
+            raw_filename: input file name
+            file_type: file type, detected if not specified
+            clear: reset parser counters
+            batch_size: yield lists of up to batch_size packets if batch_size > 0
+        """
+        file_type = self.prepare_file(raw_filename, file_type, clear)
+        packet_iter = self.get_file_iterator(raw_filename, file_type)
+        if packet_iter is None:
+            logger.error('{} has unknown input file type', raw_filename)
+            return
+        if batch_size > 0:
+            packet_iter = iter_batches(packet_iter, batch_size)
+        yield from packet_iter
+        logger.print_summary(self.get_summary())
+
+    def parse_file(self,
+                   raw_filename,
+                   file_type=None,
+                   clear=True,
+                   num_processes=1):
+        """
+        Parse a raw data file
+        Inputs:
+            raw_filename: input file name
+            file_type: file type, detected if not specified
+            clear: reset parser counters
+            num_processes: number of processes used to parse binary files.
+                None to use all CPUs
+        """
+        packets = []
+        if self.packet_writer:
+            self.packet_writer.set_filename(raw_filename)
+
+        file_type = self.prepare_file(raw_filename, file_type, clear)
+        if file_type == 'bin' and num_processes != 1:
+            packets = self.parse_binary_file_parallel(raw_filename,
+                                                      num_processes)
         else:
-            logger.error('{} has unknown input file type'.format(raw_filename))
-            return []
+            packet_iter = self.get_file_iterator(raw_filename, file_type)
+            if packet_iter is None:
+                logger.error('{} has unknown input file type', raw_filename)
+                return []
+            packets = self.collect_packets(packet_iter)
 
         summary = self.get_summary()
         logger.print_summary(summary)
@@ -1361,9 +2445,140 @@ class StixTCTMParser(StixParameterParser):
             self.packet_writer.set_summary(summary)
         return packets
 
+    def get_file_signature(self, raw_filename, offset):
+        """
+        Signature of the parsed part of a followed file: its inode and a digest of its
+        first bytes (at most FOLLOW_SIGNATURE_SIZE). The modification time is not used,
+        it changes whenever data is appended
+        """
+        with open(raw_filename, 'rb') as in_file:
+            inode = os.fstat(in_file.fileno()).st_ino
+            head = in_file.read(min(offset, FOLLOW_SIGNATURE_SIZE))
+        return {'inode': inode, 'head': hashlib.shake_256(head).hexdigest(8)}
+
+    def follow_file(self, raw_filename, file_type=None, clear=True):
+        """
+        Parse the data appended to a growing binary or MOC ascii file since the last call.
+        Only complete packets (binary) or complete lines (ascii) are parsed.
+        The last parsed byte offset and line number are kept in follow_states and
+        given to the packet writer, which stores them in the run of the file,
+        with the file signature (see get_file_signature).
+        A file smaller than the parsed size or with another signature has been replaced,
+        it is parsed again from the start.
+        With set_MongoDB_writer(..., resume=True), packets are appended to the same run
+        and the file is parsed from where the last run stopped. The counters of each call are
+        added to the summary of the run.
+        Inputs:
+            raw_filename: input file name
+            file_type: file type, detected if not specified
+            clear: reset parser counters
+        Returns:
+            decoded packets in python list if packet buffer is enabled
+        """
+        if self.packet_writer:
+            self.packet_writer.set_filename(raw_filename)
+        counter = None if clear else self.parser_counter
+        file_type = self.prepare_file(raw_filename, file_type, True)
+        #counters of this call, given to the packet writer
+        if file_type not in ('bin', 'ascii'):
+            logger.error('Follow mode not supported for {}, file type: {}',
+                         raw_filename, file_type)
+            return []
+        key = os.path.abspath(raw_filename)
+        state = None
+        if self.packet_writer:
+            state = self.packet_writer.get_follow_state()
+        if not state:
+            state = self.follow_states.get(key, {'offset': 0, 'line': 0})
+        offset, line = state['offset'], state['line']
+        if self.in_filesize < offset:
+            logger.warning('{} is smaller than the parsed size, parsing it again',
+                           raw_filename)
+            offset, line = 0, 0
+        elif offset and state.get('signature') and self.get_file_signature(
+                raw_filename, offset) != state['signature']:
+            logger.warning('{} has been replaced, parsing it again', raw_filename)
+            offset, line = 0, 0
+
+        with open(raw_filename, 'rb') as in_file:
+            in_file.seek(offset)
+            data = in_file.read()
+        logger.info('{} new bytes from offset {}', len(data), offset)
+        if file_type == 'bin':
+            end = self.get_complete_length(data)
+            packets = self.collect_packets(
+                self.iter_binary(memoryview(data)[:end]))
+        else:
+            end = data.rfind(b'\n') + 1
+            lines = data[:end].splitlines()
+            packets = self.collect_packets(self.iter_moc_ascii_lines(lines))
+            line += len(lines)
+        self.vp_tm_parser.buffer = None
+        self.tc_parser.buffer = None
+
+        state = {
+            'offset': offset + end,
+            'line': line,
+            'filesize': self.in_filesize,
+            'signature': self.get_file_signature(raw_filename, offset + end)
+        }
+        self.follow_states[key] = state
+        summary = self.get_summary()
+        logger.print_summary(summary)
+        if self.packet_writer:
+            self.packet_writer.set_follow_state(state)
+            self.packet_writer.add_summary(summary)
+        if counter:
+            self.merge_counter(counter)
+        return packets
+
+    def set_profiling_enabled(self, status):
+        """
+        Record the wall time and number of calls of the parsing stages and
+        the throughput of each SPID, see stix_profiler.
+        Parsing functions are wrapped only when profiling is enabled.
+        Headers are timed in iter_binary, so that the headers read to cut a file into chunks
+        aren't counted
+        """
+        if self.profiler:
+            self.profiler.unwrap_all()
+        self.profiler = stix_profiler.StixProfiler() if status else None
+        self.use_idb(self.idb)
+        self.vp_tm_parser.decoders = {}
+        #generated decoders are compiled again with the current decompression function
+        if self.packet_writer:
+            self.packet_writer.set_profiler(self.profiler)
+        if not self.profiler:
+            return
+        wrap = self.profiler.wrap
+        for name in [
+                'decode_telemetry_parameters', 'decode_telecommand_parameters'
+        ]:
+            wrap(stix_profiler.PARAMETERS, self, name)
+        for parser in [
+                self, self.vp_tm_parser, self.tc_parser, self.context_parser
+        ]:
+            wrap(stix_profiler.CALIBRATION, parser, 'raw_to_eng')
+        wrap(stix_profiler.DECOMPRESSION, self.decompressor, 'decompress_raw')
+        wrap(stix_profiler.TIMESTAMPS, self, 'attach_timestamps')
+        wrap(stix_profiler.HASHING, self, 'hash_packet')
+
+    def get_profile(self):
+        """ profiling report, None if profiling is not enabled """
+        if self.profiler:
+            return self.profiler.get_report()
+        return None
+
+    def dump_profile(self, filename):
+        """ write the profiling report to a JSON file """
+        if self.profiler:
+            self.profiler.dump(filename)
+
     def set_pickle_writer(self, out_filename, comment=''):
         self.packet_writer = stix_writer.StixPickleWriter(out_filename)
-        idb_version = STIX_IDB.get_idb_version()
+        self.packet_writer.set_profiler(self.profiler)
+        idb_version = self.idb.get_idb_version()
+        self.idb_versions = [idb_version]
         self.packet_writer.register_run(self.raw_filename, self.raw_filename,
                                         comment, idb_version)
 
@@ -1374,15 +2589,36 @@ class StixTCTMParser(StixParameterParser):
                            password,
                            comment='',
                            raw_filename='',
-                           instrument=''):
+                           instrument='',
+                           resume=False,
+                           dedup_index=None):
         #instrument: GU or PFM
         #server, port, username and password are required by MongoDB
+        #resume: append packets to the last run of the file, see follow_file
+        #dedup_index: packet hash index file, packets already ingested from other files
+        #   are skipped, see stix_dedup. packet_hash_index of the pipeline configuration
+        #   if None, which is null by default. No deduplication if empty or null
         self.packet_writer = stix_writer.StixMongoDBWriter(
             server, port, username, password)
-        idb_version = STIX_IDB.get_idb_version()
+        if dedup_index is None:
+            dedup_index = config.get_config()['pipeline'].get(
+                'daemon', {}).get('packet_hash_index', '')
+        if dedup_index:
+            self.packet_writer.set_dedup_index(
+                stix_dedup.get_index(dedup_index))
+        self.packet_writer.set_profiler(self.profiler)
+        idb_version = self.idb.get_idb_version()
+        self.idb_versions = [idb_version]
         self.raw_filename = raw_filename
-        self.packet_writer.register_run(raw_filename, self.in_filesize,
-                                        comment, idb_version, instrument)
+        filesize = 0
+        if raw_filename and os.path.isfile(raw_filename):
+            filesize = os.path.getsize(raw_filename)
+        if resume:
+            self.packet_writer.resume_run(raw_filename, filesize, comment,
+                                          idb_version, instrument)
+        else:
+            self.packet_writer.register_run(raw_filename, filesize, comment,
+                                            idb_version, instrument)
 
     def is_processed(self, filename):
         return self.packet_writer.is_processed(filename)
@@ -1405,3 +2641,75 @@ class StixTCTMParser(StixParameterParser):
 
     def set_progress_bar_enabed(self, value):
         logger.set_progress_enabled(value)
+
+
+def get_packet_parameters(packet):
+    """
+    Get the parameters of a decoded packet.
+    Parameters of packets parsed with lazy parameters enabled are decoded
+    and cached in the packet, with the settings of the parser which parsed it,
+    see StixTCTMParser.get_decoding_settings
+    """
+    if packet.get('parameters') is None and 'data_field' in packet:
+        settings = packet.get('decoding', {})
+        generated_decoders = settings.get('generated_decoders', True)
+        try:
+            parsers = LAZY_PARAMETER_PARSERS.parsers
+        except AttributeError:
+            parsers = LAZY_PARAMETER_PARSERS.parsers = {}
+        try:
+            parser = parsers[generated_decoders]
+        except KeyError:
+            parser = StixTCTMParser()
+            parser.set_generated_decoders_enabled(generated_decoders)
+            parsers[generated_decoders] = parser
+        return parser.decode_parameters(packet)
+    return packet.get('parameters')
+
+
+def init_parser_worker():
+    """
+    Initialize a parser worker process.
+    SQLite connections must not be shared between processes
+    """
+    STIX_IDB.connect_database(STIX_IDB.filename)
+    stix_idb.RESIDENT_IDBS.clear()
+    #IDBs selected by packet time are loaded again when needed
+    logger.set_progress_enabled(False)
+
+
+def parse_binary_chunk(args):
+    """
+    Parse a packet-aligned chunk of a binary file in a worker process
+    Inputs:
+        args: file name, start, end, index of the first packet of the chunk in the file
+            and parser settings, see StixTCTMParser.parse_binary_file_parallel
+    Returns:
+        decoded packets if they have to be sent back, parser counter, STIX alerts,
+        profiling report, versions of the IDBs used and the result of the worker writer
+    """
+    filename, start, end, first_packet_index, settings = args
+    parser = StixTCTMParser()
+    if settings['idb_filename'] != parser.idb.filename:
+        parser.set_idb(stix_idb.get_idb(settings['idb_filename']))
+    parser.set_packet_filter(settings['selected_services'],
+                             settings['selected_spids'])
+    parser.S20_excluded = settings['S20_excluded']
+    parser.lazy_parameters = settings['lazy_parameters']
+    parser.set_packet_buffer_enabled(settings['store_packets'])
+    if settings['writer'] is not None:
+        parser.packet_writer = stix_writer.create_worker_writer(
+            settings['writer'], first_packet_index)
+    parser.set_generated_decoders_enabled(settings['generated_decoders'])
+    parser.set_idb_selection_enabled(settings['idb_selection'])
+    parser.set_profiling_enabled(settings['profiling'])
+    with open(filename, 'rb') as in_file:
+        in_file.seek(start)
+        data = in_file.read(end - start)
+    packets = parser.parse_binary(data)
+    writer_result = parser.done()
+    profile = parser.get_profile()
+    parser.set_profiling_enabled(False)
+    #the IDB is shared by the parsers of the process
+    return (packets, parser.get_summary(), parser.get_stix_alerts(), profile,
+            parser.idb_versions, writer_result)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# @title        : stix_profiler.py
+# @description:
+#               wall time and number of calls of the parsing stages, and throughput per SPID.
+#               Profiling is opt-in, functions are wrapped only when it is enabled:
+#                   parser.set_profiling_enabled(True)
+#                   parser.parse_file('raw.bin')
+#                   report = parser.get_profile()
+#               Only the methods of objects owned by the parser are wrapped. Objects shared with
+#               other parsers, e.g. IDBs, are used through a TimedObject view instead.
+#               Stage times are inclusive, e.g. the time of parameters includes calibration
+#               and decompression.
+import json
+import time
+from stix.core import stix_logger
+
+logger = stix_logger.get_logger()
+
+HEADER = 'header'
+IDB_LOOKUP = 'idb_lookup'
+PARAMETERS = 'parameters'
+CALIBRATION = 'calibration'
+DECOMPRESSION = 'decompression'
+TIMESTAMPS = 'timestamps'
+HASHING = 'hashing'
+WRITE = 'write'
+
+
+class StixProfiler(object):
+    """ wall time and number of calls of stages, number of packets, bytes and time per SPID """
+    def __init__(self):
+        self.stages = {}
+        #stage: [number of calls, seconds]
+        self.spids = {}
+        #SPID or TC name as string: [number of packets, number of bytes, seconds]
+        self.wrapped = []
+        #(object, attribute name), see wrap
+
+    def reset(self):
+        for counter in self.stages.values():
+            #the counters are used by timed functions
+            counter[:] = [0, 0.]
+        self.spids = {}
+
+    def add(self, stage, seconds, calls=1):
+        try:
+            counter = self.stages[stage]
+        except KeyError:
+            counter = [0, 0.]
+            self.stages[stage] = counter
+        counter[0] += calls
+        counter[1] += seconds
+
+    def add_packet(self, spid, num_bytes, seconds):
+        spid = str(spid)
+        try:
+            counter = self.spids[spid]
+        except KeyError:
+            counter = [0, 0, 0.]
+            self.spids[spid] = counter
+        counter[0] += 1
+        counter[1] += num_bytes
+        counter[2] += seconds
+
+    def timed(self, stage, function):
+        """ function recording its wall time in a stage """
+        perf_counter = time.perf_counter
+        counter = self.stages.setdefault(stage, [0, 0.])
+
+        def timed_function(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                counter[0] += 1
+                counter[1] += perf_counter() - start
+
+        return timed_function
+
+    def wrap(self, stage, obj, name):
+        """
+        replace the method of an object by a timed one, the instance attribute
+        is deleted by unwrap_all
+        """
+        if (obj, name) in self.wrapped:
+            return
+        setattr(obj, name, self.timed(stage, getattr(obj, name)))
+        self.wrapped.append((obj, name))
+
+    def unwrap_all(self):
+        for obj, name in self.wrapped:
+            try:
+                delattr(obj, name)
+            except AttributeError:
+                pass
+        self.wrapped = []
+
+    def merge(self, report):
+        """ add a report created by another profiler, e.g. in a worker process """
+        for stage, value in report.get('stages', {}).items():
+            self.add(stage, value['time'], value['calls'])
+        for spid, value in report.get('spids', {}).items():
+            counter = self.spids.setdefault(spid, [0, 0, 0.])
+            counter[0] += value['packets']
+            counter[1] += value['bytes']
+            counter[2] += value['time']
+
+    def get_report(self):
+        """
+        Returns:
+            dictionary with the calls and time of each stage, and the packets, bytes, time,
+            packets/s and bytes/s of each SPID. Keys are strings, as required by MongoDB
+        """
+        stages = {
+            stage: {
+                'calls': calls,
+                'time': seconds
+            }
+            for stage, (calls, seconds) in self.stages.items() if calls > 0
+        }
+        spids = {}
+        for spid, (num_packets, num_bytes, seconds) in self.spids.items():
+            spids[spid] = {
+                'packets': num_packets,
+                'bytes': num_bytes,
+                'time': seconds,
+                'packets_per_second':
+                num_packets / seconds if seconds > 0 else 0,
+                'bytes_per_second': num_bytes / seconds if seconds > 0 else 0
+            }
+        return {'stages': stages, 'spids': spids}
+
+    def dump(self, filename):
+        """ write the report to a JSON file """
+        try:
+            with open(filename, 'w') as fout:
+                json.dump(self.get_report(), fout, indent=2)
+        except OSError as e:
+            logger.warning('Failed to write profile {}: {}', filename, e)
+
+
+class TimedObject(object):
+    """
+    view of an object whose given methods are timed, the other attributes are the ones of
+    the object. The object itself is not changed
+    """
+    def __init__(self, profiler, stage, obj, names):
+        self.timed_object = obj
+        for name in names:
+            setattr(self, name, profiler.timed(stage, getattr(obj, name)))
+
+    def __getattr__(self, name):
+        return getattr(self.timed_object, name)
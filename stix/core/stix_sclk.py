@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# @title        : stix_sclk.py
+# @description:
+#               conversion of on-board times (SCET) to UTC without calling SPICE for each packet.
+#               The SCLK kernel of Solar Orbiter is a piecewise linear relation between the
+#               spacecraft clock and the parallel time system. The knots of this relation are read
+#               from the kernel pool once and converted to unix time with SPICE, a SCET is then
+#               converted by linear interpolation, either one by one or as NumPy arrays:
+#                   table = get_correlation_table()
+#                   unix_times = table.scet2unix(coarse_times, fine_times)
+#               Segments in which the relation is not linear in unix time, e.g. containing a leap
+#               second, are refined until they agree with SPICE. The table is rebuilt when another
+#               SCLK kernel is loaded and isn't used if it fails the validation against SPICE.
+import bisect
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+import spiceypy
+from stix.core import spice_manager as spm
+from stix.core import stix_logger
+
+logger = stix_logger.get_logger()
+
+SOLO_NAIF_ID = -144
+FINE_TIME_MODULUS = 65536
+UNIX_TIME_J2000 = 946728000.
+#unix time of 2000-01-01T12:00:00 UTC
+TOLERANCE = 1e-6
+#maximum difference to SPICE in seconds, at the middle of each segment
+MAX_REFINEMENT_DEPTH = 48
+MAX_SEGMENT_TICKS = 10 * 86400 * FINE_TIME_MODULUS
+#segments are first split into 10-day parts, so that the refinement doesn't miss periodic terms
+EXTRAPOLATION_TICKS = 366 * 86400 * FINE_TIME_MODULUS
+#the table covers one year after the last coefficient record, SPICE is used for later times
+NUM_VALIDATION_SAMPLES = 50
+LEAP_SECOND_MARGIN = 0.01
+#seconds before a leap second converted with SPICE as well
+EPOCH = datetime(1970, 1, 1)
+
+LOCK = threading.Lock()
+CORRELATION_TABLES = {}
+#SCLK kernel filename: StixCorrelationTable, None if the table can't be used
+
+
+def et2unix(et):
+    """ ephemeris time to unix time, leap seconds are not counted as unix time doesn't count them
+    """
+    return et - spiceypy.deltet(et, 'ET') + UNIX_TIME_J2000
+
+
+def spice_scet2unix(coarse, fine=0):
+    """ unix time of a SCET computed with SPICE, for SCETs not covered by the table and leap
+    seconds
+    """
+    coarse_int = int(coarse)
+    fine_int = int((coarse - coarse_int) * FINE_TIME_MODULUS) + fine
+    with spm.LOCK:
+        return float(
+            et2unix(spiceypy.scs2e(SOLO_NAIF_ID, '{}:{}'.format(coarse_int, fine_int))))
+
+
+def round_unix_time(unix_time):
+    """ round to milliseconds, the result is the timestamp of the UTC string given by unix2utc
+    """
+    return round(unix_time * 1000) * 1000 / 10**6
+
+
+def unix2utc(unix_time):
+    """ ISO UTC string, rounded to milliseconds as SPICE et2utc does with ISOC and 3 digits
+    """
+    return (EPOCH + timedelta(milliseconds=round(unix_time * 1000))
+            ).isoformat(timespec='milliseconds')
+
+
+class StixCorrelationTable(object):
+    """ piecewise linear SCET to unix time relation of the loaded SCLK kernel """
+    def __init__(self, naif_id=SOLO_NAIF_ID):
+        self.naif_id = naif_id
+        self.partitions = []
+        #(start, end, offset), the offset is the number of ticks of the previous partitions
+        self.knots = []
+        #encoded SCLK ticks
+        self.unix_times = []
+        self.knot_array = None
+        self.unix_time_array = None
+        self.leap_seconds = []
+        #encoded ticks of leap seconds, SPICE is used to get their UTC
+
+    def read_partitions(self):
+        """ partitions of the spacecraft clock, in ticks """
+        naif = -self.naif_id
+        num_starts = spiceypy.dtpool('SCLK_PARTITION_START_{}'.format(naif))[0]
+        starts = spiceypy.gdpool('SCLK_PARTITION_START_{}'.format(naif), 0,
+                                 num_starts)
+        ends = spiceypy.gdpool('SCLK_PARTITION_END_{}'.format(naif), 0,
+                               num_starts)
+        offset = 0.
+        self.partitions = []
+        for start, end in zip(starts, ends):
+            self.partitions.append((start, end, offset))
+            offset += end - start
+        return offset
+
+    def read_coefficients(self):
+        """ encoded ticks of the SCLK01 coefficient records """
+        name = 'SCLK01_COEFFICIENTS_{}'.format(-self.naif_id)
+        num_values = spiceypy.dtpool(name)[0]
+        coefficients = spiceypy.gdpool(name, 0, num_values)
+        return sorted(set(coefficients[0::3]))
+
+    def spice_unix(self, ticks):
+        """ unix time of encoded ticks, computed with SPICE """
+        return float(et2unix(spiceypy.sct2e(self.naif_id, ticks)))
+
+    def refine(self, start, end, unix_start, unix_end, depth, knots,
+               unix_times):
+        """
+        split a segment until the linear interpolation agrees with SPICE at its middle
+        """
+        middle = (start + end) / 2.
+        unix_middle = self.spice_unix(middle)
+        if (depth < MAX_REFINEMENT_DEPTH and end - start > 1
+                and abs((unix_start + unix_end) / 2. - unix_middle) > TOLERANCE):
+            self.refine(start, middle, unix_start, unix_middle, depth + 1,
+                        knots, unix_times)
+            knots.append(middle)
+            unix_times.append(unix_middle)
+            self.refine(middle, end, unix_middle, unix_end, depth + 1, knots,
+                        unix_times)
+
+    def build(self):
+        """ read the SCLK kernel and convert the knots to unix time """
+        total_ticks = self.read_partitions()
+        records = [x for x in self.read_coefficients() if 0 <= x < total_ticks
+                   ] or [0.]
+        last = min(total_ticks, records[-1] + EXTRAPOLATION_TICKS)
+        ticks = [0.]
+        for end in records + [last]:
+            num_parts = int(np.ceil((end - ticks[-1]) / MAX_SEGMENT_TICKS))
+            for i in range(1, num_parts + 1):
+                ticks.append(ticks[-1] + (end - ticks[-1]) / (num_parts - i + 1))
+        knots = [ticks[0]]
+        unix_times = [self.spice_unix(ticks[0])]
+        for end in ticks[1:]:
+            unix_end = self.spice_unix(end)
+            self.refine(knots[-1], end, unix_times[-1], unix_end, 0, knots,
+                        unix_times)
+            knots.append(end)
+            unix_times.append(unix_end)
+        self.knots = knots
+        self.unix_times = unix_times
+        self.knot_array = np.array(knots)
+        self.unix_time_array = np.array(unix_times)
+        self.leap_seconds = []
+        for i in range(1, len(knots) - 1):
+            if unix_times[i + 1] < unix_times[i]:
+                #the unix time of the leap second is the one of the next second,
+                #it jumps back at the end of the leap second
+                rate = (unix_times[i] - unix_times[i - 1]) / (knots[i] -
+                                                              knots[i - 1])
+                duration = unix_times[i] - unix_times[i + 1] + LEAP_SECOND_MARGIN
+                self.leap_seconds.append(
+                    (knots[i] - duration / rate, knots[i + 1]))
+
+    def encode(self, coarse, fine=0):
+        """ encoded ticks of a SCET, None if it doesn't belong to any partition """
+        ticks = coarse * FINE_TIME_MODULUS + fine
+        for start, end, offset in self.partitions:
+            if start <= ticks <= end:
+                return ticks - start + offset
+        return None
+
+    def encode_array(self, coarse, fine):
+        ticks = np.asarray(coarse, dtype=np.float64) * FINE_TIME_MODULUS + \
+            np.asarray(fine, dtype=np.float64)
+        encoded = np.full(ticks.shape, np.nan)
+        for start, end, offset in reversed(self.partitions):
+            #SPICE uses the first partition containing the time
+            selected = (ticks >= start) & (ticks <= end)
+            encoded[selected] = ticks[selected] - start + offset
+        return encoded
+
+    def scet2unix(self, coarse, fine=0):
+        """
+        convert a SCET to unix time
+        Returns:
+            unix time, None if the SCET is not valid, not covered by the table or in a leap second
+        """
+        encoded = self.encode(coarse, fine)
+        if encoded is None:
+            return None
+        i = bisect.bisect_right(self.knots, encoded) - 1
+        if i >= len(self.knots) - 1:
+            return self.unix_times[-1] if encoded == self.knots[-1] else None
+        for start, end in self.leap_seconds:
+            if start <= encoded <= end:
+                return None
+        x0 = self.knots[i]
+        y0 = self.unix_times[i]
+        return y0 + (self.unix_times[i + 1] - y0) * (encoded - x0) / (
+            self.knots[i + 1] - x0)
+
+    def scet2unix_array(self, coarse, fine):
+        """
+        convert arrays of coarse and fine times to unix time
+        Returns:
+            NumPy array of unix times, NaN for leap seconds and SCETs not covered by the table
+        """
+        encoded = self.encode_array(coarse, fine)
+        for start, end in self.leap_seconds:
+            encoded[(encoded >= start) & (encoded <= end)] = np.nan
+        return np.interp(encoded,
+                         self.knot_array,
+                         self.unix_time_array,
+                         right=np.nan)
+
+    def validate(self, num_samples=NUM_VALIDATION_SAMPLES):
+        """
+        compare the interpolated times with SPICE at random SCETs
+        Returns:
+            the maximum difference in seconds
+        """
+        rng = np.random.default_rng(0)
+        max_diff = 0
+        for encoded in rng.uniform(self.knots[0], self.knots[-1], num_samples):
+            i = bisect.bisect_right(self.knots, encoded) - 1
+            x0 = self.knots[i]
+            y0 = self.unix_times[i]
+            unix_time = y0 + (self.unix_times[i + 1] - y0) * (encoded - x0) / (
+                self.knots[i + 1] - x0)
+            max_diff = max(max_diff, abs(unix_time - self.spice_unix(encoded)))
+        return max_diff
+
+
+def create_correlation_table():
+    table = StixCorrelationTable()
+    try:
+        with spm.LOCK:
+            table.build()
+            max_diff = table.validate()
+    except spiceypy.utils.support_types.SpiceyError as e:
+        logger.warning(
+            'Failed to read the SCLK kernel, SPICE is used for time conversion: {}',
+            e)
+        return None
+    if max_diff > TOLERANCE:
+        logger.warning(
+            'SCET to UTC table differs from SPICE by {} s, SPICE is used for time conversion',
+            max_diff)
+        return None
+    return table
+
+
+def get_correlation_table():
+    """
+    SCET to unix time table of the loaded SCLK kernel
+    Returns:
+        StixCorrelationTable, or None if no SCLK kernel is loaded or the table isn't valid
+    """
+    key = spm.spice.get_last_sclk_filename()
+    try:
+        return CORRELATION_TABLES[key]
+    except KeyError:
+        pass
+    with LOCK:
+        if key not in CORRELATION_TABLES:
+            CORRELATION_TABLES[key] = create_correlation_table(
+            ) if key else None
+        return CORRELATION_TABLES[key]
@@ -17,15 +17,94 @@ from stix.core import stix_global
 from stix.core import config
 from stix.core import stix_datetime
 from stix.core import stix_logger
+from stix.core import stix_dedup
 from stix.core import index_builder as idxb
 from stix.core import spice_manager as spm
+from stix.core import stix_profiler
 
 logger = stix_logger.get_logger()
 MONGODB_CONFIG = config.get_config()['pipeline']['mongodb']
+DUPLICATE_HEADER_FIELDS = [
+    'TMTC', 'SPID', 'name', 'seq_count', 'coarse_time', 'fine_time', 'length'
+]
+#header fields of a packet compared with the stored packet having the same hash
+
+
+def merge_summaries(summary, other):
+    """ add the parser counters of two summaries, see StixTCTMParser.get_summary """
+    if not isinstance(summary, dict):
+        return dict(other, spid=dict(other.get('spid', {})))
+    result = dict(summary, spid=dict(summary.get('spid', {})))
+    for key, value in other.items():
+        if key == 'spid':
+            for spid, num in value.items():
+                result['spid'][spid] = result['spid'].get(spid, 0) + num
+        else:
+            result[key] = result.get(key, 0) + value
+    return result
+
 
+def create_worker_writer(settings, first_packet_index):
+    """
+    writer of a parallel parser worker, see StixPacketWriter.get_worker_settings
+    Inputs:
+        settings: settings returned by the writer of the parser
+        first_packet_index: index of the first packet of the chunk parsed by the worker
+            in the file, an upper bound
+    """
+    return settings['writer'].from_worker_settings(settings,
+                                                   first_packet_index)
 
 
 class StixPacketWriter(object):
+    def __init__(self):
+        self.dedup_index = None
+        self.num_duplicates = 0
+        self.profiler = None
+
+    def set_profiler(self, profiler):
+        """ record the time spent in write_one, see stix_profiler """
+        self.profiler = profiler
+        if profiler:
+            profiler.wrap(stix_profiler.WRITE, self, 'write_one')
+
+    def set_dedup_index(self, index):
+        """ skip packets already ingested from other files, see stix_dedup """
+        self.dedup_index = index
+
+    def is_duplicate(self, packet):
+        """
+        check if a packet has already been ingested from another file.
+        The 64-bit hash index only tells that the packet may have been ingested,
+        it is confirmed by is_ingested
+        """
+        if self.dedup_index is None or 'hash' not in packet:
+            return False
+        if packet['hash'] not in self.dedup_index or not self.is_ingested(
+                packet):
+            return False
+        self.num_duplicates += 1
+        return True
+
+    def is_ingested(self, packet):
+        #check if a packet with the same hash and header is stored, for another file
+        return False
+
+    def check_parameters(self, packet):
+        """
+        packets parsed with lazy parameters enabled must be decoded before they are written,
+        e.g. with StixTCTMParser.decode_parameters, their raw data field isn't stored
+        """
+        if packet.get('parameters') is None and 'data_field' in packet:
+            raise ValueError(
+                'Parameters of the packet {} are not decoded'.format(
+                    packet['header'].get('SPID') or packet['header'].get('name')))
+
+    def add_to_dedup_index(self, packet):
+        """ add the hash of a packet once it is stored """
+        if self.dedup_index is not None and 'hash' in packet:
+            self.dedup_index.add(packet['hash'])
+
     def write_all(self, packets):
         pass
 
@@ -38,12 +117,40 @@ class StixPacketWriter(object):
     def set_summary(self, summary):
         pass
 
+    def add_summary(self, summary):
+        #counters of a part of a file, see StixTCTMParser.follow_file
+        pass
+
+    def add_idb_version(self, idb_version):
+        #version of another IDB used to decode packets, see StixTCTMParser.set_idb
+        pass
+
+    def get_worker_settings(self):
+        """
+        settings of the writers of parallel parser workers, which write the packets of
+        their chunks, see create_worker_writer and StixTCTMParser.parse_binary_file_parallel.
+        The result returned by close() of a worker writer is passed to merge_worker_result.
+        Returns:
+            None if packets must be written by this writer
+        """
+        return None
+
+    def merge_worker_result(self, result):
+        pass
+
     def close(self):
         pass
 
     def is_processed(self, filename):
         return False
 
+    def get_follow_state(self):
+        #parsing state of a growing file, see StixTCTMParser.follow_file
+        return None
+
+    def set_follow_state(self, state):
+        pass
+
 
 class StixPickleWriter(StixPacketWriter):
     def __init__(self, filename):
@@ -69,9 +176,14 @@ class StixPickleWriter(StixPacketWriter):
             'filsize': filesize,
             'comment': comment,
             'idb_version': idb_version,
+            'idb_versions': [idb_version],
             'Date': datetime.datetime.now().isoformat()
         }
 
+    def add_idb_version(self, idb_version):
+        if self.run and idb_version not in self.run['idb_versions']:
+            self.run['idb_versions'].append(idb_version)
+
     def write_all(self, packets):
         if self.fout:
             data = {'run': self.run, 'packet': packets}
@@ -79,6 +191,7 @@ class StixPickleWriter(StixPacketWriter):
             self.fout.close()
 
     def write_one(self, packet):
+        self.check_parameters(packet)
         self.packets.append(packet)
 
     def close(self):
@@ -96,7 +209,7 @@ class StixBinaryWriter(StixPacketWriter):
         try:
             self.fout = open(self.filename, 'wb')
         except IOError:
-            logger.error('IO error. Can not create file:{}'.format(filename))
+            logger.error('IO error. Can not create file:{}', filename)
 
     def register_run(self,
                      in_filename,
@@ -136,6 +249,11 @@ class StixMongoDBWriter(StixPacketWriter):
                  password=MONGODB_CONFIG['password']):
         super(StixMongoDBWriter, self).__init__()
 
+        self.connection_settings = (server, port, username, password)
+        self.worker = False
+        #writer of a parallel parser worker, see from_worker_settings
+        self.analyzed_packet_ids = []
+        #packets written by a worker, analyzed when the worker result is merged
         self.ipacket = 0
         self.packets = []
         self.start_unix = math.inf
@@ -153,6 +271,13 @@ class StixMongoDBWriter(StixPacketWriter):
         self.start = -1
         self.end = -1
         self.run_info = None
+        self.follow_state = None
+        self.idb_versions = []
+        self.resumed = False
+        #packets appended to an existing run, see resume_run
+        self.file_run_ids = []
+        #runs of the file being parsed, their packets aren't duplicates
+        self.connect = None
         try:
             self.connect = pymongo.MongoClient(server,
                                                port,
@@ -225,12 +350,187 @@ class StixMongoDBWriter(StixPacketWriter):
             'spice_sclk': spm.spice.get_last_sclk_filename(),
             'filesize': filesize,
             'instrument': instrument,
-            'idb_version': idb_version
+            'idb_version': idb_version,
+            'idb_versions': [idb_version]
         }
+        self.idb_versions = [idb_version]
         #print(self.run_info)
 
         self.inserted_run_id = self.collection_raw_files.insert_one(
             self.run_info).inserted_id
+        self.file_run_ids = self.get_file_run_ids()
+
+    def get_file_run_ids(self):
+        """ identifiers of the runs of the file being parsed """
+        try:
+            return [
+                run['_id'] for run in self.collection_raw_files.find(
+                    {
+                        'path': self.path,
+                        'filename': self.filename
+                    }, {'_id': 1})
+            ]
+        except Exception as e:
+            logger.error(str(e))
+            return [self.current_run_id]
+
+    def set_dedup_index(self, index):
+        super(StixMongoDBWriter, self).set_dedup_index(index)
+        try:
+            self.collection_packets.create_index('hash')
+            #duplicates are confirmed by querying packets by hash
+        except Exception as e:
+            logger.error(str(e))
+
+    def get_worker_settings(self):
+        """
+        Workers insert packets with identifiers reserved for their chunks, identifiers
+        increase in the file order but may have gaps. Science reports are built from
+        the inserted packets when the worker results are merged, in the file order
+        """
+        if self.collection_packets is None:
+            return None
+        return {
+            'writer': StixMongoDBWriter,
+            'connection': self.connection_settings,
+            'run_id': self.current_run_id,
+            'file_run_ids': self.file_run_ids,
+            'first_packet_id': self.current_packet_id,
+            'dedup_index': None if self.dedup_index is None else self.dedup_index.filename
+        }
+
+    @classmethod
+    def from_worker_settings(cls, settings, first_packet_index):
+        writer = cls(*settings['connection'])
+        writer.worker = True
+        writer.current_run_id = settings['run_id']
+        writer.file_run_ids = settings['file_run_ids']
+        writer.current_packet_id = settings['first_packet_id'] + first_packet_index
+        if settings['dedup_index']:
+            writer.dedup_index = stix_dedup.StixPacketHashIndex(settings['dedup_index'])
+            #new hashes are saved by the writer of the parser
+        return writer
+
+    def close_worker(self):
+        """ close the connection of a worker writer and return what merge_worker_result needs """
+        hashes = []
+        if self.dedup_index is not None:
+            hashes = ['{:016x}'.format(x) for x in self.dedup_index.new_hashes]
+        if self.connect is not None:
+            self.connect.close()
+        return {
+            'num_packets': self.ipacket,
+            'num_duplicates': self.num_duplicates,
+            'start_unix': self.start_unix,
+            'end_unix': self.end_unix,
+            'start_scet': self.start_scet,
+            'end_scet': self.end_scet,
+            'next_packet_id': self.current_packet_id,
+            'analyzed_packet_ids': self.analyzed_packet_ids,
+            'hashes': hashes
+        }
+
+    def merge_worker_result(self, result):
+        self.ipacket += result['num_packets']
+        self.num_duplicates += result['num_duplicates']
+        self.start_unix = min(self.start_unix, result['start_unix'])
+        self.end_unix = max(self.end_unix, result['end_unix'])
+        self.start_scet = min(self.start_scet, result['start_scet'])
+        self.end_scet = max(self.end_scet, result['end_scet'])
+        self.current_packet_id = max(self.current_packet_id,
+                                     result['next_packet_id'])
+        if self.dedup_index is not None:
+            self.dedup_index.update(result['hashes'])
+        if not result['analyzed_packet_ids']:
+            return
+        try:
+            packets = self.collection_packets.find({
+                '_id': {
+                    '$in': result['analyzed_packet_ids']
+                }
+            }).sort('_id', 1)
+            for packet in packets:
+                self.science_report_analyzer.start(self.current_run_id,
+                                                   packet['_id'], packet)
+        except Exception as e:
+            logger.error(str(e))
+
+    def is_ingested(self, packet):
+        query = {
+            'hash': packet['hash'],
+            'run_id': {
+                '$nin': self.file_run_ids
+            }
+        }
+        header = packet['header']
+        for name in DUPLICATE_HEADER_FIELDS:
+            if name in header:
+                query['header.' + name] = header[name]
+        try:
+            return self.collection_packets.find_one(query,
+                                                    {'_id': 1}) is not None
+        except Exception as e:
+            logger.error(str(e))
+            return False
+
+    def resume_run(self,
+                   in_filename,
+                   filesize=0,
+                   comment='',
+                   idb_version='',
+                   instrument=''):
+        """
+        Append packets to the last run of the file if it exists, otherwise register a new run.
+        Used to parse growing files, see StixTCTMParser.follow_file
+        """
+        filename = os.path.basename(in_filename)
+        path = os.path.dirname(os.path.abspath(in_filename))
+        run = None
+        try:
+            run = self.collection_raw_files.find_one(
+                {
+                    'path': path,
+                    'filename': filename
+                }, sort=[('_id', -1)])
+        except Exception as e:
+            logger.error(str(e))
+        if not run:
+            self.register_run(in_filename, filesize, comment, idb_version,
+                              instrument)
+            return
+
+        try:
+            self.current_packet_id = self.collection_packets.find().sort(
+                '_id', -1).limit(1)[0]['_id'] + 1
+        except IndexError:
+            self.current_packet_id = 0
+        self.filename = filename
+        self.path = path
+        self.run_info = run
+        self.current_run_id = run['_id']
+        self.inserted_run_id = run['_id']
+        self.start_unix = run.get('data_start_unix_time') or math.inf
+        self.end_unix = run.get('data_stop_unix_time', 0)
+        self.start_scet = run.get('data_start_scet') or math.inf
+        self.end_scet = run.get('data_end_scet', 0)
+        self.resumed = True
+        self.follow_state = {
+            'offset': run.get('parsed_bytes', 0),
+            'line': run.get('parsed_lines', 0),
+            'filesize': filesize,
+            'signature': run.get('parsed_signature')
+        }
+        self.idb_versions = run.get('idb_versions', [run.get('idb_version')])
+        self.add_idb_version(idb_version)
+        self.file_run_ids = self.get_file_run_ids()
+        logger.info('Appending packets to run {} from byte {}',
+                    run['_id'], self.follow_state['offset'])
+
+    def get_follow_state(self):
+        return self.follow_state
+
+    def set_follow_state(self, state):
+        self.follow_state = state
 
     def set_filename(self, fname):
         self.filename = os.path.basename(fname)
@@ -240,11 +540,22 @@ class StixMongoDBWriter(StixPacketWriter):
     def set_summary(self, summary):
         self.summary = summary
 
+    def add_summary(self, summary):
+        self.summary = merge_summaries(self.summary, summary)
+
+    def add_idb_version(self, idb_version):
+        if idb_version not in self.idb_versions:
+            self.idb_versions.append(idb_version)
+
     def write_all(self, packets):
+        #packets can be a list or a generator, e.g. StixTCTMParser.iter_file
         for packet in packets:
-            self.write_one(packets)
+            self.write_one(packet)
 
     def write_one(self, packet):
+        self.check_parameters(packet)
+        if self.is_duplicate(packet):
+            return
         header_unix = packet['header']['unix_time']
         scet=packet['header'].get('SCET',0)
 
@@ -265,8 +576,11 @@ class StixMongoDBWriter(StixPacketWriter):
         packet['run_id'] = self.current_run_id
         packet['_id'] = self.current_packet_id
 
-        self.science_report_analyzer.start(self.current_run_id,
-                                           self.current_packet_id, packet)
+        if not self.worker:
+            self.science_report_analyzer.start(self.current_run_id,
+                                               self.current_packet_id, packet)
+        elif packet['header'].get('SPID') in idxb.ANALYZED_SPIDS:
+            self.analyzed_packet_ids.append(self.current_packet_id)
 
         try:
             self.collection_packets.insert_one(packet)
@@ -276,16 +590,21 @@ class StixMongoDBWriter(StixPacketWriter):
             logger.info('Packet:' + str(packet['header']))
             raise
             return
+        self.add_to_dedup_index(packet)
 
         self.current_packet_id += 1
         self.ipacket += 1
 
     def close(self):
+        if self.worker:
+            return self.close_worker()
         if not self.collection_raw_files:
             logger.warning('MongoDB is not initialized ')
             return None
-        logger.info('{} packets have been inserted into MongoDB'.format(
-            self.ipacket))
+        logger.info('{} packets have been inserted into MongoDB', self.ipacket)
+        if self.dedup_index is not None:
+            logger.info('{} duplicated packets skipped', self.num_duplicates)
+            self.dedup_index.save()
         run = self.collection_raw_files.find_one({'_id': self.inserted_run_id})
         if run:
             if self.start_unix==math.inf:
@@ -303,12 +622,28 @@ class StixMongoDBWriter(StixPacketWriter):
             run['path'] = self.path
             run['status'] = stix_global.OK
             #status ==1 if success  0
-            run['summary'] = self.summary
-            run['calibration_run_ids'] = self.science_report_analyzer.get_calibration_run_ids(
-            )
+            if not (self.resumed and isinstance(run.get('summary'), dict)):
+                run['summary'] = self.summary
+            elif self.summary:
+                #counters of the previous runs are kept
+                run['summary'] = merge_summaries(run['summary'], self.summary)
+            run['idb_versions'] = self.idb_versions
+            run['num_duplicates'] = run.get('num_duplicates',
+                                            0) + self.num_duplicates
+            if self.profiler:
+                run['profile'] = self.profiler.get_report()
+            run['calibration_run_ids'] = run.get(
+                'calibration_run_ids',
+                []) + self.science_report_analyzer.get_calibration_run_ids()
+            if self.follow_state:
+                run['parsed_bytes'] = self.follow_state['offset']
+                run['parsed_lines'] = self.follow_state['line']
+                run['parsed_signature'] = self.follow_state.get('signature')
+                run['filesize'] = self.follow_state.get(
+                    'filesize', run.get('filesize'))
             self.collection_raw_files.save(run)
             logger.info('File info updated successfully.')
-            logger.info('File ID:{}'.format(run['_id']))
+            logger.info('File ID:{}', run['_id'])
             return run
         logger.error('File info not updated.')
         return None
@@ -0,0 +1,105 @@
+import copy
+
+import pytest
+
+from stix.core.tests import environment
+
+
+def pytest_configure(config):
+    """ the offline environment is set up before test modules import stix.core """
+    environment.setup()
+
+
+def pytest_unconfigure(config):
+    environment.restore()
+
+
+class Cursor(list):
+    def sort(self, key, direction=1):
+        return Cursor(sorted(self, key=lambda doc: doc[key], reverse=direction < 0))
+
+    def limit(self, num):
+        return Cursor(self[:num])
+
+
+def get_field(doc, name):
+    for key in name.split('.'):
+        doc = doc[key]
+    return doc
+
+
+def matches(doc, query):
+    for name, value in query.items():
+        try:
+            field = get_field(doc, name)
+        except KeyError:
+            return False
+        if isinstance(value, dict):
+            if '$nin' in value and field in value['$nin']:
+                return False
+            if '$in' in value and field not in value['$in']:
+                return False
+        elif field != value:
+            return False
+    return True
+
+
+class InsertOneResult(object):
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class Collection(object):
+    """ the MongoDB collection operations used by the writer, in memory """
+    def __init__(self):
+        self.docs = []
+        self.fail_inserts = False
+
+    def insert_one(self, doc):
+        if self.fail_inserts:
+            raise RuntimeError('insert failed')
+        self.docs.append(copy.deepcopy(doc))
+        return InsertOneResult(doc.get('_id'))
+
+    def find(self, query=None, projection=None):
+        return Cursor(
+            copy.deepcopy(doc) for doc in self.docs if matches(doc, query or {}))
+
+    def find_one(self, query=None, projection=None, sort=None):
+        docs = self.find(query)
+        for key, direction in reversed(sort or []):
+            docs = docs.sort(key, direction)
+        return docs[0] if docs else None
+
+    def save(self, doc):
+        self.docs = [x for x in self.docs if x['_id'] != doc['_id']]
+        self.docs.append(copy.deepcopy(doc))
+
+    def create_index(self, key):
+        pass
+
+
+class Database(dict):
+    def __missing__(self, name):
+        self[name] = Collection()
+        return self[name]
+
+
+class Client(object):
+    def __init__(self, *args, **kwargs):
+        self.databases = Database()
+
+    def __getitem__(self, name):
+        return self.databases.setdefault(name, Database())
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def collections(monkeypatch):
+    """ MongoDB writers use in-memory collections, returns the packet and run collections """
+    from stix.core import stix_writer
+    client = Client()
+    monkeypatch.setattr(stix_writer.pymongo, 'MongoClient', lambda *args, **kwargs: client)
+    return client['stix']['packets'], client['stix']['raw_files']
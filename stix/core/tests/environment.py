@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# @title        : environment.py
+# @description:
+#               offline environment of the tests and benchmarks. The bundled IDB is used, SPICE
+#               time conversion uses an LSK and a linear SCLK kernel written in a temporary
+#               directory, and packets are synthesized from the IDB packet structures by
+#               stix_packet_encoder, so neither MongoDB, mission data nor network access is
+#               needed.
+#               setup() must be called before modules of stix.core which use the IDB or SPICE
+#               are imported, restore() gives the configuration back.
+import os
+import random
+import shutil
+import tempfile
+from stix.core import config
+from stix.core import stix_logger
+
+BUNDLED_IDB = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data',
+    'idb', 'idb.sqlite')
+
+SEED = 2021
+SCET_START = 660000000
+#2020-11-29
+
+LSK_KERNEL = '''KPL/LSK
+
+\\begindata
+
+DELTET/DELTA_T_A = 32.184
+DELTET/K = 1.657D-3
+DELTET/EB = 1.671D-2
+DELTET/M = ( 6.239996D0 1.99096871D-7 )
+DELTET/DELTA_AT = ( 10, @1972-JAN-1  11, @1972-JUL-1  12, @1973-JAN-1
+                    13, @1974-JAN-1  14, @1975-JAN-1  15, @1976-JAN-1
+                    16, @1977-JAN-1  17, @1978-JAN-1  18, @1979-JAN-1
+                    19, @1980-JAN-1  20, @1981-JUL-1  21, @1982-JUL-1
+                    22, @1983-JUL-1  23, @1985-JUL-1  24, @1988-JAN-1
+                    25, @1990-JAN-1  26, @1991-JAN-1  27, @1992-JUL-1
+                    28, @1993-JUL-1  29, @1994-JUL-1  30, @1996-JAN-1
+                    31, @1997-JUL-1  32, @1999-JAN-1  33, @2006-JAN-1
+                    34, @2009-JAN-1  35, @2012-JUL-1  36, @2015-JUL-1
+                    37, @2017-JAN-1 )
+
+\\begintext
+'''
+SCLK_KERNEL = '''KPL/SCLK
+
+\\begindata
+
+SCLK_KERNEL_ID           = ( @2020-01-01/00:00:00 )
+SCLK_DATA_TYPE_144       = ( 1 )
+SCLK01_TIME_SYSTEM_144   = ( 2 )
+SCLK01_N_FIELDS_144      = ( 2 )
+SCLK01_MODULI_144        = ( 4294967296 65536 )
+SCLK01_OFFSETS_144       = ( 0 0 )
+SCLK01_OUTPUT_DELIM_144  = ( 2 )
+SCLK_PARTITION_START_144 = ( 0.0000000000000E+00 )
+SCLK_PARTITION_END_144   = ( 2.8147497671065E+14 )
+SCLK01_COEFFICIENTS_144  = ( 0.0000000000000E+00 -4.3135816000000E+04 1.0000000000000E+00 )
+
+\\begintext
+'''
+#the spacecraft clock starts at 2000-01-01T00:00:00 UTC and runs at the rate of TDT
+
+KERNEL_DIRECTORY = None
+SAVED_STATE = None
+#configuration and logger settings replaced by setup()
+
+
+def setup():
+    """
+    use the bundled IDB and the synthetic kernels, once per process.
+    Kernels of the configuration are not loaded
+    """
+    global KERNEL_DIRECTORY, SAVED_STATE
+    if KERNEL_DIRECTORY is not None:
+        return
+    logger = stix_logger.get_logger()
+    SAVED_STATE = {
+        'idb': config.parser_config.get('idb'),
+        'spice': config.parser_config.get('spice'),
+        'level': logger.level,
+        'progress_enabled': logger.progress_enabled
+    }
+    config.parser_config['idb'] = [{'filename': BUNDLED_IDB}]
+    config.parser_config['spice'] = [{'data': []}]
+    logger.set_level(stix_logger.PROGRESS)
+    logger.set_progress_enabled(False)
+
+    from stix.core import spice_manager as spm
+    KERNEL_DIRECTORY = tempfile.mkdtemp(prefix='stix_test_kernels_')
+    for filename, content in [('test_lsk.tls', LSK_KERNEL),
+                              ('test_sclk.tsc', SCLK_KERNEL)]:
+        path = os.path.join(KERNEL_DIRECTORY, filename)
+        with open(path, 'w') as fout:
+            fout.write(content)
+        spm.spice.furnish(path)
+
+
+def restore():
+    """ unload the synthetic kernels and give the configuration back """
+    global KERNEL_DIRECTORY, SAVED_STATE
+    if KERNEL_DIRECTORY is None:
+        return
+    import spiceypy
+    from stix.core import spice_manager as spm
+    with spm.LOCK:
+        for filename in os.listdir(KERNEL_DIRECTORY):
+            spiceypy.unload(os.path.join(KERNEL_DIRECTORY, filename))
+    shutil.rmtree(KERNEL_DIRECTORY, ignore_errors=True)
+    for key in ['idb', 'spice']:
+        if SAVED_STATE[key] is None:
+            config.parser_config.pop(key, None)
+        else:
+            config.parser_config[key] = SAVED_STATE[key]
+    logger = stix_logger.get_logger()
+    logger.set_level(SAVED_STATE['level'])
+    logger.set_progress_enabled(SAVED_STATE['progress_enabled'])
+    KERNEL_DIRECTORY = None
+    SAVED_STATE = None
+
+
+def generate_hk(num_packets, seed=SEED):
+    """ mini and maxi housekeeping reports """
+    from stix.core import stix_packet_encoder as spe
+    rng = random.Random(seed)
+    encoder = spe.StixPacketEncoder()
+    spids = [54101, 54102]
+    return b''.join(
+        b''.join(encoder.encode(spids[i % 2], spe.RandomValues(rng=rng), SCET_START + 4 * i))
+        for i in range(num_packets))
+
+
+def generate_ql(num_packets, seed=SEED):
+    """ quick-look light curves and spectra """
+    from stix.core import stix_packet_encoder as spe
+    rng = random.Random(seed)
+    encoder = spe.StixPacketEncoder()
+    packets = []
+    for i in range(num_packets):
+        coarse = SCET_START + 32 * i
+        if i % 2:
+            spid, values = 54120, spe.spectra_values(rng, coarse)
+        else:
+            spid, values = 54118, spe.light_curve_values(rng, coarse)
+        packets.extend(encoder.encode(spid, values, coarse))
+    return b''.join(packets)
+
+
+def generate_bsd(num_packets, seed=SEED):
+    """ X-ray level 0 science data packets, each one a request """
+    from stix.core import stix_packet_encoder as spe
+    rng = random.Random(seed)
+    encoder = spe.StixPacketEncoder()
+    return b''.join(
+        b''.join(encoder.encode(54114, spe.xray_l0_values(rng, SCET_START + i, i),
+                                SCET_START + i)) for i in range(num_packets))
+
+
+def generate_mix(num_packets, seed=SEED):
+    """ housekeeping, quick-look and science packets in the proportions 2:2:1 """
+    return b''.join([
+        generate_hk(2 * num_packets // 5, seed),
+        generate_ql(2 * num_packets // 5, seed + 1),
+        generate_bsd(num_packets // 5, seed + 2)
+    ])
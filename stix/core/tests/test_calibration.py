@@ -0,0 +1,118 @@
+import math
+
+import numpy as np
+import pytest
+from scipy import interpolate
+
+from stix.core import stix_calibration
+from stix.core import stix_idb
+
+IDB = stix_idb.stix_idb()
+CURVE_REFS = sorted({ref for ref, in IDB.execute(
+    'select distinct CAP_NUMBR from CAP union select distinct CCA_NUMBR from CCA')})
+POLYNOMIAL_REFS = sorted(ref for ref, in IDB.execute('select distinct MCF_IDENT from MCF'))
+TEXTUAL_REFS = sorted(ref for ref, in IDB.execute('select distinct TXP_NUMBR from TXP'))
+RAW_LIMITS = [0, 1, 255, 4095, 65535, 2**24 - 1]
+
+
+def curve_baseline(ref, raw_value):
+    """ the calibration curve computed for each value, as before calibrations were compiled """
+    rows = IDB.get_calibration_curve(ref)
+    if len(rows) <= 1:
+        return ''
+    x_points = [float(row[0]) for row in rows]
+    y_points = [float(row[1]) for row in rows]
+    if len(rows) == 2:
+        return round((y_points[1] - y_points[0]) / (x_points[1] - x_points[0]) *
+                     (raw_value - x_points[0]) + y_points[0], 3)
+    try:
+        tck = interpolate.splrep(x_points, y_points)
+        return round(float(interpolate.splev(raw_value, tck)), 3)
+    except Exception:
+        return ''
+
+
+def polynomial_baseline(ref, raw_value):
+    rows = IDB.get_calibration_polynomial(ref)
+    if not rows:
+        return ''
+    sum_value = 0
+    for coeff, xval in zip([float(x) for x in rows[0]],
+                           [math.pow(raw_value, i) for i in range(0, 5)]):
+        sum_value += coeff * xval
+    return round(sum_value, 3)
+
+
+def textual_baseline(ref, raw_value):
+    """
+    the range query used before calibrations were compiled. TXP_FROM and TXP_TO are text
+    columns, they are compared as integers, as the compiled calibrations do
+    """
+    rows = IDB.execute(
+        'select TXP_ALTXT from TXP where TXP_NUMBR=? and ?>=cast(TXP_FROM as integer) '
+        ' and cast(TXP_TO as integer)>=? order by rowid limit 1', (ref, raw_value, raw_value))
+    return rows[0][0] if rows else ''
+
+
+def curve_raw_values(ref):
+    """ the points of the curve, values between and outside them """
+    x_points = sorted({int(float(row[0])) for row in IDB.get_calibration_curve(ref)})
+    values = set(RAW_LIMITS)
+    for x in x_points:
+        values.update([x - 1, x, x + 1])
+    for low, high in zip(x_points[:-1], x_points[1:]):
+        values.add((low + high) // 2)
+    return sorted(x for x in values if x >= 0)
+
+
+def textual_raw_values(ref):
+    """ the bounds of the ranges, values next to them, which may be misses, and large values """
+    values = set(RAW_LIMITS)
+    for low, high, _ in IDB.get_textual_calibration(ref):
+        values.update([int(low) - 1, int(low), int(high), int(high) + 1])
+    return sorted(x for x in values if x >= 0)
+
+
+def approx(values):
+    """ numbers rounded to 3 decimals by another method, or summed in another order """
+    return [pytest.approx(x, rel=1e-12, abs=1.001e-3) if isinstance(x, float) else x
+            for x in values]
+
+
+def check(ref, raw_values, baseline, is_close=False):
+    expected = [baseline(ref, x) for x in raw_values]
+    calibration = stix_calibration.get_calibration(ref, 'TM', IDB)
+    scalar = [calibration(x) for x in raw_values]
+    assert scalar == (approx(expected) if is_close else expected)
+    vectorized = stix_calibration.calibrate(ref, np.array(raw_values), 'TM', IDB).tolist()
+    assert vectorized == approx(expected)
+    return expected
+
+
+def test_references_found():
+    assert len(CURVE_REFS) >= 10
+    assert len(POLYNOMIAL_REFS) >= 3
+    assert len(TEXTUAL_REFS) >= 50
+
+
+@pytest.mark.parametrize('ref', CURVE_REFS)
+def test_curve_calibration_same_as_baseline(ref):
+    check(ref, curve_raw_values(ref), curve_baseline)
+
+
+@pytest.mark.parametrize('ref', POLYNOMIAL_REFS)
+def test_polynomial_calibration_same_as_baseline(ref):
+    check(ref, RAW_LIMITS + list(range(0, 4096, 37)), polynomial_baseline, True)
+
+
+@pytest.mark.parametrize('ref', TEXTUAL_REFS)
+def test_textual_calibration_same_as_baseline(ref):
+    check(ref, textual_raw_values(ref), textual_baseline)
+
+
+def test_textual_misses_are_empty():
+    misses = 0
+    for ref in TEXTUAL_REFS:
+        expected = check(ref, textual_raw_values(ref), textual_baseline)
+        misses += expected.count('')
+    assert misses > 0
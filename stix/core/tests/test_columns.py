@@ -0,0 +1,74 @@
+import random
+
+import numpy as np
+import pytest
+
+from stix.core import stix_datatypes as sdt
+from stix.core import stix_idb
+from stix.core import stix_packet_encoder as spe
+from stix.core import stix_parser
+from stix.core.tests import environment
+from stix.fits.products.housekeeping import MiniReport, MaxiReport
+
+IDB = stix_idb.stix_idb()
+FIXED_SPIDS = sorted(spid for spid, in IDB.execute(
+    'select distinct PID_SPID from PID where PID_TPSD=-1') if spid != 54331)
+ENCODER = spe.StixPacketEncoder()
+NUM_PACKETS = 6
+
+
+def new_parser():
+    parser = stix_parser.StixTCTMParser()
+    parser.set_progress_bar_enabed(False)
+    return parser
+
+
+def encode(spid):
+    rng = random.Random(spid)
+    return [
+        ENCODER.encode(spid, spe.RandomValues(rng=rng), environment.SCET_START + i)[0]
+        for i in range(NUM_PACKETS)
+    ]
+
+
+def values(column):
+    return [x.tobytes() if isinstance(x, np.void) else x for x in column.tolist()]
+
+
+@pytest.mark.parametrize('spid', FIXED_SPIDS)
+def test_columns_same_as_fixed_packet_parser(spid):
+    packets = encode(spid)
+    buf = b''.join(packets)
+    parser = new_parser()
+    tables = parser.parse_binary_columns(buf)
+    eng_tables = parser.parse_binary_columns(buf, 'eng')
+    if spid not in tables:
+        #identified as another SPID sharing the same packet type
+        pytest.skip('SPID not identified from the header')
+    table, eng_table = tables[spid], eng_tables[spid]
+    assert len(table) == NUM_PACKETS
+    expected = [parser.parse_fixed_telemetry_packet(packet[16:], spid) for packet in packets]
+    names = [x[0] for x in expected[0]]
+    assert list(table.dtype.names) == [x[0] for x in stix_parser.HEADER_COLUMNS] + names
+    for i, name in enumerate(names):
+        assert values(table[name]) == [x[i][1] for x in expected], name
+        assert eng_table[name].tolist() == [x[i][2] for x in expected], name
+    assert table['coarse_time'].tolist() == [
+        environment.SCET_START + i for i in range(NUM_PACKETS)
+    ]
+
+
+def test_housekeeping_reports_from_columns():
+    buf = environment.generate_hk(20)
+    packets = new_parser().parse_binary(buf)
+    tables = new_parser().parse_binary_columns(buf)
+    for spid, report_class in [(54101, MiniReport), (54102, MaxiReport)]:
+        expected = report_class(sdt.Packet.merge(packets, spid, value_type='raw'))
+        report = report_class.from_columns(tables[spid])
+        assert report.num_samples == expected.num_samples == 10
+        assert report.__dict__.keys() == expected.__dict__.keys()
+        for key, value in expected.__dict__.items():
+            if isinstance(value, list):
+                assert np.asarray(getattr(report, key)).tolist() == value, key
+            else:
+                assert getattr(report, key) == value, key
@@ -0,0 +1,54 @@
+import random
+
+import numpy as np
+from dateutil import parser as dtparser
+
+from stix.core import stix_datetime
+
+EDGE_CASES = [
+    '2020-06-01T10:11:12.000Z', '2020-06-01T10:11:12Z', '2020-06-01T10:11:12',
+    '2020-06-01 10:11:12.5', '2020-02-29T00:00:00Z', '2019-02-29T00:00:00Z',
+    '2020-06-01T24:00:00Z', '2020-06-01T10:60:00Z', '2016-12-31T23:59:60Z',
+    '2020-13-01T00:00:00Z', '2020-00-10T00:00:00Z', '0000-01-01T00:00:00Z',
+    '0001-01-01T00:00:00Z', '9999-12-31T23:59:59.999999Z', '1969-12-31T23:59:59.999999Z',
+    '2020-06-01T10:11:12.1234567Z', '2020-06-01T10:11:12z', '2020-06-01T10:11:12Z ',
+    '2020/06/01 10:11:12', 'Jun 1 2020 10:11:12', '', 'not a date'
+]
+
+
+def random_utc(rng):
+    """ ISO-like strings, with invalid fields from time to time """
+    fraction = ''.join(rng.choice('0123456789') for _ in range(rng.randint(0, 7)))
+    return '{:04d}-{:02d}-{:02d}{}{:02d}:{:02d}:{:02d}{}{}'.format(
+        rng.choice([rng.randint(1990, 2040), rng.randint(0, 9999)]),
+        rng.randint(0, 13), rng.randint(0, 32), rng.choice('T '),
+        rng.randint(0, 24), rng.randint(0, 60), rng.randint(0, 60),
+        '.' + fraction if fraction else '', rng.choice(['Z', '']))
+
+
+def parse(function, utc):
+    try:
+        return function(utc)
+    except (ValueError, OverflowError) as e:
+        return type(e)
+
+
+UTCS = EDGE_CASES + [random_utc(random.Random(i)) for i in range(1000)]
+
+
+def test_parse_utc_same_as_dateutil():
+    for utc in UTCS:
+        assert parse(stix_datetime.parse_utc, utc) == parse(dtparser.parse, utc), utc
+
+
+def test_utc2unix_array_same_as_utc2unix():
+    expected = [stix_datetime.utc2unix(utc) for utc in UTCS]
+    assert stix_datetime.utc2unix_array(UTCS).tolist() == expected
+    for utc, unix_time in zip(UTCS, expected):
+        assert stix_datetime.utc2unix_array([utc]).tolist() == [unix_time]
+    values = [1591006272, 1591006272.5, None, '2020-06-01T10:11:12Z']
+    assert stix_datetime.utc2unix_array(values).tolist() == [
+        1591006272, 1591006272.5, 0, 1591006272
+    ]
+    assert len(stix_datetime.utc2unix_array([])) == 0
+    assert isinstance(stix_datetime.utc2unix_array([]), np.ndarray)
@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from stix.core.tests import environment
+from stix.core import stix_decoder_generator
+from stix.core import stix_idb
+from stix.core import stix_packet_encoder as spe
+from stix.core import stix_parser
+
+ENCODER = spe.StixPacketEncoder()
+SPIDS = [
+    spid for spid in stix_decoder_generator.GENERATED_DECODER_SPIDS
+    if stix_idb.stix_idb().get_spid_info(spid)
+]
+
+
+def new_parser(generated_decoders):
+    parser = stix_parser.StixTCTMParser()
+    parser.set_progress_bar_enabed(False)
+    parser.set_generated_decoders_enabled(generated_decoders)
+    return parser
+
+
+@pytest.mark.parametrize('spid', SPIDS)
+def test_generated_decoder_same_as_walk(spid):
+    rng = random.Random(spid)
+    buf = b''.join(
+        b''.join(ENCODER.encode(spid, spe.RandomValues(rng=rng), environment.SCET_START + i))
+        for i in range(20))
+    parser = new_parser(True)
+    packets = parser.parse_binary(buf)
+    assert parser.vp_tm_parser.decoders[(parser.idb.filename, spid)]
+    assert len(packets) == 20
+    assert packets == new_parser(False).parse_binary(buf)
+
+
+def test_modified_cache_generated_again(tmp_path, monkeypatch):
+    filename = str(tmp_path / 'decoder.py')
+    monkeypatch.setattr(stix_decoder_generator, 'get_cache_filename',
+                        lambda *args: filename)
+    parser = new_parser(True)
+    tree, _ = parser.vp_tm_parser.get_parse_tree(54118)
+    stix_decoder_generator.get_decoder(54118, tree, parser.decompressor, parser.idb)
+    with open(filename) as fin:
+        source = fin.read()
+    with open(filename, 'w') as fout:
+        fout.write(source.replace('def decode(parser, buf):',
+                                  'def decode(parser, buf):\n    raise RuntimeError'))
+    decoder = stix_decoder_generator.get_decoder(54118, tree, parser.decompressor,
+                                                 parser.idb)
+    coarse = environment.SCET_START
+    buf = ENCODER.encode(54118, spe.light_curve_values(random.Random(0), coarse), coarse)[0]
+    assert decoder(parser.vp_tm_parser, buf[16:])[1]
+    with open(filename) as fin:
+        assert fin.read() == source
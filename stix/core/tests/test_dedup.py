@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+from stix.core.tests import environment
+from stix.core import stix_dedup
+from stix.core import stix_parser
+
+
+def ingest(filename, buf, index_filename):
+    """ parse a file and write its packets as the MongoDB writer does for a new run """
+    parser = stix_parser.StixTCTMParser()
+    parser.set_packet_buffer_enabled(False)
+    parser.set_MongoDB_writer('localhost', 27017, '', '', raw_filename=filename,
+                              dedup_index=index_filename)
+    writer = parser.packet_writer
+    writer.set_filename(filename)
+    parser.parse_binary(buf)
+    writer.dedup_index.save()
+    return writer
+
+
+def test_packets_of_other_files_skipped(collections, tmp_path):
+    packets, _ = collections
+    index_filename = str(tmp_path / 'hashes.npy')
+    buf = environment.generate_hk(10)
+    first = ingest(str(tmp_path / 'a.bin'), buf, index_filename)
+    assert first.num_duplicates == 0
+    second = ingest(str(tmp_path / 'b.bin'),
+                    buf + environment.generate_hk(12)[-2 * len(buf) // 10:], index_filename)
+    assert second.num_duplicates == 10
+    assert len(packets.docs) == 12
+
+
+def test_same_file_parsed_again(collections, tmp_path):
+    packets, _ = collections
+    index_filename = str(tmp_path / 'hashes.npy')
+    buf = environment.generate_hk(10)
+    ingest(str(tmp_path / 'a.bin'), buf, index_filename)
+    writer = ingest(str(tmp_path / 'a.bin'), buf, index_filename)
+    assert writer.num_duplicates == 0
+    assert len(packets.docs) == 20
+
+
+def test_hash_collision_not_skipped(collections, tmp_path):
+    packets, _ = collections
+    index_filename = str(tmp_path / 'hashes.npy')
+    ingest(str(tmp_path / 'a.bin'), environment.generate_hk(10), index_filename)
+    for doc in packets.docs:
+        doc['header']['seq_count'] += 1
+    #same hashes, other packets
+    writer = ingest(str(tmp_path / 'b.bin'), environment.generate_hk(10), index_filename)
+    assert writer.num_duplicates == 0
+    assert len(packets.docs) == 20
+
+
+def test_hash_added_after_insert(collections, tmp_path):
+    packets, _ = collections
+    index_filename = str(tmp_path / 'hashes.npy')
+    buf = environment.generate_hk(2)
+    packets.fail_inserts = True
+    with pytest.raises(RuntimeError):
+        ingest(str(tmp_path / 'a.bin'), buf, index_filename)
+    assert len(stix_dedup.get_index(index_filename)) == 0
+    packets.fail_inserts = False
+    writer = ingest(str(tmp_path / 'b.bin'), buf, index_filename)
+    assert writer.num_duplicates == 0
+    assert len(packets.docs) == 2
+
+
+def test_concurrent_saves(tmp_path):
+    filename = str(tmp_path / 'hashes.npy')
+    num_threads, num_hashes = 8, 200
+
+    def save(k):
+        index = stix_dedup.StixPacketHashIndex(filename)
+        for i in range(num_hashes):
+            index.add('{:016x}'.format(k * num_hashes + i + 1))
+            if i % 50 == 49:
+                index.save()
+
+    threads = [threading.Thread(target=save, args=(k, )) for k in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    index = stix_dedup.StixPacketHashIndex(filename)
+    assert len(index) == num_threads * num_hashes
+    assert all('{:016x}'.format(i + 1) in index for i in range(num_threads * num_hashes))
+
+
+def test_no_deduplication_by_default(collections):
+    parser = stix_parser.StixTCTMParser()
+    parser.set_MongoDB_writer('localhost', 27017, '', '')
+    assert parser.packet_writer.dedup_index is None
@@ -0,0 +1,118 @@
+import random
+
+import pytest
+
+from stix.core import stix_context
+from stix.core import stix_idb
+from stix.core import stix_packet_encoder as spe
+from stix.core import stix_parser
+from stix.core.tests import environment
+
+CONTEXT_SPID = 54331
+IDB = stix_idb.stix_idb()
+FIXED_SPIDS = sorted(spid for spid, in IDB.execute(
+    'select distinct PID_SPID from PID where PID_TPSD=-1') if spid != CONTEXT_SPID)
+ENCODER = spe.StixPacketEncoder()
+NUM_PACKETS = 5
+
+
+def new_parser():
+    parser = stix_parser.StixTCTMParser()
+    parser.set_progress_bar_enabed(False)
+    return parser
+
+
+def data_fields(spid):
+    rng = random.Random(spid)
+    return [
+        ENCODER.encode(spid, spe.RandomValues(rng=rng), environment.SCET_START + i)[0][16:]
+        for i in range(NUM_PACKETS)
+    ]
+
+
+INTEGER_WIDTHS = [(pfc, 4 + pfc) for pfc in range(12)] + [(12, 16), (13, 24), (14, 32)]
+#PFC and width of the unsigned (PTC 3) and signed (PTC 4) integers
+
+
+def is_unaligned_integer(row):
+    param_type = IDB.get_s2k_parameter_types(int(row['PCF_PTC']), int(row['PCF_PFC']))
+    return param_type in ('U', 'I') and (row['PLF_OFFBI'] != 0 or row['PCF_WIDTH'] % 8 != 0)
+
+
+def integer_structure():
+    """ integers of all widths at all bit offsets, the words of consecutive rows overlap """
+    rows = []
+    offset = 16
+    for ptc in [3, 4]:
+        for pfc, width in INTEGER_WIDTHS:
+            for offset_bits in range(8 if width < 16 else 1):
+                rows.append({
+                    'PLF_OFFBY': offset,
+                    'PLF_OFFBI': offset_bits,
+                    'PCF_WIDTH': width,
+                    'PCF_PTC': ptc,
+                    'PCF_PFC': pfc,
+                    'PCF_NAME': 'P{}'.format(len(rows)),
+                    'PCF_CURTX': ''
+                })
+                offset += 1
+    return rows
+
+
+def test_unaligned_integers_covered():
+    rows = [row for spid in FIXED_SPIDS for row in IDB.get_fixed_packet_structure(spid)]
+    assert sum(is_unaligned_integer(row) for row in rows) > 100
+
+
+def test_unaligned_integers_same_as_row_by_row():
+    parser = new_parser()
+    rows = integer_structure()
+    plan = stix_parser.StixFixedPacketDecodePlan(0, rows, parser.idb)
+    assert len(plan.layers) > 1
+    rng = random.Random(0)
+    for _ in range(200):
+        buf = bytes(rng.getrandbits(8) for _ in range(plan.length))
+        expected = [
+            parser.decode_parameter(buf, row['PCF_NAME'], row['PLF_OFFBY'] - 16,
+                                    row['PLF_OFFBI'], row['PCF_WIDTH'], row['PCF_PTC'],
+                                    row['PCF_PFC'], '', 'TM', True) for row in rows
+        ]
+        assert plan.decode(buf, parser) == expected
+
+
+@pytest.mark.parametrize('spid', FIXED_SPIDS)
+def test_plan_same_as_row_by_row(spid):
+    parser = new_parser()
+    plan = parser.get_fixed_packet_decode_plan(spid)
+    for buf in data_fields(spid):
+        parser.decompressor.init(spid)
+        expected = parser.decode_fixed_telemetry_parameters(buf, spid)
+        parser.decompressor.init(spid)
+        parameters = plan.decode(buf, parser)
+        assert parameters == expected
+        assert [type(x[1]) for x in parameters] == [type(x[1]) for x in expected]
+        assert [type(x[2]) for x in parameters] == [type(x[2]) for x in expected]
+        parser.decompressor.init(spid)
+        assert parser.parse_fixed_telemetry_packet(buf, spid) == expected
+
+
+@pytest.mark.parametrize('spid', FIXED_SPIDS[:10])
+def test_short_data_field_decoded_row_by_row(spid):
+    parser = new_parser()
+    plan = parser.get_fixed_packet_decode_plan(spid)
+    if plan.length == 0:
+        pytest.skip('no parameter decoded by the plan')
+    buf = data_fields(spid)[0][:plan.length - 1]
+    assert plan.decode(buf, parser) is None
+    assert parser.parse_fixed_telemetry_packet(
+        buf, spid) == parser.decode_fixed_telemetry_parameters(buf, spid)
+
+
+def test_context_packets_bypass_plans():
+    parser = new_parser()
+    rng = random.Random(0)
+    buf = bytes(rng.getrandbits(8) for _ in range(
+        sum(width for _, width in stix_context.CONTEXT_REGISTER_BIT_SIZE) // 8 + 64))
+    parameters = parser.parse_fixed_telemetry_packet(buf, CONTEXT_SPID)
+    assert parameters == parser.context_parser.parse(buf)
+    assert not any(key[1] == CONTEXT_SPID for key in parser.fixed_packet_plans)
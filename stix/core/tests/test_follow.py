@@ -0,0 +1,61 @@
+import os
+
+from stix.core.tests import environment
+from stix.core import stix_parser
+
+
+def poll(filename):
+    """ a poll of a daemon following a file: the last run of the file is resumed """
+    parser = stix_parser.StixTCTMParser()
+    parser.set_MongoDB_writer('localhost', 27017, '', '', raw_filename=filename,
+                              resume=True, dedup_index='')
+    packets = parser.follow_file(filename)
+    return packets, parser.done()
+
+
+def test_resumed_runs(collections, tmp_path):
+    packets, runs = collections
+    filename = str(tmp_path / 'growing.bin')
+    data = environment.generate_hk(12)
+    offsets = stix_parser.StixTCTMParser().scan_packet_offsets(data)
+    with open(filename, 'wb') as fout:
+        fout.write(data[:offsets[5] + 10])
+    new_packets, run = poll(filename)
+    assert len(new_packets) == 5
+    assert run['parsed_bytes'] == offsets[5]
+    assert run['filesize'] == offsets[5] + 10
+
+    with open(filename, 'ab') as fout:
+        fout.write(data[offsets[5] + 10:offsets[9]])
+    new_packets, run = poll(filename)
+    assert len(new_packets) == 4
+    assert len(runs.docs) == 1
+    assert run['summary']['num_tm'] == 9
+    assert run['summary']['spid'] == {'54101': 5, '54102': 4}
+    assert run['filesize'] == offsets[9]
+    assert len(packets.docs) == 9
+
+    #replaced by a larger file with other packets
+    replaced = environment.generate_hk(12, seed=1)
+    with open(filename + '.tmp', 'wb') as fout:
+        fout.write(replaced)
+    os.replace(filename + '.tmp', filename)
+    new_packets, run = poll(filename)
+    assert len(new_packets) == 12
+    assert run['parsed_bytes'] == len(replaced)
+    assert run['summary']['num_tm'] == 21
+
+
+def test_summary_of_polls(collections, tmp_path):
+    filename = str(tmp_path / 'growing.bin')
+    data = environment.generate_hk(6)
+    parser = stix_parser.StixTCTMParser()
+    parser.set_MongoDB_writer('localhost', 27017, '', '', raw_filename=filename,
+                              resume=True, dedup_index='')
+    for end in [len(data) // 2, len(data)]:
+        with open(filename, 'wb') as fout:
+            fout.write(data[:end])
+        parser.follow_file(filename, clear=False)
+    run = parser.done()
+    assert run['summary']['num_tm'] == 6
+    assert parser.get_summary()['num_tm'] == 6
@@ -0,0 +1,94 @@
+import shutil
+import sqlite3
+
+import pytest
+
+from stix.core.tests import environment
+from stix.core import config
+from stix.core import stix_datetime
+from stix.core import stix_idb
+from stix.core import stix_parser
+from stix.core import stix_packet_encoder as spe
+
+SCET_SWITCH = int(stix_datetime.utc2scet('2020-12-01T00:00:00'))
+#end of the validity period of the first IDB
+
+
+@pytest.fixture
+def idb_periods(tmp_path, monkeypatch):
+    """ two copies of the bundled IDB, valid before and after SCET_SWITCH """
+    filenames = []
+    for name, version in [('idb_a.sqlite', 'A'), ('idb_b.sqlite', 'B')]:
+        filename = str(tmp_path / name)
+        shutil.copy(environment.BUNDLED_IDB, filename)
+        conn = sqlite3.connect(filename)
+        conn.execute('update IDB set version=?', (version, ))
+        conn.execute('update PID set PID_DESCR=? where PID_SPID=54101',
+                     ('HK mini IDB ' + version, ))
+        conn.commit()
+        conn.close()
+        filenames.append(filename)
+    monkeypatch.setitem(config.parser_config, 'idb', [
+        {'filename': environment.BUNDLED_IDB},
+        {'filename': filenames[0],
+         'validityPeriod': ['2020-01-01T00:00:00', '2020-12-01T00:00:00']},
+        {'filename': filenames[1],
+         'validityPeriod': ['2020-12-01T00:00:00', '2021-12-01T00:00:00']},
+    ])
+    return filenames
+
+
+def generate_packets():
+    """ housekeeping packets every 12 hours, one day on each side of SCET_SWITCH """
+    encoder = spe.StixPacketEncoder()
+    return b''.join(
+        b''.join(encoder.encode(54101, spe.RandomValues(seed=i),
+                                SCET_SWITCH + 43200 * i + 100))
+        for i in range(-2, 2))
+
+
+def parse(buf, lazy=False):
+    parser = stix_parser.StixTCTMParser()
+    parser.set_idb_selection_enabled(True)
+    parser.set_lazy_parameters_enabled(lazy)
+    return parser, parser.parse_binary(buf)
+
+
+def test_packets_decoded_with_idb_of_their_period(idb_periods):
+    default_idb = stix_idb.stix_idb()
+    parser, packets = parse(generate_packets())
+    assert [p['header']['descr'] for p in packets] == [
+        'HK mini IDB A', 'HK mini IDB A', 'HK mini IDB B', 'HK mini IDB B'
+    ]
+    assert parser.idb_versions == ['A', 'B']
+    assert parser.idb.filename == idb_periods[1]
+    assert all(p['parameters'] for p in packets)
+    #the default IDB used by the other modules is not switched
+    assert default_idb.filename == environment.BUNDLED_IDB
+    assert default_idb.get_idb_version() not in ('A', 'B')
+
+
+def test_lazy_packets_decoded_with_idb_they_were_parsed_with(idb_periods):
+    _, packets = parse(generate_packets())
+    _, lazy_packets = parse(generate_packets(), lazy=True)
+    assert [p['decoding']['idb'] for p in lazy_packets] == [
+        idb_periods[0], idb_periods[0], idb_periods[1], idb_periods[1]
+    ]
+    #decoded in reverse order by another parser, which uses the default IDB
+    parser = stix_parser.StixTCTMParser()
+    for packet in reversed(lazy_packets):
+        parser.decode_parameters(packet)
+    for packet, lazy_packet in zip(packets, lazy_packets):
+        assert 'decoding' not in lazy_packet
+        assert lazy_packet['parameters'] == packet['parameters']
+
+
+def test_idb_instances_are_separate(idb_periods):
+    idb_a = stix_idb.get_idb(idb_periods[0])
+    idb_b = stix_idb.get_idb(idb_periods[1])
+    assert idb_a is not idb_b
+    assert idb_a is stix_idb.get_idb(idb_periods[0])
+    assert stix_idb.get_idb(environment.BUNDLED_IDB) is stix_idb.stix_idb()
+    assert (idb_a.get_packet_type_info(3, 25, 1)['PID_DESCR'],
+            idb_b.get_packet_type_info(3, 25, 1)['PID_DESCR']) == (
+                'HK mini IDB A', 'HK mini IDB B')
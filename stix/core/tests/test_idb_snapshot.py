@@ -0,0 +1,105 @@
+import os
+import pickle
+import shutil
+import sqlite3
+
+import numpy as np
+import pytest
+
+from stix.core import stix_calibration
+from stix.core import stix_idb
+from stix.core.tests import environment
+
+TABLES = ['packet_type_offsets', 'packet_type_infos', 'telecommand_infos']
+RAW_VALUES = np.arange(0, 4096, 7)
+
+
+def copy_idb(directory):
+    os.makedirs(str(directory))
+    filename = str(directory / 'idb.sqlite')
+    shutil.copy(environment.BUNDLED_IDB, filename)
+    return filename
+
+
+def read_snapshot(idb):
+    with open(idb.get_snapshot_filename(), 'rb') as fin:
+        return pickle.load(fin)
+
+
+def refuse_queries(idb, monkeypatch):
+    """ lookups must be served from the snapshot tables """
+    def execute(*args, **kwargs):
+        raise AssertionError('IDB queried: {}'.format(args[0]))
+    monkeypatch.setattr(idb, 'execute', execute)
+
+
+def calibrations(idb):
+    results = {}
+    for table, column in [('CAP', 'CAP_NUMBR'), ('MCF', 'MCF_IDENT'), ('TXP', 'TXP_NUMBR')]:
+        for ref, in stix_idb.stix_idb().execute(
+                'select distinct {} from {}'.format(column, table)):
+            results[ref] = stix_calibration.calibrate(ref, RAW_VALUES, 'TM', idb).tolist()
+    for ref, in stix_idb.stix_idb().execute('select distinct PAS_NUMBR from PAS'):
+        for value, _ in idb.get_telecommand_textual_calibration(ref):
+            results[(ref, value)] = stix_calibration.get_calibration(ref, 'TC', idb)(value)
+    return results
+
+
+@pytest.fixture
+def idbs(tmp_path):
+    """ an IDB loaded with its snapshot and a copy of it loaded without snapshot """
+    snapshot_idb = stix_idb._IDB(copy_idb(tmp_path / 'snapshot'))
+    snapshot_idb.create_snapshot()
+    snapshot_idb.close()
+    return stix_idb._IDB(snapshot_idb.filename), stix_idb._IDB(copy_idb(tmp_path / 'live'))
+
+
+def test_snapshot_same_as_live_idb(idbs, monkeypatch):
+    snapshot_idb, live_idb = idbs
+    assert not os.path.exists(live_idb.get_snapshot_filename())
+    for name in TABLES:
+        assert getattr(snapshot_idb, name) == getattr(live_idb, name), name
+    refuse_queries(snapshot_idb, monkeypatch)
+    assert calibrations(snapshot_idb) == calibrations(live_idb)
+    assert snapshot_idb.get_idb_version() == live_idb.get_idb_version()
+    for spid, tpsd in live_idb.execute('select distinct PID_SPID, PID_TPSD from PID'):
+        if tpsd == -1:
+            assert snapshot_idb.get_fixed_packet_structure(
+                spid) == live_idb.get_fixed_packet_structure(spid)
+        else:
+            assert snapshot_idb.get_variable_packet_structure(
+                spid) == live_idb.get_variable_packet_structure(spid)
+
+
+def test_snapshot_of_modified_idb_rebuilt(idbs):
+    snapshot_idb, _ = idbs
+    snapshot_idb.close()
+    conn = sqlite3.connect(snapshot_idb.filename)
+    conn.execute("update PID set PID_DESCR='modified' where PID_SPID=54101")
+    conn.commit()
+    conn.close()
+    idb = stix_idb._IDB(snapshot_idb.filename)
+    infos = [x for x in idb.packet_type_infos.values() if x['PID_SPID'] == 54101]
+    assert infos and all(x['PID_DESCR'] == 'modified' for x in infos)
+    snapshot = read_snapshot(idb)
+    assert snapshot['idb_hash'] == stix_idb.get_file_hash(idb.filename)
+    assert snapshot['tables']['packet_type_infos'] == idb.packet_type_infos
+
+
+def test_snapshot_of_another_version_rebuilt(idbs, monkeypatch):
+    snapshot_idb, _ = idbs
+    snapshot_idb.close()
+    monkeypatch.setattr(stix_idb, 'SNAPSHOT_VERSION', stix_idb.SNAPSHOT_VERSION + 1)
+    idb = stix_idb._IDB(snapshot_idb.filename)
+    assert read_snapshot(idb)['snapshot_version'] == stix_idb.SNAPSHOT_VERSION
+    refuse_queries(idb, monkeypatch)
+    assert idb.get_fixed_packet_structure(54101)
+
+
+def test_unreadable_snapshot_rebuilt(idbs):
+    snapshot_idb, live_idb = idbs
+    snapshot_idb.close()
+    with open(snapshot_idb.get_snapshot_filename(), 'wb') as fout:
+        fout.write(b'not a snapshot')
+    idb = stix_idb._IDB(snapshot_idb.filename)
+    assert read_snapshot(idb)['tables']['telecommand_infos'] == live_idb.telecommand_infos
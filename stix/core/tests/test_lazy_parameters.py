@@ -0,0 +1,55 @@
+import gzip
+import pickle
+
+import pytest
+
+from stix.core.tests import environment
+from stix.core import stix_parser
+from stix.core import stix_writer
+from stix.core.stix_datatypes import Packet
+
+
+def parse(buf, lazy, generated_decoders=True):
+    parser = stix_parser.StixTCTMParser()
+    parser.set_lazy_parameters_enabled(lazy)
+    parser.set_generated_decoders_enabled(generated_decoders)
+    return parser.parse_binary(buf)
+
+
+@pytest.mark.parametrize('generated_decoders', [True, False])
+def test_get_and_get_one(generated_decoders):
+    buf = environment.generate_mix(20)
+    packets = parse(buf, False)
+    lazy_packets = parse(buf, True, generated_decoders)
+    assert all(p['parameters'] is None for p in lazy_packets)
+    assert all(p['decoding']['generated_decoders'] == generated_decoders
+               for p in lazy_packets)
+    for packet, lazy_packet in zip(packets, lazy_packets):
+        expected, lazy = Packet(packet), Packet(lazy_packet)
+        name = packet['parameters'][0][0]
+        assert lazy.get_one(name) == expected.get_one(name)
+        assert lazy.get(name) == expected.get(name)
+        assert lazy_packet['parameters'] == packet['parameters']
+        assert 'data_field' not in lazy_packet
+    assert stix_parser.LAZY_PARAMETER_PARSERS.parsers[
+        generated_decoders].vp_tm_parser.generated_decoders_enabled == generated_decoders
+
+
+def test_packets_decoded_before_writing(tmp_path):
+    filename = str(tmp_path / 'packets.pklz')
+    parser = stix_parser.StixTCTMParser()
+    parser.set_lazy_parameters_enabled(True)
+    parser.set_pickle_writer(filename)
+    packets = parser.parse_binary(environment.generate_ql(4))
+    parser.done()
+    with gzip.open(filename, 'rb') as fin:
+        written = pickle.load(fin)['packet']
+    assert len(written) == len(packets) == 4
+    assert all(p['parameters'] and 'data_field' not in p for p in written)
+
+
+def test_writers_refuse_undecoded_packets(tmp_path):
+    packet = parse(environment.generate_hk(1), True)[0]
+    writer = stix_writer.StixPickleWriter(str(tmp_path / 'packets.pkl'))
+    with pytest.raises(ValueError):
+        writer.write_one(packet)
@@ -0,0 +1,16 @@
+from stix.core import stix_logger
+
+
+def test_errors_not_rate_limited(capsys, monkeypatch):
+    logger = stix_logger.get_logger()
+    monkeypatch.setattr(logger, 'message_counters', {})
+    monkeypatch.setattr(logger, 'level', stix_logger.WARNING)
+    num = stix_logger.RATE_LIMIT_COUNT * 2
+    capsys.readouterr()
+    for i in range(num):
+        logger.warning('Rate limited warning {}', i)
+        logger.error('Error {}', i)
+    lines = capsys.readouterr().out.splitlines()
+    assert sum('Rate limited warning' in x for x in lines) == stix_logger.RATE_LIMIT_COUNT
+    assert [x.rpartition(': ')[2] for x in lines
+            if '[ERROR' in x] == ['Error {}'.format(i) for i in range(num)]
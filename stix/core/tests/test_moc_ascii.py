@@ -0,0 +1,86 @@
+import datetime
+import itertools
+
+import pytest
+
+from stix.core import stix_datetime
+from stix.core import stix_packet_encoder as spe
+from stix.core import stix_parser
+
+NUM_PACKETS = 60
+BATCH_SIZE = 2000
+RECEIPT_START = datetime.datetime(2021, 3, 1, 12, 0, 0)
+
+
+def new_parser():
+    parser = stix_parser.StixTCTMParser()
+    parser.set_progress_bar_enabed(False)
+    return parser
+
+
+def receipt_utc(line_number):
+    return (RECEIPT_START + datetime.timedelta(seconds=line_number, milliseconds=line_number)
+            ).isoformat(timespec='milliseconds') + 'Z'
+
+
+def write_moc_ascii(tmp_path):
+    """
+    a MOC ascii file with a receipt time of its own on each line, two packets on a line,
+    a packet split across two lines and bad lines
+    """
+    filename = str(tmp_path / 'generated.ascii')
+    spe.write_telemetry(filename, spe.TelemetryGenerator(seed=5), 'ascii',
+                        num_packets=NUM_PACKETS)
+    with open(filename, 'rb') as fin:
+        hex_strings = [line.split()[1] for line in fin]
+    half = len(hex_strings[7]) // 2
+    hex_strings = (hex_strings[:5] + [hex_strings[5] + hex_strings[6]] +
+                   [hex_strings[7][:half], hex_strings[7][half:]] + hex_strings[8:30] +
+                   [b'ZZ' + hex_strings[30][2:], hex_strings[31][:-1], b''] + hex_strings[32:])
+    lines = [
+        '{} {}\n'.format(receipt_utc(k), x.decode()) if x else 'no_hex_string\n'
+        for k, x in enumerate(hex_strings)
+    ]
+    with open(filename, 'w') as fout:
+        fout.write(''.join(lines))
+    return filename, lines
+
+
+def parse_line_by_line(lines):
+    """ the MOC ascii file decoded line by line, as before lines were read in batches """
+    parser = new_parser()
+    return parser.collect_packets(
+        itertools.chain.from_iterable(parser.iter_moc_ascii_line(x) for x in lines))
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    monkeypatch.setattr(stix_parser, 'MOC_ASCII_BATCH_SIZE', BATCH_SIZE)
+
+
+def test_batches_same_as_line_by_line(tmp_path, small_batches):
+    filename, lines = write_moc_ascii(tmp_path)
+    num_batches = 0
+    with open(filename, 'rb') as fin:
+        while fin.readlines(stix_parser.MOC_ASCII_BATCH_SIZE):
+            num_batches += 1
+    assert num_batches > 5
+    packets = new_parser().parse_file(filename)
+    expected = parse_line_by_line(lines)
+    assert len(packets) == len(expected) >= NUM_PACKETS - 5
+    assert packets == expected
+
+
+def test_packets_keep_receipt_time_of_their_line(tmp_path, small_batches):
+    filename, lines = write_moc_ascii(tmp_path)
+    receipt_utcs = []
+    for line in lines:
+        receipt_utcs.extend(line.split()[0] for _ in parse_line_by_line([line]))
+    packets = new_parser().parse_file(filename)
+    assert len(packets) == len(receipt_utcs)
+    assert len(set(receipt_utcs)) >= NUM_PACKETS - 5
+    assert receipt_utcs.count(receipt_utc(5)) == 2
+    for packet, utc in zip(packets, receipt_utcs):
+        header = packet['header']
+        assert header['UTC'] == stix_datetime.parse_utc(utc)
+        assert header['unix_time'] == stix_datetime.parse_utc(utc).timestamp()
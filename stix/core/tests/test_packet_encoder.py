@@ -0,0 +1,43 @@
+import binascii
+import struct
+
+from stix.core import stix_packet_encoder as spe
+from stix.core import stix_parser
+
+
+def write(filename, file_type, num_packets=10):
+    spe.write_telemetry(filename, spe.TelemetryGenerator(seed=1), file_type,
+                        num_packets=num_packets)
+
+
+def new_parser():
+    parser = stix_parser.StixTCTMParser()
+    parser.set_progress_bar_enabed(False)
+    return parser
+
+
+def test_edds_xml(tmp_path):
+    xml_filename = str(tmp_path / 'raw.xml')
+    bin_filename = str(tmp_path / 'raw.bin')
+    write(xml_filename, 'xml')
+    write(bin_filename, 'bin')
+    with open(xml_filename, 'rb') as fin:
+        elements = list(stix_parser.iter_xml_elements(fin, 'PktRawResponseElement'))
+    assert [int(x['@packetID']) for x in elements] == list(range(1, 11))
+    for element in elements:
+        data = binascii.unhexlify(element['Packet'])
+        prefix = data[:stix_parser.EDDS_PACKET_PREFIX_LENGTH]
+        packet = data[stix_parser.EDDS_PACKET_PREFIX_LENGTH:]
+        (packet_id, length, coarse, fine, receipt_seconds, _, apid, seq_count,
+         service_type, service_subtype, _, _,
+         _) = spe.EDDS_PACKET_PREFIX_STRUCT.unpack(prefix)
+        header = struct.unpack('>HHHBBBBIH', packet[:16])
+        assert packet_id == int(element['@packetID'])
+        assert length == len(packet)
+        assert (apid, seq_count) == (header[0] & 0x7FF, header[1] & 0x3FFF)
+        assert (service_type, service_subtype) == header[4:6]
+        assert (coarse, fine) == header[7:]
+        assert receipt_seconds - spe.UNIX_TIME_SCET_EPOCH - coarse == spe.RECEIPT_DELAY
+    packets = new_parser().parse_file(xml_filename)
+    assert len(packets) == 10
+    assert packets == new_parser().parse_file(bin_filename)
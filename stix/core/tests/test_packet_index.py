@@ -0,0 +1,110 @@
+import binascii
+import os
+
+import pytest
+
+from stix.core import stix_packet_encoder as spe
+from stix.core import stix_packet_index as spi
+from stix.core import stix_parser
+
+NUM_PACKETS = 40
+SELECTED_SPIDS = [54102, 54120]
+
+
+def write(filename, file_type, num_packets=NUM_PACKETS):
+    spe.write_telemetry(filename, spe.TelemetryGenerator(seed=3), file_type,
+                        num_packets=num_packets)
+
+
+def new_parser():
+    parser = stix_parser.StixTCTMParser()
+    parser.set_progress_bar_enabed(False)
+    return parser
+
+
+def header_fields(header, packet):
+    return (header['SPID'], header['seq_count'], header['coarse_time'], header['fine_time'],
+            new_parser().hash_packet(packet).encode())
+
+
+def record_fields(record):
+    return (int(record['spid']), int(record['seq_count']), int(record['coarse_time']),
+            int(record['fine_time']), bytes(record['hash']))
+
+
+def test_binary_file_index(tmp_path):
+    filename = str(tmp_path / 'raw.bin')
+    write(filename, 'bin')
+    with open(filename, 'rb') as fin:
+        data = fin.read()
+    index, file_type = spi.get_index(filename, parser=new_parser())
+    assert file_type == 'bin'
+    headers = list(new_parser().iter_headers(data))
+    assert len(index) == len(headers) >= NUM_PACKETS
+    assert [(int(x['offset']), int(x['length'])) for x in index] == [
+        (start, end - start) for start, end, _ in headers
+    ]
+    assert [record_fields(x) for x in index] == [
+        header_fields(header, data[start:end]) for start, end, header in headers
+    ]
+
+
+def test_ascii_file_index(tmp_path):
+    filename = str(tmp_path / 'raw.ascii')
+    write(filename, 'ascii')
+    index, file_type = spi.get_index(filename, parser=new_parser())
+    assert file_type == 'ascii'
+    expected = []
+    offset = 0
+    with open(filename, 'rb') as fin:
+        for line in fin:
+            data = binascii.unhexlify(line.split()[1])
+            for start, end, header in new_parser().iter_headers(data):
+                expected.append((offset, len(line), header_fields(header, data[start:end])))
+            offset += len(line)
+    assert len(expected) == NUM_PACKETS
+    assert [(int(x['offset']), int(x['length']), record_fields(x)) for x in index] == expected
+
+
+def test_xml_file_index(tmp_path):
+    filename = str(tmp_path / 'raw.xml')
+    write(filename, 'xml')
+    index, file_type = spi.get_index(filename, parser=new_parser())
+    assert file_type == 'xml.tm.raw'
+    assert index['offset'].tolist() == list(range(NUM_PACKETS))
+    packets = new_parser().parse_file(filename)
+    assert index['spid'].tolist() == [x['header']['SPID'] for x in packets]
+    assert [x.decode() for x in index['hash']] == [x['hash'] for x in packets]
+
+
+@pytest.mark.parametrize('file_type', ['bin', 'ascii', 'xml'])
+def test_parse_selected_packets(tmp_path, file_type):
+    filename = str(tmp_path / 'raw.{}'.format(file_type))
+    write(filename, file_type)
+    packets = new_parser().parse_file(filename)
+    index, _ = spi.get_index(filename, parser=new_parser())
+    records = spi.select(index, spids=SELECTED_SPIDS)
+    selected = spi.parse_packets(filename, records, new_parser())
+    assert len(selected) > 0
+    assert selected == [x for x in packets if x['header']['SPID'] in SELECTED_SPIDS]
+
+
+def test_sidecar_rebuilt_when_file_changes(tmp_path):
+    filename = str(tmp_path / 'raw.bin')
+    write(filename, 'bin', 10)
+    index, _ = spi.get_index(filename, parser=new_parser())
+    assert os.path.exists(spi.get_index_filename(filename))
+    assert len(spi.load_index(filename)[0]) == len(index)
+
+    stat = os.stat(filename)
+    os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert spi.load_index(filename) == (None, None)
+    rebuilt, _ = spi.get_index(filename, parser=new_parser())
+    assert rebuilt.tolist() == index.tolist()
+    assert spi.load_index(filename)[0] is not None
+
+    write(filename, 'bin', 20)
+    assert spi.load_index(filename) == (None, None)
+    rebuilt, _ = spi.get_index(filename, parser=new_parser())
+    assert len(rebuilt) > len(index)
+    assert len(spi.load_index(filename)[0]) == len(rebuilt)
@@ -0,0 +1,74 @@
+import pytest
+
+from stix.core import stix_idb
+
+IDB = stix_idb.stix_idb()
+PID_KEYS = sorted(set(IDB.execute('select PID_TYPE, PID_STYPE, PID_PI1_VAL from PID')))
+PIC_KEYS = sorted(set(IDB.execute('select PIC_TYPE, PIC_STYPE from PIC')))
+CCF_KEYS = sorted(set(IDB.execute('select CCF_TYPE, CCF_STYPE from CCF')))
+MISSING_KEY = (255, 255)
+
+
+def packet_type_info_query(packet_type, packet_subtype, pi1_val=-1):
+    """ the queries used before the tables were loaded into dictionaries """
+    if pi1_val == -1:
+        rows = IDB.execute(
+            'select PID_SPID, PID_DESCR, PID_TPSD from PID '
+            'where PID_TYPE=? and PID_STYPE=? limit 1', (packet_type, packet_subtype), 'dict')
+    else:
+        rows = IDB.execute(
+            'select PID_SPID, PID_DESCR, PID_TPSD from PID '
+            'where PID_TYPE=? and PID_STYPE=? and PID_PI1_VAL=? limit 1',
+            (packet_type, packet_subtype, pi1_val), 'dict')
+    return rows[0] if rows else None
+
+
+def packet_type_offset_query(packet_type, packet_subtype):
+    rows = IDB.execute('select PIC_PI1_OFF, PIC_PI1_WID from PIC '
+                       'where PIC_TYPE=? and PIC_STYPE=? limit 1', (packet_type, packet_subtype))
+    return tuple(rows[0]) if rows else (0, 0)
+
+
+def telecommand_info_query(header):
+    rows = IDB.execute(
+        'select  CCF_CNAME, CCF_DESCR, CCF_DESCR2, '
+        ' CCF_NPARS from CCF where CCF_TYPE=? and CCF_STYPE =? order by CCF_CNAME asc',
+        (header['service_type'], header['service_subtype']), 'dict')
+    index = 0
+    if len(rows) > 1 and 'subtype' in header:
+        index = header['subtype'] - 1
+    try:
+        return rows[index]
+    except IndexError:
+        return None
+
+
+def test_tables_loaded():
+    assert len(PID_KEYS) >= 200
+    assert len(CCF_KEYS) >= 50
+    spids = {info['PID_SPID'] for info in IDB.packet_type_infos.values()}
+    assert spids == {spid for spid, in IDB.execute('select PID_SPID from PID')}
+
+
+def test_packet_type_info_same_as_query():
+    for packet_type, packet_subtype, pi1_val in PID_KEYS:
+        for key in [(packet_type, packet_subtype, pi1_val), (packet_type, packet_subtype)]:
+            assert IDB.get_packet_type_info(*key) == packet_type_info_query(*key), key
+    assert IDB.get_packet_type_info(*MISSING_KEY) is None
+    assert packet_type_info_query(*MISSING_KEY) is None
+
+
+def test_packet_type_offset_same_as_query():
+    for key in PIC_KEYS + [MISSING_KEY]:
+        assert tuple(IDB.get_packet_type_offset(*key)) == packet_type_offset_query(*key), key
+
+
+@pytest.mark.parametrize('service_type, service_subtype', CCF_KEYS + [MISSING_KEY])
+def test_telecommand_info_same_as_query(service_type, service_subtype):
+    header = {'service_type': service_type, 'service_subtype': service_subtype}
+    assert IDB.get_telecommand_info(header) == telecommand_info_query(header)
+    num_names = len(IDB.execute('select CCF_CNAME from CCF where CCF_TYPE=? and CCF_STYPE=?',
+                                (service_type, service_subtype)))
+    for subtype in range(0, num_names + 2):
+        header['subtype'] = subtype
+        assert IDB.get_telecommand_info(header) == telecommand_info_query(header), subtype
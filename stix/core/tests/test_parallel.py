@@ -0,0 +1,169 @@
+import mmap
+import random
+import shutil
+from multiprocessing.pool import ThreadPool
+
+from stix.core.tests import environment
+from stix.core import stix_packet_encoder as spe
+from stix.core import stix_global
+from stix.core import stix_header
+from stix.core import stix_parser
+from stix.core import stix_dedup
+from stix.core import stix_writer
+
+ALERT_SPID = 54256
+
+
+def generate_file(filename):
+    """ packets with alerts, bad bytes, a bad telemetry header and a truncated last packet """
+    rng = random.Random(environment.SEED)
+    encoder = spe.StixPacketEncoder()
+    alert = b''.join(
+        encoder.encode(ALERT_SPID, spe.RandomValues(rng=rng), environment.SCET_START))
+    bad_header = bytearray(environment.generate_hk(1))
+    bad_header[6] = 0
+    #invalid PUS version, the header is skipped and the data field is scanned
+    mix = environment.generate_mix(40)
+    offsets = stix_parser.StixTCTMParser().scan_packet_offsets(mix)
+    middle = offsets[len(offsets) // 2]
+    data = b''.join([
+        mix[:middle], alert, b'\x00\x01\x02', bytes(bad_header), mix[middle:],
+        alert, environment.generate_hk(1)[:-5]
+    ])
+    with open(filename, 'wb') as fout:
+        fout.write(data)
+    return data
+
+
+def new_parser():
+    parser = stix_parser.StixTCTMParser()
+    parser.set_progress_bar_enabed(False)
+    return parser
+
+
+def scan_decoding_headers(parser, buf):
+    """ offsets found by decoding the headers, as parse_binary does """
+    offsets = []
+    i = 0
+    while i < len(buf):
+        offsets.append(i)
+        if buf[i] in stix_header.TM_HEADER_FIRST_BYTE:
+            status, header = parser.parse_telemetry_header(buf[i:i + 16])
+            i += 16
+            if status == stix_global.OK:
+                i += header['length'] - 9
+        elif buf[i] in stix_header.TC_HEADER_FIRST_BYTE:
+            status, header = parser.parse_telecommand_header(buf, i)
+            i += 10
+            if status == stix_global.OK:
+                i += header['length'] + 1 - 4
+        else:
+            i = stix_parser.find_next_header(buf, i)
+            if i == stix_global.EOF:
+                break
+    return offsets
+
+
+def test_scan_over_memory_map(tmp_path):
+    filename = str(tmp_path / 'raw.bin')
+    data = generate_file(filename)
+    parser = new_parser()
+    with open(filename, 'rb') as fin, mmap.mmap(fin.fileno(), 0,
+                                                access=mmap.ACCESS_READ) as mapped:
+        offsets = list(parser.iter_packet_offsets(mapped))
+    assert offsets == scan_decoding_headers(parser, data)
+
+
+def test_parallel_same_as_serial(tmp_path):
+    filename = str(tmp_path / 'raw.bin')
+    generate_file(filename)
+    serial = new_parser()
+    expected = serial.parse_file(filename)
+    parallel = new_parser()
+    parallel.prepare_file(filename)
+    packets = parallel.parse_binary_file_parallel(filename,
+                                                  num_processes=2,
+                                                  chunk_size=2048)
+    assert len(expected) == 43
+    assert packets == expected
+    assert parallel.get_summary() == serial.get_summary()
+    assert parallel.get_stix_alerts() == serial.get_stix_alerts()
+    assert len(serial.get_stix_alerts()) == 2
+
+
+def parse_into_mongodb(filename, chunk_size=None, dedup_index=''):
+    """ the chunks are parsed by a thread, the in-memory collections are shared """
+    parser = new_parser()
+    parser.set_MongoDB_writer('localhost', 27017, '', '', raw_filename=filename,
+                              dedup_index=dedup_index)
+    if chunk_size:
+        parser.set_packet_buffer_enabled(False)
+        parser.prepare_file(filename)
+        assert parser.parse_binary_file_parallel(filename, 1, chunk_size) == []
+    else:
+        parser.parse_file(filename)
+    return parser.done()
+
+
+def strip_ids(docs, positions):
+    """ documents without identifiers, packet identifiers replaced by positions in the run """
+    stripped = []
+    for doc in docs:
+        doc = {key: value for key, value in doc.items() if key not in ('_id', 'run_id')}
+        if 'packet_id' in doc:
+            doc['packet_id'] = positions[doc['packet_id']]
+        if 'packet_ids' in doc:
+            doc['packet_ids'] = [positions[x] for x in doc['packet_ids']]
+        stripped.append(doc)
+    return stripped
+
+
+def test_workers_write_packets(tmp_path, monkeypatch, collections):
+    monkeypatch.setattr(stix_parser.multiprocessing, 'Pool', ThreadPool)
+    monkeypatch.setattr(stix_parser, 'init_parser_worker', lambda: None)
+    filename = str(tmp_path / 'raw.bin')
+    generate_file(filename)
+    serial_run = parse_into_mongodb(filename)
+    parallel_run = parse_into_mongodb(filename, chunk_size=2048)
+    packets, _ = collections
+    db = stix_writer.pymongo.MongoClient()['stix']
+    runs = []
+    for run in [serial_run, parallel_run]:
+        docs = sorted((x for x in packets.docs if x['run_id'] == run['_id']),
+                      key=lambda x: x['_id'])
+        positions = {doc['_id']: i for i, doc in enumerate(docs)}
+        reports = [
+            strip_ids([x for x in db[name].docs if x['run_id'] == run['_id']], positions)
+            for name in ['quick_look', 'bsd']
+        ]
+        runs.append((docs, strip_ids(docs, positions), reports))
+    (serial_docs, serial_packets, serial_reports), (parallel_docs, parallel_packets,
+                                                    parallel_reports) = runs
+    assert len(serial_docs) == 43
+    assert parallel_packets == serial_packets
+    assert parallel_docs[0]['_id'] == serial_docs[-1]['_id'] + 1
+    assert [x['_id'] for x in parallel_docs] == sorted({x['_id'] for x in parallel_docs})
+    assert [len(x) for x in serial_reports] == [16, 8]
+    assert parallel_reports == serial_reports
+    for key in ['data_start_unix_time', 'data_stop_unix_time', 'data_start_scet',
+                'data_end_scet', 'num_duplicates']:
+        assert parallel_run[key] == serial_run[key], key
+
+
+def test_workers_update_dedup_index(tmp_path, monkeypatch, collections):
+    monkeypatch.setattr(stix_parser.multiprocessing, 'Pool', ThreadPool)
+    monkeypatch.setattr(stix_parser, 'init_parser_worker', lambda: None)
+    filename = str(tmp_path / 'raw.bin')
+    generate_file(filename)
+    copy = str(tmp_path / 'copy.bin')
+    shutil.copy(filename, copy)
+    index = str(tmp_path / 'hashes.npy')
+    run = parse_into_mongodb(filename, chunk_size=2048, dedup_index=index)
+    packets, _ = collections
+    num_packets = len(packets.docs)
+    assert run['num_duplicates'] == 0
+    hashes = {x['hash'] for x in packets.docs}
+    assert len(stix_dedup.StixPacketHashIndex(index)) == len(hashes)
+    run = parse_into_mongodb(copy, dedup_index=index)
+    assert run['num_duplicates'] == num_packets
+    assert len(packets.docs) == num_packets
@@ -0,0 +1,125 @@
+import random
+
+import pytest
+
+from stix.core import stix_idb
+from stix.core import stix_packet_encoder as spe
+from stix.core import stix_parser
+from stix.core.tests import environment
+
+IDB = stix_idb.stix_idb()
+VARIABLE_SPIDS = sorted(spid for spid, in IDB.execute(
+    'select distinct PID_SPID from PID where PID_TPSD!=-1'))
+ENCODER = spe.StixPacketEncoder()
+NUM_PACKETS = 3
+
+
+class MutableTreeParser(stix_parser.StixVariableTelemetryPacketParser):
+    """
+    the walk used before parse trees were frozen: the tree built by init_nodes and
+    build_parse_tree for each SPID, with repeater counters stored in its nodes
+    """
+    def parse(self, data, spid):
+        self.last_data_width = 0
+        self.last_num_bits = 0
+        self.buffer = data
+        self.spid = spid
+        self.current_offset = 0
+        self.last_offset = 0
+        self.current_offset_bit = 0
+        self.results_tree = []
+        self.init_nodes()
+        self.build_parse_tree()
+        if self.length_min > len(self.buffer):
+            return 0, None, stix_parser.stix_global.VARIABLE_PACKET_LENGTH_MISMATCH
+        self.walk_nodes(self.nodes[0], self.results_tree)
+        return self.current_offset, self.results_tree, stix_parser.stix_global.OK
+
+    def walk_nodes(self, mother, parameters):
+        for i in range(0, mother['counter']):
+            for pnode in mother['children']:
+                if not pnode or self.current_offset > len(self.buffer):
+                    return
+                param = self.parse_mutable_node(pnode)
+                if pnode['children']:
+                    num_children = stix_parser.to_int(param[1])
+                    if isinstance(num_children, int) and num_children > 0:
+                        pnode['counter'] = num_children
+                        self.walk_nodes(pnode, param[3])
+                parameters.append(param)
+
+    def parse_mutable_node(self, node):
+        par = node['parameter']
+        offset_bits = int(par['VPD_OFFSET'])
+        width = int(par['PCF_WIDTH'])
+        if width % 8 != 0:
+            if offset_bits < 0:
+                self.current_offset_bit = self.last_data_width + offset_bits
+            else:
+                self.current_offset_bit += self.last_num_bits + offset_bits
+            self.last_num_bits = width
+        else:
+            self.current_offset_bit = 0
+            self.last_offset = self.current_offset
+            self.current_offset += width / 8
+            self.last_num_bits = 0
+            self.last_data_width = width
+        return self.decode_parameter(self.buffer, node['name'], self.last_offset,
+                                     self.current_offset_bit, width, int(par['PCF_PTC']),
+                                     int(par['PCF_PFC']), par['PCF_CURTX'], 'TM',
+                                     node['name'] in stix_parser.PARMETERS_CALIBRATION_ENABLED)
+
+
+def new_parser():
+    parser = stix_parser.StixTCTMParser()
+    parser.set_progress_bar_enabed(False)
+    return parser
+
+
+def data_fields(spid):
+    rng = random.Random(spid)
+    buf = b''.join(
+        b''.join(ENCODER.encode(spid, spe.RandomValues(rng=rng), environment.SCET_START + i))
+        for i in range(NUM_PACKETS))
+    if spid in (54118, 54120):
+        buf += environment.generate_ql(2 * NUM_PACKETS)
+    elif spid == 54114:
+        buf += environment.generate_bsd(NUM_PACKETS)
+    return [(header['SPID'], buf[start + 16:end])
+            for start, end, header in new_parser().iter_headers(buf) if header['SPID'] == spid]
+
+
+def decode(parser, vp_parser, spid, data):
+    parser.decompressor.init(spid)
+    vp_parser.decompressor = parser.decompressor
+    vp_parser.idb = parser.idb
+    return vp_parser.parse(data, spid)
+
+
+@pytest.mark.parametrize('spid', VARIABLE_SPIDS)
+def test_frozen_tree_walk_same_as_mutable_tree_walk(spid):
+    parser = new_parser()
+    parser.set_generated_decoders_enabled(False)
+    mutable_parser = MutableTreeParser()
+    fields = data_fields(spid)
+    assert len(fields) >= NUM_PACKETS
+    for packet_spid, data in fields:
+        expected = decode(parser, mutable_parser, packet_spid, data)
+        assert decode(parser, parser.vp_tm_parser, packet_spid, data) == expected
+    assert (parser.idb.filename, spid) in parser.vp_tm_parser.parse_trees
+
+
+def test_parse_trees_not_modified_by_walks():
+    parser = new_parser()
+    parser.set_generated_decoders_enabled(False)
+    fields = data_fields(54118)
+    tree = parser.vp_tm_parser.get_parse_tree(54118)
+    for spid, data in fields + fields[::-1]:
+        decode(parser, parser.vp_tm_parser, spid, data)
+    assert parser.vp_tm_parser.get_parse_tree(54118) is tree
+    mutable_parser = MutableTreeParser()
+    mutable_parser.idb = parser.idb
+    mutable_parser.spid = 54118
+    mutable_parser.init_nodes()
+    mutable_parser.build_parse_tree()
+    assert tree[1] == mutable_parser.length_min
@@ -0,0 +1,37 @@
+from stix.core.tests import environment
+from stix.core import stix_idb
+from stix.core import stix_parser
+from stix.core import stix_profiler
+
+
+def new_parser(profiling_enabled=True):
+    parser = stix_parser.StixTCTMParser()
+    parser.set_progress_bar_enabed(False)
+    parser.set_profiling_enabled(profiling_enabled)
+    return parser
+
+
+def test_shared_idb_not_wrapped():
+    buf = environment.generate_hk(10)
+    first, second = new_parser(), new_parser()
+    first.parse_binary(buf)
+    first.set_profiling_enabled(False)
+    second.parse_binary(buf)
+    default_idb = stix_idb.stix_idb()
+    assert not set(vars(default_idb)) & set(stix_parser.IDB_PROFILED_METHODS)
+    assert first.idb is default_idb
+    assert second.idb.timed_object is default_idb
+    stages = second.get_profile()['stages']
+    assert stages[stix_profiler.IDB_LOOKUP]['calls'] >= 10
+    assert stages[stix_profiler.HEADER]['calls'] == 10
+
+
+def test_parallel_headers_counted_once(tmp_path):
+    filename = str(tmp_path / 'mix.bin')
+    with open(filename, 'wb') as fout:
+        fout.write(environment.generate_mix(20))
+    parser = new_parser()
+    packets = parser.parse_file(filename, num_processes=2)
+    stages = parser.get_profile()['stages']
+    assert stages[stix_profiler.HEADER]['calls'] == len(packets) == 20
+    assert stages[stix_profiler.PARAMETERS]['calls'] == 20
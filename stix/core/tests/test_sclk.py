@@ -0,0 +1,119 @@
+import random
+from datetime import datetime
+
+import numpy as np
+import pytest
+import spiceypy
+
+from stix.core import spice_manager as spm
+from stix.core import stix_datetime
+from stix.core import stix_sclk
+
+RECORD_DAYS = 30
+NUM_RECORDS = 90
+#coefficient records from 2000 to 2007, the leap second at the end of 2005 is covered
+PARALLEL_TIME_START = -43135.816
+#TDT seconds past J2000 of 2000-01-01T00:00:00 UTC
+LEAP_SECOND = '2005-12-31T23:59:60'
+SCLK_KERNEL = '''KPL/SCLK
+
+\\begindata
+
+SCLK_KERNEL_ID           = ( @2020-01-01/00:00:00 )
+SCLK_DATA_TYPE_144       = ( 1 )
+SCLK01_TIME_SYSTEM_144   = ( 2 )
+SCLK01_N_FIELDS_144      = ( 2 )
+SCLK01_MODULI_144        = ( 4294967296 65536 )
+SCLK01_OFFSETS_144       = ( 0 0 )
+SCLK01_OUTPUT_DELIM_144  = ( 2 )
+SCLK_PARTITION_START_144 = ( 0.0000000000000E+00 )
+SCLK_PARTITION_END_144   = ( 2.8147497671065E+14 )
+SCLK01_COEFFICIENTS_144  = (
+{}
+)
+
+\\begintext
+'''
+
+
+def get_coefficients():
+    """ records of a drifting clock, the rate changes at each record """
+    rng = random.Random(0)
+    parallel_time = PARALLEL_TIME_START
+    lines = []
+    for i in range(NUM_RECORDS):
+        rate = 1 + rng.uniform(-1e-6, 1e-6)
+        ticks = i * RECORD_DAYS * 86400 * 65536
+        lines.append('{:.13E} {:.13E} {:.13E}'.format(ticks, parallel_time, rate))
+        parallel_time += rate * RECORD_DAYS * 86400
+    return '\n'.join(lines)
+
+
+@pytest.fixture
+def table(tmp_path, monkeypatch):
+    filename = str(tmp_path / 'drifting_sclk.tsc')
+    with open(filename, 'w') as fout:
+        fout.write(SCLK_KERNEL.format(get_coefficients()))
+    monkeypatch.setattr(spm.spice, 'last_sclk_file', spm.spice.last_sclk_file)
+    spm.spice.furnish(filename)
+    yield stix_sclk.get_correlation_table()
+    spiceypy.unload(filename)
+
+
+def spice_unix(coarse, fine):
+    """ unix time computed by SPICE, via the UTC string """
+    utc = spiceypy.et2utc(spiceypy.scs2e(-144, '{}:{}'.format(coarse, fine)),
+                          'ISOC', 6)
+    return (datetime.fromisoformat(utc) - datetime(1970, 1, 1)).total_seconds()
+
+
+def leap_second_scet():
+    ticks = spiceypy.sce2t(-144, spiceypy.utc2et(LEAP_SECOND + '.5'))
+    return int(ticks) // 65536, int(ticks) % 65536
+
+
+def random_scets(num):
+    rng = np.random.default_rng(1)
+    end = (NUM_RECORDS + 10) * RECORD_DAYS * 86400
+    return rng.integers(0, end, num), rng.integers(0, 65536, num)
+
+
+def test_table_same_as_spice(table):
+    assert table is not None
+    assert len(table.leap_seconds) == 1
+    for coarse, fine in zip(*random_scets(500)):
+        unix_time = table.scet2unix(int(coarse), int(fine))
+        assert unix_time is not None
+        assert unix_time == pytest.approx(spice_unix(coarse, fine), abs=2e-6)
+
+
+def test_table_around_leap_second(table):
+    coarse, fine = leap_second_scet()
+    assert table.scet2unix(coarse, fine) is None
+    for offset in [-2, -1.1, 1, 2]:
+        ticks = coarse * 65536 + fine + int(offset * 65536)
+        unix_time = table.scet2unix(ticks // 65536, ticks % 65536)
+        assert unix_time == pytest.approx(spice_unix(ticks // 65536, ticks % 65536),
+                                          abs=2e-6)
+
+
+def test_leap_second_converted_with_spice(table):
+    coarse, fine = leap_second_scet()
+    assert stix_datetime.scet2utc(coarse, fine) == LEAP_SECOND + '.500'
+    assert np.isnan(table.scet2unix_array([coarse], [fine]))[0]
+    #the unix time of a leap second is the one of the next second
+    expected = [
+        (datetime(2006, 1, 1, 0, 0, x, 500000) - datetime(1970, 1, 1)).total_seconds()
+        for x in [0, 1]
+    ]
+    assert stix_datetime.scet2unix(coarse, fine) == expected[0]
+    assert stix_datetime.scet2unix_array([coarse, coarse + 2],
+                                         [fine, fine]).tolist() == expected
+
+
+def test_datetimes_same_as_spice(table):
+    coarse, fine = random_scets(500)
+    datetimes = stix_datetime.scet_to_datetimes(coarse, fine)
+    for dt, c, f in zip(datetimes, coarse, fine):
+        assert dt == stix_datetime.scet_to_datetime('{}:{}'.format(c, f))
+
@@ -0,0 +1,44 @@
+import threading
+
+import pytest
+
+from stix.core.tests import environment
+from stix.core import stix_parser
+
+NUM_THREADS = 8
+NUM_REPEATS = 3
+
+
+def parse(buf, generated_decoders):
+    parser = stix_parser.StixTCTMParser()
+    parser.set_progress_bar_enabed(False)
+    parser.set_generated_decoders_enabled(generated_decoders)
+    return parser.parse_binary(buf)
+
+
+@pytest.mark.parametrize('generated_decoders', [True, False])
+def test_concurrent_parsers(generated_decoders):
+    #quick-look (54118, 54120) and science (54114) packets are compressed
+    buf = environment.generate_ql(20) + environment.generate_bsd(10)
+    expected = [p['parameters'] for p in parse(buf, generated_decoders)]
+    barrier = threading.Barrier(NUM_THREADS)
+    results = [None] * NUM_THREADS
+    errors = []
+
+    def run(index):
+        try:
+            barrier.wait()
+            results[index] = [[p['parameters'] for p in parse(buf, generated_decoders)]
+                              for _ in range(NUM_REPEATS)]
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(i, )) for i in range(NUM_THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    for result in results:
+        for parameters in result:
+            assert parameters == expected
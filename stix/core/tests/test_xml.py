@@ -0,0 +1,157 @@
+import itertools
+import struct
+
+import pytest
+import xmltodict
+
+from stix.core import stix_datetime
+from stix.core import stix_packet_encoder as spe
+from stix.core import stix_parser
+
+NUM_PACKETS = 30
+TC_HISTORY_HEAD = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                   '<ns2:ResponsePart xmlns:ns2="http://edds.egos.esa/model">\n'
+                   '<Response>\n<PktTcReportResponse>\n<PktTcReportList>\n')
+TC_HISTORY_TAIL = ('</PktTcReportList>\n</PktTcReportResponse>\n</Response>\n'
+                   '</ns2:ResponsePart>\n')
+TC_STATES = [
+    'ReleaseState', 'GroundState', 'UplinkState', 'OnBoardState', 'OnBoardAccState',
+    'OnBoardAccPBState', 'ExecCompPBState'
+]
+TC_APID_PACKET_ID = 0x1DA1
+#version 0, telecommand, data field header, APID 1441
+TC_ACK_BYTE = 0x19
+ELEMENT_TAGS = ['PktRawResponseElement', 'PktTcReportListElement']
+
+
+def new_parser():
+    parser = stix_parser.StixTCTMParser()
+    parser.set_progress_bar_enabed(False)
+    return parser
+
+
+def encode_telecommand(service_type, service_subtype, data=b'', seq_count=0):
+    """ a STIX telecommand with a zero CRC """
+    length = len(data) + 5
+    #data field, source id and CRC, minus one
+    return struct.pack('>HHHBBBB', TC_APID_PACKET_ID, 0xC000 | seq_count, length, TC_ACK_BYTE,
+                       service_type, service_subtype, 0) + data + b'\x00\x00'
+
+
+def tc_report_element(name, execution_time, raw=None, sequence_name='AIXF001A'):
+    fields = [('CommandName', name), ('ReleaseTime', '2021-03-01T10:00:00.000Z'),
+              ('UplinkTime', '2021-03-01T10:00:01.000Z'), ('ExecutionTime', execution_time),
+              ('SequenceName', sequence_name)]
+    fields += [(state, 'PASSED') for state in TC_STATES]
+    if raw is not None:
+        fields.append(('RawBodyData', raw.hex().upper()))
+    return '<PktTcReportListElement>\n{}</PktTcReportListElement>\n'.format(''.join(
+        '<{0}>{1}</{0}>\n'.format(tag, value) for tag, value in fields))
+
+
+@pytest.fixture
+def tm_xml(tmp_path):
+    """ an EDDS telemetry xml file """
+    filename = str(tmp_path / 'edds_tm.xml')
+    spe.write_telemetry(filename, spe.TelemetryGenerator(seed=7), 'xml',
+                        num_packets=NUM_PACKETS)
+    return filename
+
+
+@pytest.fixture
+def tc_history_xml(tmp_path):
+    """
+    a TC history xml file, with a platform command, a command without raw data and
+    an execution time which can't be converted
+    """
+    filename = str(tmp_path / 'tc_history.xml')
+    elements = [
+        tc_report_element('ZIX17001', '2021-03-01T10:00:02.125Z', encode_telecommand(17, 1)),
+        tc_report_element('ZIX39001', '2021-03-01T10:00:03.250Z',
+                          encode_telecommand(239, 1, b'\x00\x00\x00\x05', 1)),
+        tc_report_element('AND05101', '2021-03-01T10:00:04.000Z', b'\x01\x02'),
+        tc_report_element('ZIX22001', '2021-03-01T10:00:05.000Z'),
+        tc_report_element('ZIX36002', 'not a time', encode_telecommand(236, 2, seq_count=2)),
+        tc_report_element('ZIX22001', '2021-03-01T10:00:06.500Z',
+                          encode_telecommand(22, 1, seq_count=3), 'AIXF002A'),
+    ]
+    with open(filename, 'w') as fout:
+        fout.write(TC_HISTORY_HEAD + ''.join(elements) + TC_HISTORY_TAIL)
+    return filename
+
+
+def parse_tm_xml_with_xmltodict(filename):
+    """ the EDDS file loaded whole with xmltodict, as before it was streamed """
+    parser = new_parser()
+    with open(filename) as filein:
+        doc = xmltodict.parse(filein.read())
+    elements = doc['ns2:ResponsePart']['Response']['PktRawResponse']['PktRawResponseElement']
+    return parser.collect_packets(
+        itertools.chain.from_iterable(parser.iter_telemetry_xml_element(x) for x in elements))
+
+
+def parse_tc_history_with_xmltodict(filename):
+    parser = new_parser()
+    with open(filename) as filein:
+        doc = xmltodict.parse(filein.read())
+    items = doc['ns2:ResponsePart']['Response']['PktTcReportResponse']['PktTcReportList'][
+        'PktTcReportListElement']
+    unix_times = stix_datetime.utc2unix_array([x.get('ExecutionTime', '') for x in items])
+    return parser.collect_packets(
+        itertools.chain.from_iterable(
+            parser.iter_telecommand_report_element(x, t) for x, t in zip(items, unix_times)))
+
+
+@pytest.fixture
+def ended_elements(monkeypatch):
+    """
+    record the packet elements ended by iterparse, and check each time one ends that
+    the elements ended before were cleared and removed from the tree
+    """
+    ended = []
+    iterparse = stix_parser.ET.iterparse
+
+    def checked_iterparse(source, events=None):
+        root = None
+        for event, element in iterparse(source, events):
+            if root is None:
+                root = element
+            if event == 'end' and element.tag in ELEMENT_TAGS:
+                in_tree = {id(x) for x in root.iter(element.tag)}
+                for x in ended:
+                    assert id(x) not in in_tree
+                    assert not len(x) and x.text is None and not x.attrib
+                ended.append(element)
+            yield event, element
+
+    monkeypatch.setattr(stix_parser.ET, 'iterparse', checked_iterparse)
+    return ended
+
+
+def test_tm_xml_same_as_xmltodict(tm_xml, ended_elements):
+    packets = new_parser().parse_file(tm_xml)
+    assert len(packets) == NUM_PACKETS
+    assert packets == parse_tm_xml_with_xmltodict(tm_xml)
+    assert len(ended_elements) == NUM_PACKETS
+
+
+def test_tc_history_same_as_xmltodict(tc_history_xml, ended_elements, monkeypatch):
+    monkeypatch.setattr(stix_parser, 'TC_REPORT_BATCH_SIZE', 4)
+    packets = new_parser().parse_file(tc_history_xml)
+    assert [x['header']['name'] for x in packets] == [
+        'ZIX17001', 'ZIX39001', 'ZIX36002', 'ZIX22001'
+    ]
+    assert packets == parse_tc_history_with_xmltodict(tc_history_xml)
+    assert packets[1]['parameters'] == [('PIX00248', 5, '', [])]
+    auxiliary = packets[3]['header']
+    assert auxiliary['sequence_name'] == 'AIXF002A'
+    assert auxiliary['state'] == 'P' * len(TC_STATES)
+    assert auxiliary['unix_time'] == stix_datetime.utc2unix('2021-03-01T10:00:06.500Z')
+    assert len(ended_elements) == 6
+
+
+def test_single_element_files(tmp_path):
+    """ xmltodict returned a dictionary rather than a list for a single element """
+    filename = str(tmp_path / 'edds_tm.xml')
+    spe.write_telemetry(filename, spe.TelemetryGenerator(seed=7), 'xml', num_packets=1)
+    assert len(new_parser().parse_file(filename)) == 1
@@ -25,6 +25,8 @@ that flew on IMPs 7 and 8, launched in 1972 and 1973?.
 
 import numpy as np
 
+from stix.core import skm_codec
+
 
 def compress(values, *, s, k, m):
     """
@@ -75,7 +77,7 @@ def compress(values, *, s, k, m):
 
 def decompress(values, *, s, k, m, return_variance=False):
     """
-    Compress values according to parameters.
+    Decompress values according to parameters, using the lookup tables of the (s, k, m) triplet.
 
     Parameters
     ----------
@@ -95,42 +97,4 @@ def decompress(values, *, s, k, m, return_variance=False):
     out
         The decompressed values
     """
-    values = np.atleast_1d(np.array(values))
-    total = s + k + m
-    if total > 8:
-        raise ValueError(f'Invalid s={s}, k={k}, m={m} must sum to less than 8 not {total}')
-
-    if values.min() < 0 or values.max() > 255:
-        raise ValueError(f'Compressed values must be in the range 0 to 255')
-
-    max_value = np.array(2 ** (2 ** k - 2) * (2 ** (m + 1)) - 1)
-    uint64_info = np.iinfo(np.uint64)
-
-    if max_value > uint64_info.max:
-        raise ValueError('Decompressed value too large to fit into uint64')
-
-    abs_values = values if s == 0 else values & 127
-    out = abs_values[:]
-    negative_indices = np.nonzero(values >= 128) if s != 0 else ([])
-    decompress_indices = np.nonzero(abs_values >= 2**(m+1))
-
-    if return_variance:
-        variance = np.zeros_like(values, dtype=np.float64)
-
-    if abs_values[decompress_indices].size >= 1:
-        kv = (abs_values[decompress_indices] >> m) - 1
-        mv = 2**m + (abs_values[decompress_indices] & 2**m - 1)
-        out[decompress_indices] = (mv << kv) + (1 << (kv - 1)) - 1
-        if return_variance:
-            variance[decompress_indices] = ((1 << kv)**2 + 2)/12
-
-    if s == 1 and return_variance:
-        variance[values == 127] = 0
-
-    if abs_values[negative_indices].size >= 1:
-        out[negative_indices] = -1 * out[negative_indices]
-
-    if return_variance:
-        return out, variance
-    else:
-        return out
+    return skm_codec.decompress(values, s, k, m, return_variance)
@@ -1,7 +1,8 @@
 import numpy as np
 import pytest
 
-from stix_parser.calibration.integer_compression import compress, decompress
+from stix.core import skm_codec
+from stix.fits.calibration.integer_compression import compress, decompress
 
 
 def test_compression():
@@ -1613,3 +1614,67 @@ def test_variance_143(values):
     compressed, variance = values
     _, res = decompress(compressed, s=1, k=4, m=3, return_variance=True)
     assert res == variance
+
+
+def decompress_without_lookup_table(values, *, s, k, m, return_variance=False):
+    """ decompression computed for each value, as done before the lookup tables """
+    values = np.atleast_1d(np.array(values))
+    abs_values = values if s == 0 else values & 127
+    out = abs_values.copy()
+    negative_indices = np.nonzero(values >= 128) if s != 0 else ([])
+    decompress_indices = np.nonzero(abs_values >= 2**(m+1))
+    variance = np.zeros_like(values, dtype=np.float64)
+    if abs_values[decompress_indices].size >= 1:
+        kv = (abs_values[decompress_indices] >> m) - 1
+        mv = 2**m + (abs_values[decompress_indices] & 2**m - 1)
+        out[decompress_indices] = (mv << kv) + (1 << (kv - 1)) - 1
+        variance[decompress_indices] = ((1 << kv)**2 + 2)/12
+    if s == 1:
+        variance[values == 127] = 0
+    if abs_values[negative_indices].size >= 1:
+        out[negative_indices] = -1 * out[negative_indices]
+    if return_variance:
+        return out, variance
+    return out
+
+
+VALID_SKM = [(s, k, m) for s in (0, 1) for k in range(8) for m in range(8)
+             if s + k + m <= 8 and 2 ** (2 ** k - 2) * 2 ** (m + 1) - 1 <= np.iinfo(np.uint64).max]
+
+
+@pytest.mark.parametrize('skm', VALID_SKM)
+def test_lookup_table_same_as_computed(skm):
+    s, k, m = skm
+    codes = np.arange(256)
+    expected, expected_variance = decompress_without_lookup_table(codes, s=s, k=k, m=m,
+                                                                  return_variance=True)
+    values, variance = decompress(codes, s=s, k=k, m=m, return_variance=True)
+    assert values.dtype == expected.dtype
+    assert np.array_equal(values, expected)
+    assert np.array_equal(variance, expected_variance)
+    shuffled = np.random.default_rng(0).permutation(codes).reshape(16, 16).astype(np.uint8)
+    assert np.array_equal(decompress(shuffled, s=s, k=k, m=m),
+                          decompress_without_lookup_table(shuffled.astype(np.int64),
+                                                          s=s, k=k, m=m))
+    for code in (0, 127, 128, 255):
+        assert decompress(code, s=s, k=k, m=m).tolist() == [expected[code]]
+
+
+@pytest.mark.parametrize('skm', [(1, 4, 4), (0, 7, 1), (0, 6, 2)])
+def test_invalid_parameters(skm):
+    s, k, m = skm
+    with pytest.raises(ValueError):
+        decompress(1, s=s, k=k, m=m)
+
+
+@pytest.mark.parametrize('values', [-1, 256, [0, 300]])
+def test_invalid_values(values):
+    with pytest.raises(ValueError):
+        decompress(values, s=0, k=5, m=3)
+
+
+def test_lookup_tables_cached():
+    assert skm_codec.get_lookup_tables(0, 5, 3) is skm_codec.get_lookup_tables(0, 5, 3)
+    values, _ = skm_codec.get_lookup_tables(0, 5, 3)
+    with pytest.raises(ValueError):
+        values[0] = 1
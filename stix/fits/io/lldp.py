@@ -5,7 +5,6 @@ Low Latency Date Pipeline processing
 import logging
 import shutil
 import time
-import xml.etree.ElementTree as ET
 from datetime import datetime
 from os import getenv
 from pathlib import Path
@@ -14,7 +13,7 @@ import numpy as np
 from astropy.wcs import wcs
 
 from stix_parser.core import stix_datatypes as sdt
-from stix_parser.core.stix_parser import StixTCTMParser
+from stix_parser.core.stix_parser import StixTCTMParser, iter_xml_elements
 from stix_parser.datetime import datetime_to_scet
 from stix_parser.io.fits.processors import get_products, SPID_MAP
 from stix_parser.products.quicklook import LightCurve, FlareFlagAndLocation
@@ -164,12 +163,11 @@ def process_request(request, outputdir):
     tmtc_files = list(request.joinpath('telemetry').glob('*.xml'))
     if len(tmtc_files) != 1:
         raise RequestException('Expected one tmtc file found %s.', len(tmtc_files))
-    tree = ET.parse(tmtc_files[0])
-    root = tree.getroot()
     packets = []
-    for packet_node in root.findall('.//PktRawResponseElement'):
-        # packet_id = packet_node.attrib.get('packetID')
-        packet_hex = list(packet_node.getiterator('Packet'))[0].text.strip()
+    # elements are decoded as the file is read, the xml tree is not kept in memory
+    for packet_node in iter_xml_elements(tmtc_files[0], 'PktRawResponseElement'):
+        # packet_id = packet_node.get('@packetID')
+        packet_hex = packet_node['Packet']
         packet = parser.parse_hex(packet_hex)[0]
         stix_packet = sdt.Packet(packet)
         packets.append(stix_packet)
@@ -3,7 +3,8 @@ House Keeping data products
 """
 import numpy as np
 
-from stix.core.stix_datetime import scet_to_datetime
+from stix.core.stix_datatypes import Packet
+from stix.core.stix_datetime import scet_to_datetimes
 from stix.fits.io.housekeeping import mini, maxi
 SKIP_ATTRS = {'scet_coarse', 'scet_fine', 'obs_utc', 'obs_beg', 'period', 'obs_avg', 'obs_end',
               'num_samples'}
@@ -18,15 +19,13 @@ class MiniReport:
         # Header
         self.scet_coarse = stix_packets['coarse_time']
         self.scet_fine = stix_packets['fine_time']
-        self.obs_utc = scet_to_datetime(f'{self.scet_coarse[0]}:{self.scet_fine[0]}')
+        # Create array of times as dt from date_obs
+        times = scet_to_datetimes(self.scet_coarse, self.scet_fine)
+        self.obs_utc = times[0]
         self.obs_beg = self.obs_utc
-        self.obs_end = scet_to_datetime(f'{self.scet_coarse[-1]}:{self.scet_fine[-1]}')
+        self.obs_end = times[-1]
         self.obs_avg = self.obs_beg + (self.obs_end - self.obs_beg) / 2.0
 
-        # Create array of times as dt from date_obs
-        times = [scet_to_datetime(f"{stix_packets['coarse_time'][i]}:"
-                                  f"{stix_packets['fine_time'][i]}")
-                 for i in range(self.num_samples)]
         time = np.array(times) - times[0]
 
         # Data
@@ -67,6 +66,18 @@ class MiniReport:
         self.number_sent_tm = stix_packets.get('NIX00167')
         self.number_failed_tm_gen = stix_packets.get('NIX00168')
 
+    @classmethod
+    def from_columns(cls, table):
+        """
+        Create the report from the raw values decoded in columnar mode
+
+        Parameters
+        ----------
+        table : `numpy.ndarray`
+            Structured array of a SPID returned by `StixTCTMParser.parse_binary_columns`
+        """
+        return cls(Packet.merge_columns(table))
+
     def to_hdul(self):
         """
         Create a housekeeping mini report HDUL based on the number of samples
@@ -94,15 +105,13 @@ class MaxiReport:
         # Header
         self.scet_coarse = stix_packets['coarse_time']
         self.scet_fine = stix_packets['fine_time']
-        self.obs_utc = scet_to_datetime(f'{self.scet_coarse[0]}:{self.scet_fine[0]}')
+        # Create array of times as dt from date_obs
+        times = scet_to_datetimes(self.scet_coarse, self.scet_fine)
+        self.obs_utc = times[0]
         self.obs_beg = self.obs_utc
-        self.obs_end = scet_to_datetime(f'{self.scet_coarse[-1]}:{self.scet_fine[-1]}')
+        self.obs_end = times[-1]
         self.obs_avg = self.obs_beg + (self.obs_end - self.obs_beg) / 2.0
 
-        # Create array of times as dt from date_obs
-        times = [scet_to_datetime(f"{stix_packets['coarse_time'][i]}:"
-                                  f"{stix_packets['fine_time'][i]}")
-                 for i in range(self.num_samples)]
         time = np.array(times) - times[0]
 
         # Data
@@ -185,6 +194,18 @@ class MaxiReport:
         self.hk_det_c = stix_packets.get('NIXD0058')
         self.fdir_function_status = stix_packets.get('NIX00085')
 
+    @classmethod
+    def from_columns(cls, table):
+        """
+        Create the report from the raw values decoded in columnar mode
+
+        Parameters
+        ----------
+        table : `numpy.ndarray`
+            Structured array of a SPID returned by `StixTCTMParser.parse_binary_columns`
+        """
+        return cls(Packet.merge_columns(table))
+
     def to_hdul(self):
         """
         Create a housekeeping maxi report HDUL based on the number of samples
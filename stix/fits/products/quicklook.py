@@ -11,7 +11,7 @@ from astropy.table import QTable, vstack, unique
 from astropy.time import Time
 
 from stix.fits.calibration.integer_compression import decompress
-from stix.core.stix_datetime import scet_to_datetime
+from stix.core.stix_datetime import scet_to_datetime, scet_to_datetimes
 from stix.fits.products.common import _get_detector_mask, _get_pixel_mask, _get_energy_bins, \
     _get_compression_scheme, _get_num_energies, _get_sub_spectrum_mask
 
@@ -93,9 +93,9 @@ class Control(QTable):
 
     def _get_time(self):
         # Replicate packet time for each sample
+        packet_times = scet_to_datetimes(self['scet_coarse'], self['scet_fine'])
         base_times = Time(list(chain(
-            *[[scet_to_datetime(f'{self["scet_coarse"][i]}:{self["scet_fine"][i]}')]
-              * n for i, n in enumerate(self['num_samples'])])))
+            *[[packet_times[i]] * n for i, n in enumerate(self['num_samples'])])))
         # For each sample generate sample number and multiply by duration and apply unit
         start_delta = np.hstack(
             [(np.arange(ns) * it) for ns, it in self[['num_samples', 'integration_time']]])
@@ -130,9 +130,9 @@ class Control(QTable):
 
         integration_time = packets.get('NIX00405')
         if integration_time:
-            control['integration_time'] = (np.array(integration_time, np.float) + 1) * 0.1 * u.s
+            control['integration_time'] = (np.array(integration_time, float) + 1) * 0.1 * u.s
         else:
-            control['integration_time'] = np.zeros_like(control['scet_coarse'], np.float) * u.s
+            control['integration_time'] = np.zeros_like(control['scet_coarse'], float) * u.s
 
         # control = unique(control)
         control['index'] = np.arange(len(control))
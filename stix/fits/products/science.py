@@ -12,7 +12,7 @@ from astropy.table.table import QTable
 from astropy.time.core import Time
 
 from stix.fits.calibration.integer_compression import decompress
-from stix.core.stix_datetime import scet_to_datetime
+from stix.core.stix_datetime import scet_to_datetime, scet_to_datetimes
 from stix.fits.products.common import _get_pixel_mask, _get_detector_mask, _get_compression_scheme
 from stix.fits.products.quicklook import get_energies_from_mask, ENERGY_CHANNELS
 
@@ -26,9 +26,9 @@ class Control(QTable):
 
     def _get_time(self):
         # Replicate packet time for each sample
+        packet_times = scet_to_datetimes(self['scet_coarse'], self['scet_fine'])
         base_times = Time(list(chain(
-            *[[scet_to_datetime(f'{self["scet_coarse"][i]}:{self["scet_fine"][i]}')]
-              * n for i, n in enumerate(self['num_samples'])])))
+            *[[packet_times[i]] * n for i, n in enumerate(self['num_samples'])])))
         # For each sample generate sample number and multiply by duration and apply unit
         start_delta = np.hstack(
             [(np.arange(ns) * it) for ns, it in self[['num_samples', 'integration_time']]])
@@ -720,8 +720,7 @@ class Aspect(Product):
         control = Control()
         scet_coarse = packets['NIX00445']
         scet_fine = packets['NIX00446']
-        start_times = Time([scet_to_datetime(f'{scet_coarse[i]}:{scet_fine[i]}')
-                            for i in range(len(scet_coarse))])
+        start_times = Time(scet_to_datetimes(scet_coarse, scet_fine))
 
         control['summing_value'] = packets['NIX00088']
         control['averaging_value'] = packets['NIX00490']
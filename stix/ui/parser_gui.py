@@ -1000,7 +1000,7 @@ class Ui(mainwindow.Ui_MainWindow):
             root.setText(0, key)
             root.setText(1, str(val))
 
-        params = self.data[row]['parameters']
+        params = stix_parser.get_packet_parameters(self.data[row])
         param_root = QtWidgets.QTreeWidgetItem(self.paramTreeWidget)
         param_root.setText(0, "Parameters")
         self.showParameterTree(params, param_root)
@@ -1105,7 +1105,7 @@ class Ui(mainwindow.Ui_MainWindow):
             header = packet['header']
             if packet['header']['SPID'] != current_spid:
                 continue
-            params = packet['parameters']
+            params = stix_parser.get_packet_parameters(packet)
             self.walk(name, params, header, timestamp, self.y, xaxis_type,
                       data_type)
 